@@ -44,11 +44,19 @@ if not firebase_admin._apps:
 from notices import notices
 
 # Import your PDF parsers here (you must define these yourself)
-from parser.parser_jntuk import parse_jntuk_pdf
-from parser.parser_autonomous import parse_autonomous_pdf
+from parser.preview import MAX_PREVIEW_PAGES, PREVIEW_PAGES, preview_pdf
+from parser.registry import FORMATS, parse_pdf, resolve_format
 
 # Import batch processing
 from batch_pdf_processor import process_single_pdf
+from parse_cache import cached_parse
+from data_cache import data_cache, load_data_file
+from firestore_upload import BatchUploader, existing_document_ids
+from results_index import (index_result_file, list_result_files, query_student_results,
+                           query_semester_results, query_semesters)
+from results_archive import archive_result_file, query_semester_columns
+from results_offsets import index_student_offsets, read_student, read_students_page
+from jsonl_output import header_path, read_jsonl_document
 
 # -----------------------------------------------------------------------------
 # Flask app setup
@@ -216,15 +224,26 @@ def save_to_firebase(student_results, year, semesters, exam_types, format_type,
     if upload_id:
         update_progress(upload_id, "firebase_uploading", firebase={"status": "uploading", "progress": 0, "batches": 0, "students_saved": 0})
     
-    students_saved = 0
     students_skipped = 0
-    batch = db.batch()
-    batch_count = 0
-    batch_number = 0
-    MAX_BATCH_SIZE = 500
     total_students = len(student_results)
     
+    def on_commit(uploader, batch_number, batch_size):
+        logger.info(f"Committed Firebase batch {batch_number}: {batch_size} records")
+        
+        # Update progress
+        if upload_id:
+            progress = (uploader.saved + uploader.failed + students_skipped) / total_students * 100
+            update_progress(upload_id, "firebase_uploading", firebase={
+                "status": "uploading",
+                "progress": progress,
+                "batches": uploader.batches_committed,
+                "students_saved": uploader.saved,
+                "total_students": total_students,
+                "message": f"Batch {batch_number} uploaded: {uploader.saved} students saved"
+            })
+    
     try:
+        pending = []
         for i, student_data in enumerate(student_results):
             student_id = student_data.get('student_id', '')
             if not student_id:
@@ -236,11 +255,19 @@ def save_to_firebase(student_results, year, semesters, exam_types, format_type,
             
             # Create unique document ID
             student_doc_id = f"{student_id}_{year.replace(' ', '_')}_{detected_semester.replace(' ', '_')}_{detected_exam_type}"
-            
-            # Check for duplicates (with option to skip duplicate checking for fresh uploads)
-            try:
-                existing_doc = db.collection('student_results').document(student_doc_id).get()
-                if existing_doc.exists:
+            pending.append((i, student_data, student_id, student_doc_id, detected_semester, detected_exam_type))
+        
+        # Check for duplicates with a few bulk reads instead of one get() per student.
+        # If the check fails nothing is written, and the whole upload is reported as failed
+        try:
+            existing_doc_ids = existing_document_ids(db, [entry[3] for entry in pending])
+        except Exception as e:
+            raise RuntimeError(f"Duplicate check failed, no students were written: {e}") from e
+        
+        # Up to MAX_IN_FLIGHT 500-document batches are committed concurrently
+        with BatchUploader(db, on_commit=on_commit) as uploader:
+            for i, student_data, student_id, student_doc_id, detected_semester, detected_exam_type in pending:
+                if student_doc_id in existing_doc_ids:
                     students_skipped += 1
                     # Log first few duplicates to help user understand
                     if students_skipped <= 5:
@@ -248,69 +275,32 @@ def save_to_firebase(student_results, year, semesters, exam_types, format_type,
                     elif students_skipped == 6:
                         logger.info(f"... and {total_students - i} more duplicates (suppressing further duplicate logs)")
                     continue
-            except Exception as e:
-                logger.warning(f"Error checking duplicate for {student_id}: {e}")
-                continue
-            
-            # Add metadata to student record
-            student_data.update({
-                'year': year,
-                'semester': detected_semester,
-                'examType': detected_exam_type,
-                'availableSemesters': semesters,
-                'availableExamTypes': exam_types,
-                'format': format_type,
-                'uploadId': doc_id,
-                'attempts': 0,
-                'uploadedAt': firestore.SERVER_TIMESTAMP,
-                'supplyExamTypes': [],
-                'isSupplyOnly': False
-            })
-            
-            # Add to batch
-            student_ref = db.collection('student_results').document(student_doc_id)
-            batch.set(student_ref, student_data)
-            students_saved += 1
-            batch_count += 1
-            
-            # Commit batch when reaching limit
-            if batch_count >= MAX_BATCH_SIZE:
-                try:
-                    batch.commit()
-                    batch_number += 1
-                    logger.info(f"Committed Firebase batch {batch_number}: {batch_count} records")
-                    
-                    # Update progress
-                    if upload_id:
-                        progress = (i + 1) / total_students * 100
-                        update_progress(upload_id, "firebase_uploading", firebase={
-                            "status": "uploading",
-                            "progress": progress,
-                            "batches": batch_number,
-                            "students_saved": students_saved,
-                            "total_students": total_students,
-                            "message": f"Batch {batch_number} uploaded: {students_saved} students saved"
-                        })
-                    
-                    batch = db.batch()
-                    batch_count = 0
-                except Exception as e:
-                    logger.error(f"Error committing Firebase batch: {e}")
-                    batch = db.batch()
-                    batch_count = 0
-                    students_saved -= batch_count
-        
-        # Commit remaining records
-        if batch_count > 0:
-            try:
-                batch.commit()
-                batch_number += 1
-                logger.info(f"Committed final Firebase batch {batch_number}: {batch_count} records")
-            except Exception as e:
-                logger.error(f"Error committing final Firebase batch: {e}")
-                students_saved -= batch_count
+                
+                # Add metadata to student record
+                student_data.update({
+                    'year': year,
+                    'semester': detected_semester,
+                    'examType': detected_exam_type,
+                    'availableSemesters': semesters,
+                    'availableExamTypes': exam_types,
+                    'format': format_type,
+                    'uploadId': doc_id,
+                    'attempts': 0,
+                    'uploadedAt': firestore.SERVER_TIMESTAMP,
+                    'supplyExamTypes': [],
+                    'isSupplyOnly': False
+                })
+                
+                # Add to batch
+                uploader.add(student_doc_id, student_data)
         
-        logger.info(f"Firebase upload complete: {students_saved} saved, {students_skipped} skipped")
+        # Leaving the block commits the remaining records and waits for every batch
+        students_saved = uploader.saved
+        batch_number = uploader.batches_committed
+        for error in uploader.errors:
+            logger.error(f"Error committing Firebase batch: {error}")
+        
+        logger.info(f"Firebase upload complete: {students_saved} saved, {students_skipped} skipped, {uploader.failed} failed")
         
         # Update final progress
         if upload_id:
@@ -320,6 +310,7 @@ def save_to_firebase(student_results, year, semesters, exam_types, format_type,
                 "batches": batch_number,
                 "students_saved": students_saved,
                 "students_skipped": students_skipped,
+                "students_failed": uploader.failed,
                 "total_students": total_students,
                 "message": f"Firebase upload complete: {students_saved} saved, {students_skipped} duplicates skipped"
             })
@@ -466,6 +457,36 @@ class AppError(Exception):
         self.status_code = status_code
         super().__init__(message)
 
+# -----------------------------------------------------------------------------
+# Optional page range of an upload (1-based, inclusive) as a parser pages range
+# -----------------------------------------------------------------------------
+def page_range_from_form(form):
+    start_page = form.get('start_page')
+    end_page = form.get('end_page')
+    if not start_page and not end_page:
+        return None
+    try:
+        start = int(start_page) if start_page else 1
+        end = int(end_page) if end_page else None
+    except ValueError:
+        raise AppError("start_page and end_page must be page numbers.", 400)
+    if start < 1 or (end is not None and end < start):
+        raise AppError("Invalid page range.", 400)
+    return (start - 1, end)
+
+# -----------------------------------------------------------------------------
+# Parser selection: the form's format picks a family, 'auto' lets the first page decide
+# -----------------------------------------------------------------------------
+FORMAT_CHOICES = ('jntuk', 'autonomous', 'auto')
+
+def registered_format(file_path, format_type):
+    """Return (registered format name, family stored with the results) for an upload"""
+    try:
+        format_name = resolve_format(file_path, format_type)
+    except ValueError as e:
+        raise AppError(str(e), 400)
+    return format_name, FORMATS[format_name].family
+
 @app.errorhandler(AppError)
 def handle_app_error(error):
     logger.error(f"AppError: {error.message}")
@@ -512,21 +533,24 @@ def list_data_files():
         if not data_dir.exists():
             return jsonify({"files": [], "message": "No data directory found"}), 200
             
+        # Metadata comes from the results catalog; student arrays are never loaded
         json_files = []
-        for file_path in data_dir.glob("*.json"):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    file_info = {
-                        "filename": file_path.name,
-                        "size": file_path.stat().st_size,
-                        "created": datetime.fromtimestamp(file_path.stat().st_ctime).isoformat(),
-                        "metadata": data.get("metadata", {}),
-                        "firebase_status": data.get("firebase_status", {})
-                    }
-                    json_files.append(file_info)
-            except Exception as e:
-                logger.warning(f"Could not read {file_path}: {e}")
+        for entry in list_result_files(data_dir, include_in_progress=True):
+            if entry["error"]:
+                logger.warning(f"Could not read {data_dir / entry['filename']}: {entry['error']}")
+                continue
+            file_info = {
+                "filename": entry["filename"],
+                "size": entry["size"],
+                "created": datetime.fromtimestamp(entry["ctime"]).isoformat(),
+                "metadata": entry["metadata"],
+                "firebase_status": entry["firebase_status"],
+                "in_progress": entry["in_progress"]
+            }
+            if entry["in_progress"]:
+                # A batch run still writing <name>.jsonl; size counts its committed batches
+                file_info["committed_bytes"] = entry["committed_bytes"]
+            json_files.append(file_info)
         
         json_files.sort(key=lambda x: x["created"], reverse=True)
         return jsonify({"files": json_files}), 200
@@ -538,16 +562,52 @@ def list_data_files():
 def get_data_file(filename):
     try:
         file_path = Path("data") / filename
-        if not file_path.exists() or not filename.endswith('.json'):
+        # A .jsonl is a batch run still being written, listed by /data-files until it is materialized
+        in_progress = filename.endswith('.jsonl') and Path(header_path(file_path)).exists()
+        if not file_path.exists() or not (filename.endswith('.json') or in_progress):
             return jsonify({"error": "File not found"}), 404
+
+        offset, limit = 0, None
+        if 'offset' in request.args or 'limit' in request.args:
+            try:
+                offset = int(request.args.get('offset', 0))
+                limit = int(request.args['limit']) if 'limit' in request.args else None
+            except ValueError:
+                return jsonify({"error": "offset and limit must be integers"}), 400
+            if offset < 0 or (limit is not None and limit < 0):
+                return jsonify({"error": "offset and limit must not be negative"}), 400
+
+        student_id = request.args.get('student_id')
+        if in_progress:
+            # Served from the header sidecar and the committed lines
+            try:
+                data = read_jsonl_document(file_path, offset, limit, student_id)
+            except FileNotFoundError:
+                return jsonify({"error": "File not found"}), 404  # materialized meanwhile
+            if student_id and not data["students"]:
+                return jsonify({"error": "Student not found"}), 404
+            return jsonify(data), 200
+
+        # Pages and single students are sliced out of the file by the offset index
+        if student_id:
+            data = read_student(file_path, student_id)
+            if data is None:
+                return jsonify({"error": "Student not found"}), 404
+            return jsonify(data), 200
+        if 'offset' in request.args or 'limit' in request.args:
+            return jsonify(read_students_page(file_path, offset, limit)), 200
             
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_data_file(file_path)
         return jsonify(data), 200
     except Exception as e:
         logger.error(f"Error reading data file {filename}: {e}")
         return jsonify({"error": "Failed to read data file"}), 500
 
+@app.route('/api/data-cache/stats', methods=['GET'])
+def get_data_cache_stats():
+    """Hit/miss counters and memory use of the in-process data file cache"""
+    return jsonify(data_cache.stats()), 200
+
 # -----------------------------------------------------------------------------
 # Helper function to extract year and semester from semester string
 # -----------------------------------------------------------------------------
@@ -615,67 +675,22 @@ def extract_year_sem_from_semester(semester_str):
 # Student Results Query Functions
 # -----------------------------------------------------------------------------
 def get_student_results(student_id, semester=None, exam_type=None, format_type=None):
-    """Get student results from JSON files"""
-    results = []
-    data_dir = Path("data")
-    
-    if not data_dir.exists():
-        return {"error": None, "data": []}
-        
-    for json_file in data_dir.glob("*.json"):
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                file_format = data.get("metadata", {}).get("format", "").lower()
-                file_exam_type = data.get("metadata", {}).get("exam_type", "").lower()
-                
-                # Filter by format and exam type if specified
-                if (format_type and file_format != format_type.lower()) or \
-                   (exam_type and file_exam_type != exam_type.lower()):
-                    continue
-                
-                # Filter students by ID and semester
-                for student in data.get("students", []):
-                    if student.get("student_id") == student_id:
-                        if not semester or student.get("semester") == semester:
-                            # Add source file info
-                            student["source_file"] = json_file.name
-                            results.append(student)
-        except Exception as e:
-            logger.warning(f"Could not read {json_file}: {e}")
-    
-    return {"error": None, "data": results}
+    """Get student results from the indexed JSON files"""
+    try:
+        return {"error": None, "data": query_student_results(student_id, semester, exam_type, format_type)}
+    except Exception as e:
+        logger.error(f"Results index lookup failed for {student_id}: {e}")
+        return {"error": "Failed to read results index", "data": []}
 
-def get_all_students_by_semester(semester, exam_type=None, format_type=None):
-    """Get all students for a specific semester from JSON files"""
-    results = []
-    data_dir = Path("data")
-    
-    if not data_dir.exists():
-        return {"error": None, "data": []}
-        
-    for json_file in data_dir.glob("*.json"):
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                file_format = data.get("metadata", {}).get("format", "").lower()
-                file_exam_type = data.get("metadata", {}).get("exam_type", "").lower()
-                
-                # Filter by format and exam type if specified
-                if (format_type and file_format != format_type.lower()) or \
-                   (exam_type and file_exam_type != exam_type.lower()):
-                    continue
-                
-                # Filter students by semester
-                for student in data.get("students", []):
-                    if student.get("semester") == semester:
-                        # Add source file info
-                        student["source_file"] = json_file.name
-                        results.append(student)
-        except Exception as e:
-            logger.warning(f"Could not read {json_file}: {e}")
-    
-    return {"error": None, "data": results}
+def get_all_students_by_semester(semester, exam_type=None, format_type=None, columns=None):
+    """Get all students for a specific semester from the indexed JSON files; columns are read from the archives"""
+    try:
+        if columns:
+            return {"error": None, "data": query_semester_columns(semester, columns, exam_type, format_type)}
+        return {"error": None, "data": query_semester_results(semester, exam_type, format_type)}
+    except Exception as e:
+        logger.error(f"Results index lookup failed for {semester}: {e}")
+        return {"error": "Failed to read results index", "data": []}
 
 # -----------------------------------------------------------------------------
 # Student Results API Endpoints
@@ -709,8 +724,11 @@ def get_semester_results_api(semester):
     try:
         exam_type = request.args.get('exam_type')
         format_type = request.args.get('format')
+        # e.g. ?fields=student_id,sgpa reads only those columns from the archives
+        fields = request.args.get('fields')
+        columns = [field.strip() for field in fields.split(',') if field.strip()] if fields else None
         
-        result = get_all_students_by_semester(semester, exam_type, format_type)
+        result = get_all_students_by_semester(semester, exam_type, format_type, columns)
         
         if result["error"]:
             return jsonify({"error": result["error"]}), 500
@@ -729,24 +747,11 @@ def get_semester_results_api(semester):
 def get_available_semesters():
     """Get list of available semesters from JSON files"""
     try:
-        # Get unique semesters from all JSON files
-        semesters = set()
-        data_dir = Path("data")
-        if not data_dir.exists():
-            return jsonify({"semesters": [], "count": 0}), 200
-            
-        for json_file in data_dir.glob("*.json"):
-            try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    for student in data.get("students", []):
-                        if "semester" in student:
-                            semesters.add(student["semester"])
-            except Exception as e:
-                logger.warning(f"Could not read {json_file}: {e}")
+        # Get unique semesters from the results index
+        semesters = query_semesters()
         
         return jsonify({
-            "semesters": sorted(list(semesters)),
+            "semesters": semesters,
             "count": len(semesters)
         }), 200
         
@@ -948,20 +953,23 @@ def upload_pdf():
         # Only require the fields you actually use:
         if not all([file, format_type, exam_type]):
             raise AppError("Missing required fields.", 400)
-        if format_type.lower() not in ('jntuk', 'autonomous'):
-            raise AppError("Invalid format type. Must be 'jntuk' or 'autonomous'.", 400)
+        if format_type.lower() not in FORMAT_CHOICES:
+            raise AppError("Invalid format type. Must be 'jntuk', 'autonomous' or 'auto'.", 400)
         if exam_type.lower() not in ('regular', 'supply'):
             raise AppError("Invalid exam type. Must be 'regular' or 'supply'.", 400)
         valid, error_msg = PDFValidator.validate_file(file)
         if not valid:
             raise AppError(error_msg, 400)
+        pages = page_range_from_form(request.form)
         file_path, _ = secure_file_handling(file)
         file.save(file_path)
-        # Parse all student results from the PDF using the selected parser:
-        if format_type.lower() == 'autonomous':
-            results = parse_autonomous_pdf(file_path)
+        format_name, format_type = registered_format(file_path, format_type)
+        # Parse all student results from the PDF with the registered parser (cached by content hash);
+        # a page range ingests part of a large PDF and is not cached
+        if pages:
+            results = parse_pdf(file_path, format_name, pages=pages)
         else:
-            results = parse_jntuk_pdf(file_path)
+            results = cached_parse(file_path, format_name, lambda path: parse_pdf(path, format_name))
         if not results:
             raise AppError("No valid student results found in PDF.", 400)
         
@@ -1015,9 +1023,15 @@ def upload_pdf():
             }
         }
         
+        if pages:
+            json_data["metadata"]["page_range"] = [pages[0] + 1, pages[1]]
+        
         # Save to JSON file
         with open(json_filepath, 'w', encoding='utf-8') as json_file:
             json.dump(json_data, json_file, indent=2, ensure_ascii=False)
+        index_result_file(json_filepath)
+        archive_result_file(json_filepath, json_data)
+        index_student_offsets(json_filepath)
         
         logger.info(f"Saved parsed data to {json_filepath}")
         logger.info(f"Firebase upload: {students_saved}/{len(results)} students saved")
@@ -1054,6 +1068,44 @@ def api_uploaded_results():
     """API endpoint for getting uploaded results (frontend compatibility)"""
     return list_data_files()
 
+@app.route('/api/upload-preview', methods=['POST'])
+def api_upload_preview():
+    """Parse only the first pages of a PDF so the admin can check it before confirming the upload"""
+    file_path = None
+    try:
+        file = request.files.get('pdf') or request.files.get('file')
+        format_type = request.form.get('format') or request.form.get('resultType', 'jntuk')
+        pages = request.form.get('pages', PREVIEW_PAGES, type=int)
+
+        if not file:
+            return jsonify({"error": "Missing required fields", "required": ["file", "format"]}), 400
+
+        if format_type.lower() not in FORMAT_CHOICES:
+            return jsonify({"error": "Invalid format type. Must be 'jntuk', 'autonomous' or 'auto'"}), 400
+
+        valid, error_msg = PDFValidator.validate_file(file)
+        if not valid:
+            return jsonify({"error": error_msg}), 400
+
+        file_path, _ = secure_file_handling(file)
+        file.save(file_path)
+
+        preview = preview_pdf(file_path, format_type, pages=max(1, min(pages, MAX_PREVIEW_PAGES)))
+        preview["original_filename"] = file.filename
+        return jsonify(preview), 200
+
+    except ValueError as ex:
+        return jsonify({"error": str(ex)}), 400
+    except Exception as ex:
+        logger.error(f"Upload preview error: {ex}\n{traceback.format_exc()}")
+        return jsonify({"error": "Internal server error while previewing upload"}), 500
+    finally:
+        if file_path and os.path.exists(file_path):
+            try:
+                os.remove(file_path)
+            except Exception as e:
+                logger.warning(f"Failed to delete temp file {file_path}: {e}")
+
 @app.route('/api/upload-result', methods=['POST'])
 def api_upload_result():
     """API endpoint for uploading results (frontend compatibility) - Async version"""
@@ -1065,8 +1117,8 @@ def api_upload_result():
         if not all([file, format_type, exam_type]):
             return jsonify({"error": "Missing required fields", "required": ["file", "format", "exam_type"]}), 400
             
-        if format_type.lower() not in ('jntuk', 'autonomous'):
-            return jsonify({"error": "Invalid format type. Must be 'jntuk' or 'autonomous'"}), 400
+        if format_type.lower() not in FORMAT_CHOICES:
+            return jsonify({"error": "Invalid format type. Must be 'jntuk', 'autonomous' or 'auto'"}), 400
             
         if exam_type.lower() not in ('regular', 'supply'):
             return jsonify({"error": "Invalid exam type. Must be 'regular' or 'supply'"}), 400
@@ -1114,13 +1166,14 @@ def process_upload_background(file_path, format_type, exam_type, original_filena
         # Use the optimized batch processor that includes PDF filename in documents
         if FIREBASE_AVAILABLE and db and bucket:
             # Use batch processing with Firebase
-            result = process_single_pdf(file_path, db, bucket)
+            result = process_single_pdf(file_path, db, bucket, format_name=format_type)
             
             # Extract results for progress tracking
             total_students = result.get('total_students', 0)
             firebase_saved = result.get('firebase_saved', 0)
             firebase_skipped = result.get('firebase_skipped', 0)
             json_filepath = result.get('json_filepath', '')
+            format_type = result.get('format', format_type)
             
             # Update progress to completed
             update_progress(upload_id, "completed", 
@@ -1155,10 +1208,8 @@ def process_upload_background(file_path, format_type, exam_type, original_filena
             # Fallback to old system if Firebase not available
             update_progress(upload_id, "parsing", parsing={"status": "parsing", "message": "Extracting student data from PDF..."})
             
-            if format_type.lower() == 'autonomous':
-                results = parse_autonomous_pdf(file_path)
-            else:
-                results = parse_jntuk_pdf(file_path)
+            format_name, format_type = registered_format(file_path, format_type)
+            results = cached_parse(file_path, format_name, lambda path: parse_pdf(path, format_name))
                 
             if not results:
                 update_progress(upload_id, "error", parsing={"status": "error", "message": "No valid student results found in PDF"})
@@ -1192,6 +1243,9 @@ def process_upload_background(file_path, format_type, exam_type, original_filena
             
             with open(json_filepath, 'w', encoding='utf-8') as json_file:
                 json.dump(json_data, json_file, indent=2, ensure_ascii=False)
+            index_result_file(json_filepath)
+            archive_result_file(json_filepath, json_data)
+            index_student_offsets(json_filepath)
             
             update_progress(upload_id, "completed", 
                 parsing={"status": "completed", "message": f"Processed {len(results)} students"},
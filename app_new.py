@@ -924,15 +924,16 @@ def upload_result():
             all_errors = []
             
             # Process in batches using generators
-            if format_type.lower() == 'jntuk':
-                from parser.parser_jntuk import parse_jntuk_pdf_generator
-                batch_generator = parse_jntuk_pdf_generator(temp_file_path, batch_size=500)
-            elif format_type.lower() == 'autonomous':
-                from parser.parser_autonomous import parse_autonomous_pdf_generator
+            from parser.registry import iter_batches, resolve_format
+            try:
+                format_name = resolve_format(temp_file_path, format_type)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            options = {}
+            if format_name != 'jntuk':
                 semester_info = f"{year} {semesters[0]}" if semesters else f"{year} Mixed"
-                batch_generator = parse_autonomous_pdf_generator(temp_file_path, semester=semester_info, university="Autonomous", batch_size=500)
-            else:
-                return jsonify({'error': f'Unsupported format: {format_type}'}), 400
+                options = {'semester': semester_info, 'university': "Autonomous"}
+            batch_generator = iter_batches(temp_file_path, 500, format_name, **options)
             
             # Process each batch as it's generated
             firebase_start_time = time.time()
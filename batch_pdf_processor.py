@@ -5,28 +5,175 @@ Processes multiple JNTUK PDFs efficiently with detailed debugging
 """
 
 import os
+import argparse
 import glob
 import json
+import multiprocessing
+import queue
+import socket
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
-from parser.parser_jntuk import parse_jntuk_pdf_generator
+from functools import partial
+from parser.parser_jntuk import HallTicketReappeared
+from parser.registry import FORMATS, iter_batches, probe_pdf, resolve_format
+from parser.result_batch import ResultBatch
+from parse_cache import batch_cache_name, cached_batches, cache_stats, file_sha256
+from results_index import index_result_file
+from results_archive import archive_result_file
+from results_offsets import index_student_offsets
+from firestore_upload import BatchUploader, existing_document_ids, existing_field_values, write_documents
+from batch_pipeline import PIPELINE_QUEUE_SIZE, PipelineStage, run_pipeline
+from jsonl_output import (create_jsonl_output, load_jsonl_header, write_jsonl_header,
+                          discard_uncommitted, append_jsonl_batch, materialize_json, legacy_json_path)
 import firebase_admin
 from firebase_admin import credentials, firestore, storage
 
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'checkpoints')
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+LOCK_GRACE_SECONDS = 10
+BATCH_SIZE = 50
+SUMMARY_PATH = "batch_processing_summary.json"
+
+def get_checkpoint_paths(pdf_hash):
+    """Return (page log, run manifest) paths for a PDF, keyed by its content hash"""
+    base = os.path.join(CHECKPOINT_DIR, pdf_hash)
+    return f"{base}.pages.jsonl", f"{base}.run.json"
+
+def _read_lock(lock_path):
+    """The owner recorded in a checkpoint lock, {} if it cannot be read yet, None if there is no lock"""
+    try:
+        with open(lock_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        return {}
+
+def _lock_owner_alive(owner, lock_path):
+    """Whether the run that wrote a checkpoint lock may still be running"""
+    if not owner:
+        # The owner creates the lock and then writes it; give a fresh empty lock time to be filled in
+        try:
+            return time.time() - os.path.getmtime(lock_path) < LOCK_GRACE_SECONDS
+        except OSError:
+            return False
+    if owner.get('host') != socket.gethostname() or os.name == 'nt':
+        return True  # no safe liveness check for another host or on Windows
+    try:
+        os.kill(owner['pid'], 0)
+    except ProcessLookupError:
+        return False
+    except (OSError, KeyError, TypeError):
+        return True
+    # A pid started after the lock was taken belongs to another process
+    try:
+        return os.stat(f"/proc/{owner['pid']}").st_ctime <= owner['started'] + LOCK_GRACE_SECONDS
+    except OSError:
+        return True
+
+def claim_checkpoint(pdf_hash):
+    """Claim the checkpoint of a PDF for this run; returns (page log, run manifest, lock) paths.
+
+    The shared checkpoint keyed by the content hash is claimed with an O_EXCL
+    lockfile holding the owner's pid, host and start time. A lock whose owner is
+    gone is taken over, so an interrupted run is resumed. While another live run
+    (a duplicate upload, or a second --jobs worker) owns it, this run gets a
+    private checkpoint instead and the lock path is None.
+    """
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    lock_path = os.path.join(CHECKPOINT_DIR, f"{pdf_hash}.lock")
+    owner = {"pid": os.getpid(), "host": socket.gethostname(), "thread": threading.get_ident(),
+             "started": time.time()}
+
+    for _ in range(3):
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            current = _read_lock(lock_path)
+            if current is not None and _lock_owner_alive(current, lock_path):
+                break
+            if current is not None and _read_lock(lock_path) == current:
+                print(f"♻️ Taking over the checkpoint of a stopped run ({current.get('pid', 'unknown pid')})")
+                try:
+                    os.remove(lock_path)
+                except FileNotFoundError:
+                    pass
+            continue
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(owner, f)
+        return (*get_checkpoint_paths(pdf_hash), lock_path)
+
+    run_id = f"{pdf_hash}.run-{os.getpid()}-{threading.get_ident()}-{time.time_ns()}"
+    print(f"🔒 Another run is processing this PDF; using a private checkpoint")
+    return (*get_checkpoint_paths(run_id), None)
+
+def release_checkpoint(lock_path):
+    """Give up a claimed checkpoint, leaving it for a later run to resume"""
+    owner = _read_lock(lock_path)
+    if owner and owner.get('pid') == os.getpid() and owner.get('thread') == threading.get_ident():
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+def load_run_checkpoint(manifest_path):
+    """Load the run manifest of an interrupted parse, or None if there is nothing to resume"""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not os.path.exists(manifest.get('output_path', '')):
+        return None
+    return manifest
+
+def save_run_checkpoint(manifest_path, output_path, doc_id):
+    """Remember which output file and upload ID a run writes to, so a retry can continue it"""
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "output_path": output_path,
+            "doc_id": doc_id,
+            "started_at": datetime.now().isoformat()
+        }, f, indent=2)
+
+def clear_run_checkpoint(page_log_path, manifest_path):
+    for path in (page_log_path, manifest_path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
 def create_json_file_header(original_filename, format_type, exam_types, year, semesters):
-    """Create initial JSON file with metadata and return file path"""
+    """Create the JSON Lines output and its metadata header, and return the .jsonl path"""
     # Create directories if they don't exist
-    data_dir = os.path.join(os.path.dirname(__file__), 'data')
+    data_dir = DATA_DIR
     os.makedirs(data_dir, exist_ok=True)
     
     # Generate filename
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     exam_type_str = "_".join(exam_types)
-    json_filename = f"parsed_results_{format_type}_{exam_type_str}_{timestamp}.json"
+    base_name = f"parsed_results_{format_type}_{exam_type_str}_{timestamp}"
     
-    # Initial JSON structure
-    json_data = {
-        "metadata": {
+    # PDFs processed together can start in the same second; claim a unique name
+    suffix = 0
+    while True:
+        jsonl_filename = f"{base_name}.jsonl" if suffix == 0 else f"{base_name}_{suffix}.jsonl"
+        jsonl_path = os.path.join(data_dir, jsonl_filename)
+        if not os.path.exists(legacy_json_path(jsonl_path)):
+            try:
+                open(jsonl_path, 'x').close()
+                break
+            except FileExistsError:
+                pass
+        suffix += 1
+    
+    # Initial header; students are appended to the .jsonl file one per line
+    create_jsonl_output(
+        jsonl_path,
+        metadata={
             "format": format_type,
             "exam_type": exam_types[0] if len(exam_types) == 1 else "mixed",
             "processed_at": datetime.now().isoformat(),
@@ -36,88 +183,102 @@ def create_json_file_header(original_filename, format_type, exam_types, year, se
             "year": year,
             "semesters": semesters
         },
-        "firebase_upload": {
+        firebase_upload={
             "batches_completed": 0,
             "students_saved": 0,
             "duplicates_skipped": 0,
             "upload_started_at": "",
             "upload_completed_at": ""
-        },
-        "students": []
-    }
-    
-    json_file_path = os.path.join(data_dir, json_filename)
-    with open(json_file_path, 'w', encoding='utf-8') as f:
-        json.dump(json_data, f, indent=2, ensure_ascii=False)
+        }
+    )
     
-    print(f"📁 Created JSON file: {json_filename}")
-    return json_file_path
+    print(f"📁 Created JSON Lines file: {jsonl_filename}")
+    return jsonl_path
 
-def append_batch_to_json(json_file_path, batch_records, batch_num, students_saved, students_skipped):
-    """Append a batch of records to the JSON file and update metadata"""
+def append_batch_to_json(jsonl_path, batch_records, batch_num, students_saved, students_skipped):
+    """Append a batch of records to the JSON Lines output and update its header"""
     try:
-        # Read current JSON
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
-        
-        # Append new records
-        json_data['students'].extend(batch_records)
+        header = load_jsonl_header(jsonl_path)
         
         # Update metadata
-        json_data['metadata']['total_students'] = len(json_data['students'])
-        json_data['metadata']['last_batch_processed'] = batch_num
-        json_data['metadata']['last_updated'] = datetime.now().isoformat()
+        header['metadata']['total_students'] += len(batch_records)
+        header['metadata']['last_batch_processed'] = batch_num
+        header['metadata']['last_updated'] = datetime.now().isoformat()
         
         # Update Firebase status
-        json_data['firebase_upload']['batches_completed'] = batch_num
-        json_data['firebase_upload']['students_saved'] = students_saved
-        json_data['firebase_upload']['duplicates_skipped'] = students_skipped
+        header['firebase_upload']['batches_completed'] = batch_num
+        header['firebase_upload']['students_saved'] = students_saved
+        header['firebase_upload']['duplicates_skipped'] = students_skipped
         
-        # Write back to file
-        with open(json_file_path, 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, indent=2, ensure_ascii=False)
+        # Only the new lines are written; the header commit makes the batch durable
+        append_jsonl_batch(jsonl_path, header, batch_records)
         
-        print(f"📝 Updated JSON file: Batch {batch_num}, Total students: {len(json_data['students'])}")
+        print(f"📝 Updated JSON Lines file: Batch {batch_num}, Total students: {header['metadata']['total_students']}")
         
     except Exception as e:
-        print(f"❌ Error updating JSON file: {str(e)}")
+        # The run must fail: its output would be incomplete, and the checkpoint stays resumable
+        print(f"❌ Error updating JSON Lines file: {str(e)}")
+        raise
+
+def student_document_id(doc_id_prefix, student_id):
+    """Firestore ID of a student's document within one PDF's uploads"""
+    return f"{doc_id_prefix}_{str(student_id).replace('/', '_')}"
 
-def batch_upload_to_firebase(batch_records, year, semesters, exam_types, format_type, doc_id, pdf_filename=None):
-    """Upload a batch of records to Firebase"""
+def batch_upload_to_firebase(batch_records, year, semesters, exam_types, format_type, doc_id, pdf_filename=None, db=None,
+                             uploader=None, doc_id_prefix=None, rewrite_own=False):
+    """Upload a batch of records to Firebase
+    
+    Existing students are found with one 'in' query per 30 IDs and new ones are
+    written in a single WriteBatch, instead of a query and an add() per student.
+    A shared uploader bounds concurrent commits across PDFs processed together.
+    doc_id_prefix gives new students the ID student_document_id(prefix, student_id)
+    instead of an auto ID. With rewrite_own, students whose document under that
+    prefix exists are written over it instead of being skipped as duplicates,
+    which lets a re-parse replace what an earlier pass over the PDF uploaded.
+    """
     try:
-        db = firestore.client()
-        students_saved = 0
+        db = db or firestore.client()
         duplicates_skipped = 0
         errors = []
         
+        students = []
         for student in batch_records:
-            try:
-                student_id = student.get('student_id')
-                if not student_id:
-                    errors.append("Missing student_id")
-                    continue
-                
-                # Add PDF filename to student record
-                if pdf_filename:
-                    student['pdf_filename'] = pdf_filename
-                    student['source_document'] = pdf_filename
-                
-                # Check if student already exists
-                existing_docs = db.collection('student_results').where('student_id', '==', student_id).stream()
-                existing_doc = None
-                for doc in existing_docs:
-                    existing_doc = doc
-                    break
-                
-                if existing_doc:
-                    duplicates_skipped += 1
-                else:
-                    # Add new student
-                    db.collection('student_results').add(student)
-                    students_saved += 1
-                    
-            except Exception as e:
-                errors.append(f"Error processing {student.get('student_id', 'unknown')}: {str(e)}")
+            student_id = student.get('student_id')
+            if not student_id:
+                errors.append("Missing student_id")
+                continue
+            
+            # Add PDF filename to student record
+            if pdf_filename:
+                student['pdf_filename'] = pdf_filename
+                student['source_document'] = pdf_filename
+            students.append(student)
+        
+        # The PDF's own documents are rewritten; check which other students already exist
+        rewrites = {}
+        if doc_id_prefix and rewrite_own:
+            own_ids = {student_document_id(doc_id_prefix, student['student_id']): student['student_id']
+                       for student in students}
+            rewrites = {own_ids[own_id]: own_id for own_id in existing_document_ids(db, list(own_ids))}
+        seen_ids = existing_field_values(db, 'student_id', [student['student_id'] for student in students
+                                                            if student['student_id'] not in rewrites])
+        
+        new_students = []
+        for student in students:
+            student_id = student['student_id']
+            if student_id in rewrites:
+                seen_ids.add(student_id)
+                new_students.append((rewrites.pop(student_id), student))
+            elif student_id in seen_ids:
+                duplicates_skipped += 1
+            else:
+                seen_ids.add(student_id)
+                new_students.append((student_document_id(doc_id_prefix, student_id) if doc_id_prefix else None,
+                                     student))
+        
+        # Add new students
+        students_saved, write_errors = write_documents(db, new_students, uploader=uploader)
+        errors.extend(write_errors)
         
         return students_saved, duplicates_skipped, errors
         
@@ -142,8 +303,9 @@ def setup_firebase():
     
     return firestore.client(), storage.bucket()
 
-def detect_pdf_metadata(pdf_path):
-    """Detect semester and year from PDF filename"""
+def detect_pdf_metadata(pdf_path, probe=None):
+    """Detect year, semester and exam type from the PDF's first page, falling back to its filename"""
+    probe = probe or probe_pdf(pdf_path)
     filename = os.path.basename(pdf_path).lower()
     
     # Extract year
@@ -166,86 +328,201 @@ def detect_pdf_metadata(pdf_path):
         exam_type = "supplementary"
     
     return {
-        'year': year,
-        'semesters': [semester],
-        'exam_types': [exam_type],
-        'format': 'jntuk'
+        'year': probe['year'] or year,
+        'semesters': [probe['semester'] or semester],
+        'exam_types': ["supplementary" if probe['exam_type'] == "supplementary" else exam_type],
+        'format': probe['family'] or 'jntuk'
     }
 
-def process_single_pdf(pdf_path, db, bucket):
-    """Process a single PDF with optimized batch processing"""
+def process_single_pdf(pdf_path, db, bucket, uploader=None, batch_source=None, format_name=None):
+    """Process a single PDF with optimized batch processing
+    
+    Records are appended to a JSON Lines file in data/ and materialized into the
+    legacy JSON result file once the PDF is done. Extracted pages are
+    checkpointed under cache/checkpoints; re-running on the same PDF after an
+    interruption resumes from the last completed page and keeps appending to
+    the same JSON Lines file. A student listed again after their record was
+    streamed makes the run re-parse the whole PDF with group_document=True,
+    restarting the output and rewriting the documents uploaded from this PDF,
+    whose IDs are derived from its content hash.
+    batch_source(pdf_path, page_log_path, format_name, group_document=False)
+    replaces the in-process parser, e.g. with one running in a worker process.
+    format_name picks the parser as registry.resolve_format() does; by default
+    the first page decides. Without an uploader the PDF gets its own, closed
+    when it is done, so its batches share one commit pool.
+    """
+    if uploader is None and db is not None:
+        with BatchUploader(db) as uploader:
+            return process_single_pdf(pdf_path, db, bucket, uploader, batch_source, format_name)
+    
     print(f"\n🚀 Processing: {os.path.basename(pdf_path)}")
     start_time = time.time()
     
-    # Detect metadata
-    metadata = detect_pdf_metadata(pdf_path)
-    print(f"📊 Detected: {metadata}")
+    # Detect the format and metadata from the first page
+    probe = probe_pdf(pdf_path)
+    format_name = resolve_format(pdf_path, format_name, probe)
+    metadata = detect_pdf_metadata(pdf_path, probe)
+    metadata['format'] = FORMATS[format_name].family
+    print(f"📊 Detected: {format_name} {metadata}")
     
-    # Initialize JSON file and get timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    json_path = create_json_file_header(
-        os.path.basename(pdf_path),
-        metadata['format'], 
-        metadata['exam_types'], 
-        metadata['year'], 
-        metadata['semesters']
-    )
-    doc_id = f"upload_{timestamp}"
+    # Only the run holding the claim may resume or extend the checkpoint of this PDF
+    pdf_hash = file_sha256(pdf_path)
+    page_log_path, manifest_path, lock_path = claim_checkpoint(pdf_hash)
+    try:
+        return _process_claimed_pdf(pdf_path, db, uploader, batch_source, format_name, metadata, pdf_hash,
+                                    page_log_path, manifest_path, start_time)
+    finally:
+        if lock_path:
+            release_checkpoint(lock_path)
+        else:
+            clear_run_checkpoint(page_log_path, manifest_path)  # a private checkpoint is never resumed
+
+def _process_claimed_pdf(pdf_path, db, uploader, batch_source, format_name, metadata, pdf_hash,
+                         page_log_path, manifest_path, start_time):
+    """The body of process_single_pdf, run while holding the PDF's checkpoint"""
+    checkpoint = load_run_checkpoint(manifest_path)
     
     # Process PDF in batches
     total_students = 0
     total_saved = 0
     total_skipped = 0
-    batch_count = 0
+    batches_to_skip = 0
+    
+    if checkpoint:
+        # Continue the interrupted run: batches already in its output are replayed but not re-saved
+        jsonl_path = checkpoint['output_path']
+        doc_id = checkpoint['doc_id']
+        header = load_jsonl_header(jsonl_path)
+        discard_uncommitted(jsonl_path, header)
+        batches_to_skip = header['metadata'].get('last_batch_processed', 0)
+        total_students = header['metadata']['total_students']
+        total_saved = header['firebase_upload'].get('students_saved', 0)
+        total_skipped = header['firebase_upload'].get('duplicates_skipped', 0)
+        print(f"♻️ Resuming {os.path.basename(jsonl_path)} after batch {batches_to_skip} ({total_students} students)")
+    else:
+        # Initialize JSON Lines output and get timestamp
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        jsonl_path = create_json_file_header(
+            os.path.basename(pdf_path),
+            metadata['format'], 
+            metadata['exam_types'], 
+            metadata['year'], 
+            metadata['semesters']
+        )
+        doc_id = f"upload_{timestamp}"
+        save_run_checkpoint(manifest_path, jsonl_path, doc_id)
+    
+    totals = {'students': total_students, 'saved': total_saved, 'skipped': total_skipped, 'batches': batches_to_skip}
+    # Students are stored under IDs derived from the PDF, so a re-parse finds what any run of it uploaded
+    upload_options = {'doc_id_prefix': pdf_hash[:20], 'rewrite_own': False}
     
     try:
         print(f"🔍 Starting batch processing...")
         
-        for batch_records in parse_jntuk_pdf_generator(pdf_path, batch_size=50):
-            batch_count += 1
-            batch_size = len(batch_records)
-            total_students += batch_size
-            
-            print(f"📦 Processing batch {batch_count}: {batch_size} students")
+        if batch_source:
+            batch_generator = lambda path: batch_source(path, page_log_path, format_name)
+        else:
+            batch_generator = lambda path: iter_batches(path, BATCH_SIZE, format_name, checkpoint_path=page_log_path)
+        if checkpoint:
+            # A resumed run only sees part of the output, so it must not populate the parse cache
+            batches = batch_generator(pdf_path)
+        else:
+            # Identical PDFs are served from the parse cache instead of being re-parsed
+            batches = cached_batches(pdf_path, batch_cache_name(format_name), batch_generator, batch_size=BATCH_SIZE,
+                                     pdf_hash=pdf_hash)
+        
+        pdf_filename = os.path.basename(pdf_path)
+        
+        def upload_stage(item):
+            batch_number, batch = item
+            print(f"📦 Processing batch {batch_number}: {len(batch)} students")
             
             # Upload to Firebase first
             saved, skipped, errors = batch_upload_to_firebase(
-                batch_records, 
+                batch.to_records(), 
                 metadata['year'], 
                 metadata['semesters'], 
                 metadata['exam_types'], 
                 metadata['format'], 
                 doc_id,
-                os.path.basename(pdf_path)  # Add PDF filename
+                pdf_filename,  # Add PDF filename
+                db,
+                uploader,
+                **upload_options
             )
+            totals['saved'] += saved
+            totals['skipped'] += skipped
+            return batch_number, batch, saved, skipped, errors, totals['saved'], totals['skipped']
+        
+        def persist_stage(item):
+            batch_number, batch, saved, skipped, errors, running_saved, running_skipped = item
             
-            # Then append to JSON with the results
-            append_batch_to_json(json_path, batch_records, batch_count, saved, skipped)
-            
-            total_saved += saved
-            total_skipped += skipped
+            # Then append to JSON with the running Firebase totals
+            append_batch_to_json(jsonl_path, batch.to_records(), batch_number, running_saved, running_skipped)
+            totals['students'] += len(batch)
+            totals['batches'] = batch_number
             
             if errors:
-                print(f"⚠️ Batch {batch_count} errors: {errors}")
+                print(f"⚠️ Batch {batch_number} errors: {errors}")
             
-            print(f"✅ Batch {batch_count} complete: {saved} saved, {skipped} skipped")
+            print(f"✅ Batch {batch_number} complete: {saved} saved, {skipped} skipped")
         
-        # Finalize JSON file
-        # Re-read and finalize the JSON structure
-        try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+        def run_batches(batches, batches_to_skip):
+            # Pending batches are numbered from the start of the PDF; a resumed run skips those already saved.
+            # They travel between the stages as ResultBatches; record dicts are only built by the writers
+            def numbered_batches():
+                for batch_number, batch in enumerate(batches, 1):
+                    if batch_number > batches_to_skip:
+                        batch = batch if isinstance(batch, ResultBatch) else ResultBatch(batch)
+                        # Stamped once here, as batch_upload_to_firebase does on the records it uploads
+                        for key in ('pdf_filename', 'source_document'):
+                            batch.set_field(key, pdf_filename, where=lambda student: student.student_id)
+                        yield batch_number, batch
             
-            # Remove trailing comma and close array
-            if content.endswith(',\n'):
-                content = content[:-2] + '\n'
-            content += '\n  ]\n}'
+            # Parsing, Firebase uploads and local writes run concurrently, each in its own thread
+            return run_pipeline(
+                numbered_batches(),
+                [PipelineStage("upload", upload_stage), PipelineStage("persist", persist_stage)],
+                size=lambda item: len(item[1])
+            )
+        
+        try:
+            stages = run_batches(batches, batches_to_skip)
+        except HallTicketReappeared as e:
+            # A valid PDF listing a student twice: parse it again holding every student to the end.
+            # The output starts over, and the students uploaded from this PDF are rewritten, also
+            # those an interrupted run uploaded before this one resumed
+            print(f"⚠️ {e}; re-parsing {pdf_filename} as a whole document")
+            header = load_jsonl_header(jsonl_path)
+            header['metadata'].update(total_students=0, last_batch_processed=0)
+            header['firebase_upload'].update(batches_completed=0, students_saved=0, duplicates_skipped=0)
+            create_jsonl_output(jsonl_path, header['metadata'], header['firebase_upload'])
+            totals.update(students=0, saved=0, skipped=0, batches=0)
+            upload_options['rewrite_own'] = True
             
-            with open(json_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-        except Exception as e:
-            print(f"⚠️ Error finalizing JSON: {e}")
+            if batch_source:
+                grouped_generator = lambda path: batch_source(path, page_log_path, format_name, group_document=True)
+            else:
+                grouped_generator = lambda path: iter_batches(path, BATCH_SIZE, format_name,
+                                                              checkpoint_path=page_log_path, group_document=True)
+            batches = cached_batches(pdf_path, batch_cache_name(format_name), grouped_generator,
+                                     batch_size=BATCH_SIZE, pdf_hash=pdf_hash)
+            stages = run_batches(batches, 0)
+        total_students = totals['students']
+        total_saved = totals['saved']
+        total_skipped = totals['skipped']
+        batch_count = totals['batches']
+        
+        # Materialize the legacy {metadata, students} file read by the app and reports
+        header = load_jsonl_header(jsonl_path)
+        header['metadata']['processing_status'] = "completed"
+        write_jsonl_header(jsonl_path, header)
+        json_path = materialize_json(jsonl_path, remove_stream=True)
+        index_result_file(json_path)
+        archive_result_file(json_path)
+        index_student_offsets(json_path)
         
+        clear_run_checkpoint(page_log_path, manifest_path)
         processing_time = time.time() - start_time
         
         print(f"🎯 PDF Processing Complete!")
@@ -254,14 +531,20 @@ def process_single_pdf(pdf_path, db, bucket):
         print(f"💾 Saved to Firebase: {total_saved}")
         print(f"🔄 Duplicates skipped: {total_skipped}")
         print(f"⏱️ Processing time: {processing_time:.2f} seconds")
+        for stage in stages:
+            summary = stage.summary()
+            print(f"   ⚙️ {stage.name}: {summary['records']} records in {summary['busy_seconds']:.2f}s busy "
+                  f"({summary['records_per_second']:.1f} records/s)")
         print(f"📁 JSON saved: {json_path}")
         
         return {
             'success': True,
+            'format': metadata['format'],
             'total_students': total_students,
             'saved': total_saved,
             'skipped': total_skipped,
             'processing_time': processing_time,
+            'stages': {stage.name: stage.summary() for stage in stages},
             'json_path': json_path
         }
         
@@ -270,18 +553,113 @@ def process_single_pdf(pdf_path, db, bucket):
         return {
             'success': False,
             'error': str(e),
-            'total_students': total_students,
+            'total_students': totals['students'],
             'processing_time': time.time() - start_time
         }
 
+def _parse_worker(pdf_path, page_log_path, batch_queue, cancelled, format_name, group_document=False):
+    """Worker-process side of --jobs: parse one PDF and stream its batches back in columnar form"""
+    try:
+        for batch in iter_batches(pdf_path, BATCH_SIZE, format_name, checkpoint_path=page_log_path,
+                                  group_document=group_document):
+            batch = ResultBatch(batch)  # a third of the pickled size of the record dicts
+            while not cancelled.is_set():
+                try:
+                    batch_queue.put(('batch', batch), timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            if cancelled.is_set():
+                return
+        batch_queue.put(('done', None))
+    except HallTicketReappeared as e:
+        batch_queue.put(('reappeared', (e.htno, str(e))))
+    except Exception as e:
+        batch_queue.put(('error', f"{type(e).__name__}: {e}"))
+
+def remote_batches(executor, manager, pdf_path, page_log_path, format_name, group_document=False):
+    """Yield the batches of a PDF parsed in the executor's worker processes"""
+    batch_queue = manager.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    cancelled = manager.Event()
+    future = executor.submit(_parse_worker, pdf_path, page_log_path, batch_queue, cancelled, format_name,
+                             group_document)
+    try:
+        while True:
+            try:
+                kind, payload = batch_queue.get(timeout=0.5)
+            except queue.Empty:
+                if future.done():
+                    future.result()
+                    raise RuntimeError(f"Parser worker for {os.path.basename(pdf_path)} stopped without finishing")
+                continue
+            if kind == 'done':
+                return
+            if kind == 'reappeared':
+                raise HallTicketReappeared(*payload)
+            if kind == 'error':
+                raise RuntimeError(payload)
+            yield payload  # a ResultBatch, handed through the pipeline as it is
+    finally:
+        # Unblocks the worker if processing stopped early
+        cancelled.set()
+
+def process_pdfs_concurrently(pdf_paths, db, bucket, jobs, max_open_pdfs=None):
+    """Process several PDFs at once, parsing in `jobs` worker processes.
+
+    At most max_open_pdfs PDFs (default: jobs) are open at a time. Every PDF
+    uploads through one shared BatchUploader and writes to the same data/
+    directory. Results are returned in the order of pdf_paths.
+    """
+    max_open_pdfs = max_open_pdfs or jobs
+    # Spawned workers never inherit the Firestore client's gRPC threads
+    context = multiprocessing.get_context('spawn')
+    with context.Manager() as manager, \
+            ProcessPoolExecutor(max_workers=jobs, mp_context=context) as executor, \
+            BatchUploader(db) as uploader, \
+            ThreadPoolExecutor(max_workers=max_open_pdfs) as pdf_threads:
+        batch_source = partial(remote_batches, executor, manager)
+        futures = [pdf_threads.submit(process_single_pdf, pdf_path, db, bucket, uploader, batch_source)
+                   for pdf_path in pdf_paths]
+        results = [{'pdf': os.path.basename(pdf_path), 'result': future.result()}
+                   for pdf_path, future in zip(pdf_paths, futures)]
+    return results
+
+def write_summary(results, total_time, jobs, summary_path=SUMMARY_PATH):
+    """Write the consolidated per-PDF results of a batch run"""
+    summary = {
+        "generated_at": datetime.now().isoformat(),
+        "jobs": jobs,
+        "total_time": round(total_time, 2),
+        "pdfs_processed": len(results),
+        "successful": sum(1 for r in results if r['result'].get('success', False)),
+        "total_students": sum(r['result'].get('total_students', 0) for r in results),
+        "total_saved": sum(r['result'].get('saved', 0) for r in results),
+        "total_skipped": sum(r['result'].get('skipped', 0) for r in results),
+        "results": results
+    }
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    return summary_path
+
 def main():
     """Main batch processing function"""
+    arg_parser = argparse.ArgumentParser(description="Parse and upload every JNTUK result PDF in the current directory")
+    arg_parser.add_argument("--jobs", type=int, default=1,
+                            help="PDFs to parse at once in worker processes (default: 1, sequential)")
+    arg_parser.add_argument("--max-open-pdfs", type=int, default=None,
+                            help="Cap on PDFs open at the same time in --jobs mode (default: --jobs)")
+    args = arg_parser.parse_args()
+    
+
     print("🚀 Starting Optimized Batch PDF Processing")
     print("=" * 60)
     
     # Setup Firebase
     db, bucket = setup_firebase()
     
+    stats = cache_stats()
+    print(f"📦 Parse cache: {stats['entries']} entries ({stats['total_bytes'] / 1024 / 1024:.1f} MB)")
+    
     # Find all PDF files and deduplicate
     pdf_files = []
     pdf_patterns = [
@@ -313,16 +691,22 @@ def main():
     results = []
     total_start_time = time.time()
     
-    for i, pdf_path in enumerate(jntuk_pdfs, 1):
-        print(f"\n{'='*60}")
-        print(f"📄 Processing PDF {i}/{len(jntuk_pdfs)}")
-        print(f"{'='*60}")
-        
-        result = process_single_pdf(pdf_path, db, bucket)
-        results.append({
-            'pdf': os.path.basename(pdf_path),
-            'result': result
-        })
+    if args.jobs > 1:
+        print(f"\n⚡ Processing {len(jntuk_pdfs)} PDFs with {args.jobs} parser processes")
+        results = process_pdfs_concurrently(jntuk_pdfs, db, bucket, args.jobs, args.max_open_pdfs)
+    else:
+        # One uploader for the whole run bounds the commits in flight
+        with BatchUploader(db) as uploader:
+            for i, pdf_path in enumerate(jntuk_pdfs, 1):
+                print(f"\n{'='*60}")
+                print(f"📄 Processing PDF {i}/{len(jntuk_pdfs)}")
+                print(f"{'='*60}")
+                
+                result = process_single_pdf(pdf_path, db, bucket, uploader)
+                results.append({
+                    'pdf': os.path.basename(pdf_path),
+                    'result': result
+                })
     
     # Summary
     total_time = time.time() - total_start_time
@@ -353,6 +737,8 @@ def main():
             print(f"✅ {pdf_name}: {res.get('total_students', 0)} students, {res.get('processing_time', 0):.1f}s")
         else:
             print(f"❌ {pdf_name}: FAILED - {res.get('error', 'Unknown error')}")
+    
+    print(f"\n📄 Summary saved: {write_summary(results, total_time, args.jobs)}")
 
 if __name__ == "__main__":
     main()
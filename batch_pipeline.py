@@ -0,0 +1,118 @@
+"""
+Threaded stage pipeline for batch processing
+A source iterable and each stage run in their own thread, connected by bounded
+queues, so CPU-bound parsing overlaps network and disk I/O
+"""
+
+import queue
+import threading
+import time
+
+PIPELINE_QUEUE_SIZE = 4  # batches buffered between two stages
+
+_DONE = object()
+_POLL_INTERVAL = 0.1  # seconds between checks for a stopped stage
+
+class PipelineStage:
+    """One pipeline stage and its throughput counters"""
+
+    def __init__(self, name, func=None):
+        self.name = name
+        self.func = func
+        self.batches = 0
+        self.records = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def records_per_second(self):
+        return self.records / self.busy_seconds if self.busy_seconds else 0.0
+
+    def summary(self):
+        return {
+            "batches": self.batches,
+            "records": self.records,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "records_per_second": round(self.records_per_second, 1)
+        }
+
+def run_pipeline(source, stages, source_name="parse", size=len, queue_size=PIPELINE_QUEUE_SIZE):
+    """Feed items from source through stages, each stage in its own thread.
+
+    Every stage's func receives the previous stage's return value (the first
+    stage receives source items), in source order. size(item) counts the
+    records in a source item for the throughput figures. If the source or a
+    stage raises, the stages before it stop while the stages after it finish
+    the items already handed to them; the first error is then re-raised here.
+    Returns the PipelineStage counters, source first.
+    """
+    source_stage = PipelineStage(source_name)
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    closed = [threading.Event() for _ in stages]  # set once nobody reads the queue any more
+    errors = []
+
+    def put(index, entry):
+        # Blocks while the next stage is behind; gives up if it has stopped
+        while not closed[index].is_set():
+            try:
+                queues[index].put(entry, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(source)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    source_stage.busy_seconds += time.perf_counter() - start
+                records = size(item)
+                source_stage.batches += 1
+                source_stage.records += records
+                if not put(0, (item, records)):
+                    return
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            if hasattr(iterator, 'close'):
+                iterator.close()
+        put(0, _DONE)
+
+    def consume(index, stage):
+        has_outbox = index + 1 < len(queues)
+        try:
+            while True:
+                entry = queues[index].get()
+                if entry is _DONE:
+                    break
+                item, records = entry
+                start = time.perf_counter()
+                result = stage.func(item)
+                stage.busy_seconds += time.perf_counter() - start
+                stage.batches += 1
+                stage.records += records
+                if has_outbox and not put(index + 1, (result, records)):
+                    break
+        except BaseException as e:
+            errors.append(e)
+        # Stop the stages feeding this one, and let the ones after it drain
+        closed[index].set()
+        if has_outbox:
+            put(index + 1, _DONE)
+
+    threads = [threading.Thread(target=produce, name=f"pipeline-{source_name}", daemon=True)]
+    threads += [threading.Thread(target=consume, args=(i, stage), name=f"pipeline-{stage.name}", daemon=True)
+                for i, stage in enumerate(stages)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return [source_stage] + list(stages)
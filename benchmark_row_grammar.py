@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the JNTUK line-based fallback
+Times the compiled single-pass row grammar against the previous per-token
+re.match classifier on the text lines of the sample PDFs, and checks that both
+produce the same rows
+"""
+
+import argparse
+import glob
+import re
+import time
+
+from parser.parser_jntuk import _parse_result_line
+from parser.pdf_engines import open_pdf
+
+def legacy_parse_result_line(line):
+    """The classifier used before the compiled grammar, kept for comparison"""
+    if not line.strip() or 'Htno' in line or 'Subcode' in line:
+        return None
+    parts = line.strip().split()
+    if len(parts) >= 6:
+        try:
+            if len(parts) > 1 and len(str(parts[1])) == 10 and re.match(r'\d{2}[A-Z0-9]{8}', str(parts[1])):
+                htno = parts[1]
+                subcode = parts[2] if len(parts) > 2 else ""
+                credits = parts[-1]
+                grade = parts[-2]
+                internals = parts[-3]
+
+                if (re.match(r'\d+|ABSENT', str(internals)) and
+                    re.match(r'[A-F][\+\-]?|MP|ABSENT|S|COMPLE', str(grade)) and
+                    re.match(r'\d+(?:\.\d+)?', str(credits))):
+
+                    internals_val = 0 if str(internals) == 'ABSENT' else int(internals)
+                    credits_val = float(credits)
+                    subname_parts = parts[3:-3] if len(parts) > 6 else []
+                    subname = ' '.join(subname_parts)
+
+                    return (
+                        htno,
+                        str(subcode).strip(),
+                        subname.strip(),
+                        internals_val,
+                        str(grade).strip(),
+                        credits_val
+                    )
+        except (ValueError, IndexError, AttributeError):
+            return None
+    return None
+
+def compiled_parse_result_line(line):
+    if 'Htno' in line or 'Subcode' in line:
+        return None
+    return _parse_result_line(line)
+
+def load_lines(pdf_paths, engine):
+    lines = []
+    for pdf_path in pdf_paths:
+        with open_pdf(pdf_path, engine) as pdf:
+            for page in pdf.pages:
+                text = page.extract_text()
+                if text:
+                    lines.extend(text.split('\n'))
+    return lines
+
+def time_classifier(classify, lines, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            classify(line)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('pdfs', nargs='*', help="PDFs to read lines from (default: sample PDFs)")
+    arg_parser.add_argument('--engine', default='pymupdf', help="extraction engine (default: pymupdf)")
+    arg_parser.add_argument('--repeat', type=int, default=5, help="timed runs, best one is reported")
+    args = arg_parser.parse_args()
+
+    pdf_paths = args.pdfs or sorted(glob.glob('*.pdf'))
+    lines = load_lines(pdf_paths, args.engine)
+    rows = sum(1 for line in lines if compiled_parse_result_line(line))
+    print(f"📄 {len(lines)} lines ({rows} result rows) from {len(pdf_paths)} PDFs")
+
+    mismatches = sum(1 for line in lines if legacy_parse_result_line(line) != compiled_parse_result_line(line))
+    if mismatches:
+        print(f"❌ {mismatches} lines classified differently")
+    else:
+        print("✅ Both classifiers produce identical rows")
+
+    legacy_time = time_classifier(legacy_parse_result_line, lines, args.repeat)
+    compiled_time = time_classifier(compiled_parse_result_line, lines, args.repeat)
+    print(f"🐢 Legacy:   {len(lines) / legacy_time:>12,.0f} lines/sec")
+    print(f"🚀 Compiled: {len(lines) / compiled_time:>12,.0f} lines/sec ({legacy_time / compiled_time:.1f}x)")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,109 @@
+"""
+Shared in-process cache of decoded result files from data/
+Entries are validated against the file's st_mtime_ns and size, so a rewritten
+file is reloaded on the next access and never served stale
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Budget for decoded documents in memory; DATA_CACHE_MAX_MB overrides it
+DEFAULT_MAX_BYTES = int(float(os.environ.get('DATA_CACHE_MAX_MB', 64)) * 1024 * 1024)
+# Decoded result files take about 2x their size on disk when written with indent=2
+# and 3.4x when written compactly (measured with tracemalloc on data/); entries
+# are charged with the upper bound
+DECODED_SIZE_FACTOR = 3.5
+
+def decoded_size_estimate(file_size):
+    """Estimated memory of a decoded result file, in bytes"""
+    return int(file_size * DECODED_SIZE_FACTOR)
+
+class DataFileCache:
+    """LRU cache of decoded JSON documents under a memory budget.
+
+    The budget is charged with each file's estimated decoded size (see
+    DECODED_SIZE_FACTOR). Cached documents are shared between callers and must
+    be treated as read-only.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # path -> (mtime_ns, size, document, decode_error, charged bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def load(self, path):
+        """Return the decoded JSON document at path, from memory if the file is unchanged"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                if entry[3]:
+                    raise entry[3]
+                return entry[2]
+            self.misses += 1
+
+        # Malformed files are remembered too, so they are not re-parsed until they change
+        document, decode_error = None, None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                document = json.load(f)
+        except ValueError as e:
+            decode_error = e
+
+        with self._lock:
+            self._discard(path)
+            charge = decoded_size_estimate(stat.st_size)
+            if charge <= self.max_bytes:
+                self._entries[path] = (stat.st_mtime_ns, stat.st_size, document, decode_error, charge)
+                self._bytes += charge
+                while self._bytes > self.max_bytes:
+                    oldest = next(iter(self._entries))
+                    self._discard(oldest)
+                    self.evictions += 1
+        if decode_error:
+            raise decode_error
+        return document
+
+    def _discard(self, path):
+        entry = self._entries.pop(path, None)
+        if entry:
+            self._bytes -= entry[4]
+
+    def invalidate(self, path=None):
+        """Forget one file, or everything if no path is given"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                self._discard(os.path.abspath(path))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+# Shared by the Flask handlers and the results index
+data_cache = DataFileCache()
+
+def load_data_file(path):
+    """Load a data/ JSON file through the shared cache"""
+    return data_cache.load(path)
@@ -0,0 +1,196 @@
+"""
+Bulk Firestore helpers for result uploads
+Resolve which students already exist with a few chunked reads instead of one
+query per record, and write only the missing ones through WriteBatches that
+are committed concurrently
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from google.api_core.exceptions import Aborted, DeadlineExceeded
+    RETRYABLE_ERRORS = (Aborted, DeadlineExceeded)
+except ImportError:
+    RETRYABLE_ERRORS = ()
+
+STUDENT_COLLECTION = 'student_results'
+
+GET_ALL_CHUNK = 100    # document references resolved per get_all() call
+IN_QUERY_LIMIT = 30    # Firestore caps 'in' filters at 30 values
+MAX_BATCH_WRITES = 500 # Firestore caps a WriteBatch at 500 writes
+
+MAX_IN_FLIGHT = 4      # concurrent batch commits
+COMMIT_RETRIES = 5     # extra attempts for ABORTED / DEADLINE_EXCEEDED commits
+RETRY_BASE_DELAY = 0.5 # seconds, doubled per attempt before jitter
+RETRY_MAX_DELAY = 8.0
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def existing_document_ids(db, doc_ids, collection=STUDENT_COLLECTION):
+    """Return the subset of doc_ids that already exist, using chunked get_all() reads"""
+    collection_ref = db.collection(collection)
+    unique_ids = list(dict.fromkeys(doc_ids))
+    existing = set()
+    for chunk in _chunks(unique_ids, GET_ALL_CHUNK):
+        refs = [collection_ref.document(doc_id) for doc_id in chunk]
+        for snapshot in db.get_all(refs):
+            if snapshot.exists:
+                existing.add(snapshot.id)
+    return existing
+
+def existing_field_values(db, field, values, collection=STUDENT_COLLECTION):
+    """Return the subset of values stored in field by any document, one 'in' query per 30 values"""
+    collection_ref = db.collection(collection)
+    unique_values = list(dict.fromkeys(values))
+    existing = set()
+    for chunk in _chunks(unique_values, IN_QUERY_LIMIT):
+        for doc in collection_ref.where(field, 'in', chunk).stream():
+            existing.add(doc.to_dict().get(field))
+    return existing
+
+class BatchUploader:
+    """Commit WriteBatches on a thread pool with at most max_in_flight commits running.
+
+    add() blocks once max_in_flight full batches are being committed, so a fast
+    producer never queues more than that in memory. Commits failing with
+    ABORTED or DEADLINE_EXCEEDED are retried with jittered exponential backoff;
+    any other failure (or running out of retries) counts the whole batch as
+    failed. on_commit(uploader, batch_number, batch_size) is called from the
+    worker thread after each successful commit. One uploader can be shared by
+    several threads through submit().
+    """
+
+    def __init__(self, db, collection=STUDENT_COLLECTION, max_in_flight=MAX_IN_FLIGHT,
+                 batch_size=MAX_BATCH_WRITES, retries=COMMIT_RETRIES, retry_base_delay=RETRY_BASE_DELAY,
+                 on_commit=None):
+        self.db = db
+        self.collection_ref = db.collection(collection)
+        self.batch_size = batch_size
+        self.retries = retries
+        self.retry_base_delay = retry_base_delay
+        self.on_commit = on_commit
+
+        self.saved = 0
+        self.failed = 0
+        self.batches_committed = 0
+        self.batches_failed = 0
+        self.retried = 0
+        self.errors = []
+
+        self._pending = []
+        self._batch_number = 0
+        self._lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+
+    def add(self, doc_id, data):
+        """Queue one document; a doc_id of None gets an auto-generated ID, like collection.add()"""
+        with self._pending_lock:
+            self._pending.append((doc_id, data))
+            if len(self._pending) < self.batch_size:
+                return
+            documents, self._pending = self._pending, []
+        self.submit(documents)
+
+    def flush(self):
+        """Submit the queued documents as one batch"""
+        with self._pending_lock:
+            documents, self._pending = self._pending, []
+        if documents:
+            self.submit(documents)
+
+    def submit(self, documents):
+        """Commit (doc_id, data) pairs as one batch, waiting for a free commit slot.
+
+        Returns a future resolving to (saved, error); error is None on success.
+        """
+        with self._lock:
+            self._batch_number += 1
+            batch_number = self._batch_number
+        self._slots.acquire()
+        future = self._executor.submit(self._commit, batch_number, documents)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _commit(self, batch_number, documents):
+        # Auto IDs are drawn once, so a retry after an ambiguous DEADLINE_EXCEEDED
+        # rewrites the same documents instead of adding copies under new IDs
+        writes = [(self.collection_ref.document(doc_id) if doc_id else self.collection_ref.document(), data)
+                  for doc_id, data in documents]
+        for attempt in range(self.retries + 1):
+            # A fresh WriteBatch per attempt; a failed one cannot be committed again
+            batch = self.db.batch()
+            for ref, data in writes:
+                batch.set(ref, data)
+            try:
+                batch.commit()
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.retries:
+                    return self._record_failure(batch_number, documents, e)
+                with self._lock:
+                    self.retried += 1
+                delay = min(RETRY_MAX_DELAY, self.retry_base_delay * 2 ** attempt)
+                time.sleep(random.uniform(delay / 2, delay))
+                continue
+            except Exception as e:
+                return self._record_failure(batch_number, documents, e)
+
+            with self._lock:
+                self.saved += len(documents)
+                self.batches_committed += 1
+            if self.on_commit:
+                self.on_commit(self, batch_number, len(documents))
+            return len(documents), None
+
+    def _record_failure(self, batch_number, documents, error):
+        message = f"Batch {batch_number} commit failed for {len(documents)} documents: {str(error)}"
+        with self._lock:
+            self.failed += len(documents)
+            self.batches_failed += 1
+            self.errors.append(message)
+        return 0, message
+
+    def close(self):
+        """Commit anything still queued and wait for every in-flight batch"""
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type:
+            # The producer failed; still wait for in-flight commits but queue nothing new
+            self._pending = []
+        self.close()
+
+def write_documents(db, documents, collection=STUDENT_COLLECTION, uploader=None):
+    """Write (doc_id, data) pairs with one WriteBatch per 500 documents.
+
+    A doc_id of None gets an auto-generated ID, like collection.add(). Pass a
+    shared uploader to bound commits across callers; it must write to the same
+    collection. Returns (saved, errors); a failed commit loses only its own batch.
+    """
+    if uploader is None:
+        with BatchUploader(db, collection) as uploader:
+            for doc_id, data in documents:
+                uploader.add(doc_id, data)
+        return uploader.saved, uploader.errors
+
+    futures = [uploader.submit(chunk) for chunk in _chunks(documents, uploader.batch_size)]
+    saved = 0
+    errors = []
+    for future in futures:
+        batch_saved, error = future.result()
+        saved += batch_saved
+        if error:
+            errors.append(error)
+    return saved, errors
@@ -9,6 +9,8 @@ import os
 from pathlib import Path
 from datetime import datetime
 
+from results_index import list_result_files
+
 def generate_data_files_report():
     """Generate a comprehensive report of all data files"""
     data_dir = Path("data")
@@ -22,7 +24,8 @@ def generate_data_files_report():
         print("❌ Data directory not found!")
         return
     
-    json_files = list(data_dir.glob("*.json"))
+    # Metadata, counts and upload status come from the results catalog
+    json_files = list_result_files(data_dir)
     if not json_files:
         print("❌ No JSON files found!")
         return
@@ -38,18 +41,17 @@ def generate_data_files_report():
     print("\n📋 File Details:")
     print("-" * 60)
     
-    for i, json_file in enumerate(sorted(json_files), 1):
+    for i, json_file in enumerate(json_files, 1):
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if json_file["error"]:
+                raise ValueError(json_file["error"])
             
-            metadata = data.get("metadata", {})
-            firebase_upload = data.get("firebase_upload", {})
-            students = data.get("students", [])
+            metadata = json_file["metadata"]
+            firebase_upload = json_file["firebase_upload"]
             
             format_type = metadata.get("format", "unknown")
             exam_type = metadata.get("exam_type", "unknown")
-            student_count = len(students)
+            student_count = json_file["student_count"]
             is_uploaded = firebase_upload.get("uploaded", False)
             original_filename = metadata.get("original_filename", "N/A")
             
@@ -65,14 +67,14 @@ def generate_data_files_report():
             
             # File info
             status = "✅ Uploaded" if is_uploaded else "⏳ Not Uploaded"
-            print(f"{i:2d}. {json_file.name}")
+            print(f"{i:2d}. {json_file['filename']}")
             print(f"    📄 Original: {original_filename}")
             print(f"    📊 Format: {format_type.upper()} | Type: {exam_type.upper()}")
             print(f"    👥 Students: {student_count} | Status: {status}")
             print()
             
         except Exception as e:
-            print(f"{i:2d}. {json_file.name} - ❌ Error: {e}")
+            print(f"{i:2d}. {json_file['filename']} - ❌ Error: {e}")
             print()
     
     # Summary statistics
@@ -115,30 +117,29 @@ def generate_data_files_report():
         "files": []
     }
     
-    for json_file in sorted(json_files):
+    for json_file in json_files:
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if json_file["error"]:
+                raise ValueError(json_file["error"])
             
-            metadata = data.get("metadata", {})
-            firebase_upload = data.get("firebase_upload", {})
-            students = data.get("students", [])
+            metadata = json_file["metadata"]
+            firebase_upload = json_file["firebase_upload"]
             
             file_info = {
-                "filename": json_file.name,
+                "filename": json_file["filename"],
                 "original_filename": metadata.get("original_filename", "N/A"),
                 "format": metadata.get("format", "unknown"),
                 "exam_type": metadata.get("exam_type", "unknown"),
-                "student_count": len(students),
+                "student_count": json_file["student_count"],
                 "processed_at": metadata.get("processed_at", ""),
                 "uploaded": firebase_upload.get("uploaded", False),
-                "file_size_kb": round(json_file.stat().st_size / 1024, 2)
+                "file_size_kb": round(json_file["size"] / 1024, 2)
             }
             report_data["files"].append(file_info)
             
         except Exception as e:
             file_info = {
-                "filename": json_file.name,
+                "filename": json_file["filename"],
                 "error": str(e),
                 "status": "corrupted"
             }
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Append-only JSON Lines output for batch processing
+Students are appended one per line to <name>.jsonl while a small <name>.jsonl.meta
+sidecar holds the metadata and upload counters; materialize_json() writes the
+legacy {metadata, firebase_upload, students} document from them on demand
+
+Usage:
+    python jsonl_output.py materialize <file.jsonl> [<file.jsonl> ...]
+"""
+
+import argparse
+import json
+import os
+
+HEADER_SUFFIX = '.meta'
+
+def _encode(record):
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+
+def header_path(jsonl_path):
+    return f"{jsonl_path}{HEADER_SUFFIX}"
+
+def legacy_json_path(jsonl_path):
+    """data/parsed_results_x.jsonl -> data/parsed_results_x.json"""
+    return f"{os.path.splitext(jsonl_path)[0]}.json"
+
+def write_jsonl_header(jsonl_path, header):
+    """Atomically replace the header sidecar"""
+    tmp_path = f"{header_path(jsonl_path)}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(header, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, header_path(jsonl_path))
+
+def create_jsonl_output(jsonl_path, metadata, firebase_upload):
+    """Start an empty record stream with its header sidecar"""
+    open(jsonl_path, 'w', encoding='utf-8').close()
+    header = {
+        "metadata": metadata,
+        "firebase_upload": firebase_upload,
+        "committed_bytes": 0
+    }
+    write_jsonl_header(jsonl_path, header)
+    return header
+
+def load_jsonl_header(jsonl_path):
+    """Read the header sidecar; lines past committed_bytes are not part of the output yet"""
+    with open(header_path(jsonl_path), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def discard_uncommitted(jsonl_path, header):
+    """Drop records appended after the last header commit, before resuming a run"""
+    if os.path.getsize(jsonl_path) > header["committed_bytes"]:
+        # A batch was interrupted between appending its records and updating the header
+        with open(jsonl_path, 'r+b') as f:
+            f.truncate(header["committed_bytes"])
+
+def append_jsonl_batch(jsonl_path, header, records):
+    """Append records, then commit the updated header; only the new lines are written"""
+    with open(jsonl_path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(_encode(record))
+            f.write('\n')
+        f.flush()
+        os.fsync(f.fileno())
+        header["committed_bytes"] = f.tell()
+    write_jsonl_header(jsonl_path, header)
+
+def iter_jsonl_records(jsonl_path, header=None):
+    """Yield committed records in order"""
+    header = header or load_jsonl_header(jsonl_path)
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        remaining = header["committed_bytes"]
+        for line in f:
+            remaining -= len(line.encode('utf-8'))
+            if remaining < 0:
+                break
+            yield json.loads(line)
+
+def read_jsonl_document(jsonl_path, offset=0, limit=None, student_id=None):
+    """The {metadata, firebase_upload, students} document of a run still being written.
+
+    Only committed records are read. student_id keeps the records of one
+    student; offset and limit slice the students and add "pagination", as
+    results_offsets.read_students_page() does for finished files.
+    """
+    header = load_jsonl_header(jsonl_path)
+    document = {"metadata": header["metadata"], "firebase_upload": header["firebase_upload"]}
+    records = iter_jsonl_records(jsonl_path, header)
+    if student_id is not None:
+        document["students"] = [record for record in records if record.get("student_id") == student_id]
+        return document
+
+    students = []
+    total = 0
+    for total, record in enumerate(records, 1):
+        if total > offset and (limit is None or len(students) < limit):
+            students.append(record)
+    document["students"] = students
+    if offset or limit is not None:
+        document["pagination"] = {"offset": offset, "limit": limit, "total": total, "returned": len(students)}
+    return document
+
+def materialize_json(jsonl_path, json_path=None, remove_stream=False):
+    """Write the legacy {metadata, firebase_upload, students} JSON document.
+
+    Records are copied line by line, so the whole student list is never held in
+    memory. Returns the path of the written document.
+    """
+    json_path = json_path or legacy_json_path(jsonl_path)
+    header = load_jsonl_header(jsonl_path)
+
+    tmp_path = f"{json_path}.tmp"
+    with open(jsonl_path, 'r', encoding='utf-8') as src, open(tmp_path, 'w', encoding='utf-8') as out:
+        out.write('{\n')
+        for key in ("metadata", "firebase_upload"):
+            body = json.dumps(header[key], indent=2, ensure_ascii=False).replace('\n', '\n  ')
+            out.write(f'  "{key}": {body},\n')
+        out.write('  "students": [')
+
+        remaining = header["committed_bytes"]
+        separator = '\n    '
+        for line in src:
+            remaining -= len(line.encode('utf-8'))
+            if remaining < 0:
+                break
+            out.write(separator)
+            out.write(line.rstrip('\n'))
+            separator = ',\n    '
+        out.write('\n  ]\n}\n' if separator != '\n    ' else ']\n}\n')
+    os.replace(tmp_path, json_path)
+
+    if remove_stream:
+        for path in (jsonl_path, header_path(jsonl_path)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return json_path
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Convert JSON Lines batch output to legacy JSON result files")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    materialize_cmd = commands.add_parser("materialize", help="Write <name>.json next to each <name>.jsonl")
+    materialize_cmd.add_argument("files", nargs="+", help="JSON Lines outputs to materialize")
+    args = arg_parser.parse_args()
+
+    for jsonl_path in args.files:
+        if not os.path.exists(header_path(jsonl_path)):
+            print(f"❌ No header found for: {jsonl_path}")
+            continue
+        print(f"📁 Materialized: {materialize_json(jsonl_path)}")
+
+if __name__ == "__main__":
+    main()
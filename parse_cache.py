@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Content-hash parse cache for uploaded result PDFs
+Stores parsed student records keyed by the SHA-256 of the PDF bytes plus the parser version
+and the PDF extraction engine
+
+Usage:
+    python parse_cache.py stats
+    python parse_cache.py invalidate <pdf> [<pdf> ...]
+    python parse_cache.py clear
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+from parser.parser_autonomous_dynamic import PARSER_VERSION as AUTONOMOUS_PARSER_VERSION
+from parser.pdf_engines import resolve_engine
+from parser.registry import FORMATS
+from parser.result_batch import ResultBatch
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'parsed')
+MAX_CACHE_BYTES = 256 * 1024 * 1024  # 256 MB
+CACHE_SUFFIX = '.jsonl.gz'
+
+# Parser name -> version, one per registered format; a format with its own batch
+# generator yields different records than its one-shot parser, so its batches
+# get their own "<name>_batch" namespace
+PARSER_VERSIONS = {'autonomous': AUTONOMOUS_PARSER_VERSION}  # results parsed before the format registry
+for _name, _result_format in FORMATS.items():
+    PARSER_VERSIONS[_name] = _result_format.version
+    if _result_format.batches:
+        PARSER_VERSIONS[f"{_name}_batch"] = _result_format.version
+
+_lock = threading.Lock()
+
+def file_sha256(file_path):
+    """Hash the PDF bytes in 1 MB chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def batch_cache_name(format_name):
+    """Cache namespace for the batches of a registered format"""
+    return f"{format_name}_batch" if FORMATS[format_name].batches else format_name
+
+def _entry_path(pdf_hash, parser_name, engine=None):
+    """Entry of a PDF for one parser, version and extraction engine (None is the default engine)"""
+    version = PARSER_VERSIONS.get(parser_name)
+    if version is None:
+        raise ValueError(f"Unknown parser '{parser_name}'. Must be one of: {', '.join(PARSER_VERSIONS)}")
+    return os.path.join(CACHE_DIR, f"{pdf_hash}_{parser_name}_{resolve_engine(engine)}_v{version}{CACHE_SUFFIX}")
+
+def _read_entry(entry_path):
+    """Read one cached entry and refresh its LRU timestamp; None if missing or unreadable"""
+    try:
+        with gzip.open(entry_path, 'rt', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Discarding unreadable cache entry {os.path.basename(entry_path)}: {e}")
+        _remove(entry_path)
+        return None
+
+    try:
+        os.utime(entry_path, None)
+    except OSError:
+        pass
+
+    # Cached records keep the parse date; a re-upload is uploaded today
+    upload_date = datetime.now().strftime("%Y-%m-%d")
+    for record in records:
+        if 'upload_date' in record:
+            record['upload_date'] = upload_date
+    return records
+
+def _write_entry(entry_path, lines):
+    """Atomically write pre-encoded JSON lines and evict old entries if over budget"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{entry_path}.{threading.get_ident()}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        for line in lines:
+            f.write(line)
+            f.write('\n')
+    os.replace(tmp_path, entry_path)
+    evict_to_size()
+
+def _encode(record):
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
+
+def load_cached_results(file_path, parser_name, pdf_hash=None, engine=None):
+    """Return cached records for this PDF, parser and engine, or None on a miss"""
+    pdf_hash = pdf_hash or file_sha256(file_path)
+    return _read_entry(_entry_path(pdf_hash, parser_name, engine))
+
+def save_cached_results(file_path, parser_name, records, pdf_hash=None, engine=None):
+    """Store parsed records for this PDF, parser and engine"""
+    pdf_hash = pdf_hash or file_sha256(file_path)
+    _write_entry(_entry_path(pdf_hash, parser_name, engine), [_encode(record) for record in records])
+
+def cached_parse(file_path, parser_name, parse_func, pdf_hash=None, engine=None):
+    """Return parse_func(file_path), served from the cache when the same PDF was parsed before.
+
+    engine is the extraction engine parse_func uses; records extracted by one
+    engine are never served to callers of another.
+    """
+    pdf_hash = pdf_hash or file_sha256(file_path)
+    records = load_cached_results(file_path, parser_name, pdf_hash, engine)
+    if records is not None:
+        print(f"⚡ Parse cache hit ({parser_name}): {len(records)} records for {pdf_hash[:12]}")
+        return records
+
+    print(f"🔍 Parse cache miss ({parser_name}) for {pdf_hash[:12]}")
+    records = parse_func(file_path)
+    if records:
+        save_cached_results(file_path, parser_name, records, pdf_hash, engine)
+    return records
+
+def cached_batches(file_path, parser_name, batch_generator, batch_size, pdf_hash=None, engine=None):
+    """Yield record batches from the cache, or from batch_generator(file_path) on a miss.
+
+    On a miss each batch is snapshotted before it is handed on (consumers add
+    Firebase fields to the records), and the entry is only written once the
+    generator has been fully consumed. Batches may be lists of records or
+    ResultBatches; they are handed on as they came. engine is the extraction
+    engine batch_generator uses, as in cached_parse().
+    """
+    pdf_hash = pdf_hash or file_sha256(file_path)
+    records = load_cached_results(file_path, parser_name, pdf_hash, engine)
+    if records is not None:
+        print(f"⚡ Parse cache hit ({parser_name}): {len(records)} records for {pdf_hash[:12]}")
+        for i in range(0, len(records), batch_size):
+            yield records[i:i + batch_size]
+        return
+
+    print(f"🔍 Parse cache miss ({parser_name}) for {pdf_hash[:12]}")
+    lines = []
+    for batch in batch_generator(file_path):
+        records = batch.to_records() if isinstance(batch, ResultBatch) else batch
+        lines.extend(_encode(record) for record in records)
+        yield batch
+
+    if lines:
+        _write_entry(_entry_path(pdf_hash, parser_name, engine), lines)
+
+def _cache_entries():
+    """List (path, size, last_used) for every cache entry, least recently used first"""
+    if not os.path.isdir(CACHE_DIR):
+        return []
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith(CACHE_SUFFIX):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((path, stat.st_size, stat.st_mtime))
+    entries.sort(key=lambda entry: entry[2])
+    return entries
+
+def evict_to_size(max_bytes=None):
+    """Remove least recently used entries until the cache fits in max_bytes"""
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    with _lock:
+        entries = _cache_entries()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for path, size, _ in entries:
+            if total <= max_bytes:
+                break
+            if _remove(path):
+                total -= size
+                evicted += 1
+        if evicted:
+            print(f"🧹 Evicted {evicted} parse cache entries ({total / 1024 / 1024:.1f} MB left)")
+        return evicted
+
+def invalidate(file_path=None):
+    """Drop cached results for one PDF (every parser and version), or everything if no path is given"""
+    prefix = f"{file_sha256(file_path)}_" if file_path else ""
+    removed = 0
+    with _lock:
+        for path, _, _ in _cache_entries():
+            if os.path.basename(path).startswith(prefix) and _remove(path):
+                removed += 1
+    return removed
+
+def cache_stats():
+    entries = _cache_entries()
+    return {
+        "entries": len(entries),
+        "total_bytes": sum(size for _, size, _ in entries),
+        "max_bytes": MAX_CACHE_BYTES,
+        "cache_dir": CACHE_DIR
+    }
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Manage the parsed-PDF result cache")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Show cache size and entry count")
+    invalidate_cmd = commands.add_parser("invalidate", help="Drop cached results for specific PDFs")
+    invalidate_cmd.add_argument("pdfs", nargs="+", help="PDF files whose cached results should be removed")
+    commands.add_parser("clear", help="Drop every cached result")
+    args = arg_parser.parse_args()
+
+    if args.command == "stats":
+        stats = cache_stats()
+        print(f"📦 Parse cache: {stats['entries']} entries, "
+              f"{stats['total_bytes'] / 1024 / 1024:.2f} MB of {stats['max_bytes'] / 1024 / 1024:.0f} MB")
+        print(f"📁 Location: {stats['cache_dir']}")
+    elif args.command == "invalidate":
+        for pdf in args.pdfs:
+            if not os.path.exists(pdf):
+                print(f"❌ PDF not found: {pdf}")
+                continue
+            print(f"🗑️ {os.path.basename(pdf)}: removed {invalidate(pdf)} cache entries")
+    elif args.command == "clear":
+        print(f"🗑️ Removed {invalidate()} cache entries")
+
+if __name__ == "__main__":
+    main()
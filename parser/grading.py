@@ -0,0 +1,103 @@
+"""
+Shared SGPA engine for the result parsers.
+
+The grades and credits of a whole batch of students are flattened into NumPy
+arrays of grade codes and credits, so SGPA, credits, pass status and backlog
+counts for every student come out of one vectorized pass. Regrading historic
+records after a regulation change is the same single call on all of them.
+"""
+
+import numpy as np
+
+# 10-point grade scales, grade -> points; grades not listed score 0
+JNTUK_SCALE = {
+    'S': 10, 'A+': 9, 'A': 8, 'B+': 7, 'B': 6,
+    'C': 5, 'D': 4, 'F': 0, 'MP': 0, 'ABSENT': 0
+}
+R16_SCALE = {'O': 10, 'S': 9, 'A': 8, 'B': 7, 'C': 6, 'D': 5, 'F': 0, 'ABSENT': 0}
+R19_SCALE = {'S': 10, 'A': 9, 'B': 8, 'C': 7, 'D': 6, 'E': 5, 'F': 0, 'ABSENT': 0}
+
+GRADE_SCALES = {
+    "jntuk": JNTUK_SCALE,  # the table the JNTUK parser has always used
+    "R16": R16_SCALE,
+    "R19": R19_SCALE,
+    "R20": R19_SCALE,
+    "R23": R19_SCALE
+}
+DEFAULT_REGULATION = "jntuk"
+
+# Grades that leave a backlog; "NOT CO" is how the tables truncate NOT COMPLETED
+FAIL_GRADES = frozenset({'F', 'ABSENT', 'MP', 'NOT CO'})
+
+_TIE_TOLERANCE = 1e-6
+
+def _resolve_scale(regulation):
+    if isinstance(regulation, dict):
+        return regulation
+    try:
+        return GRADE_SCALES[regulation]
+    except KeyError:
+        raise ValueError(f"Unknown regulation {regulation!r}; expected one of {sorted(GRADE_SCALES)}")
+
+def _round2(values):
+    """Round to 2 decimals exactly like round(value, 2) on each element"""
+    scaled = values * 100
+    rounded = np.round(scaled) / 100
+    # values * 100 can land on the other side of a .5 tie; settle those the Python way
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < _TIE_TOLERANCE
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(float(values[i]), 2)
+    return rounded
+
+def grade_students(students, regulation=DEFAULT_REGULATION, count_failed_credits=True):
+    """Grade a batch of student records in one vectorized pass.
+
+    regulation is a key of GRADE_SCALES or a grade -> points dict. With
+    count_failed_credits=False the credits of failed subjects are left out of
+    the SGPA denominator. Returns a dict of arrays aligned with students:
+    sgpa, total_credits, backlogs and passed.
+    """
+    scale = _resolve_scale(regulation)
+    subject_lists = [student['subjectGrades'] for student in students]
+    counts = np.fromiter(map(len, subject_lists), dtype=np.intp, count=len(subject_lists))
+    total_subjects = int(counts.sum())
+
+    codes = {}  # grade -> code, in order of first appearance
+    grade_codes = np.fromiter(
+        (codes.setdefault(subject.get('grade', 'F'), len(codes)) for subjects in subject_lists for subject in subjects),
+        dtype=np.intp, count=total_subjects
+    )
+    credits = np.fromiter(
+        (subject.get('credits', 0) for subjects in subject_lists for subject in subjects),
+        dtype=np.float64, count=total_subjects
+    )
+    owners = np.repeat(np.arange(len(subject_lists)), counts)
+
+    points_table = np.array([scale.get(grade, 0) for grade in codes], dtype=np.float64)
+    fail_table = np.array([grade in FAIL_GRADES for grade in codes], dtype=bool)
+    failed = fail_table[grade_codes]
+    if not count_failed_credits:
+        credits = np.where(failed, 0.0, credits)
+
+    total_points = np.bincount(owners, weights=points_table[grade_codes] * credits, minlength=len(subject_lists))
+    total_credits = np.bincount(owners, weights=credits, minlength=len(subject_lists))
+    sgpa = np.zeros(len(subject_lists))
+    np.divide(total_points, total_credits, out=sgpa, where=total_credits > 0)
+    backlogs = np.bincount(owners[failed], minlength=len(subject_lists))
+
+    return {
+        "sgpa": _round2(sgpa),
+        "total_credits": total_credits,
+        "backlogs": backlogs,
+        "passed": backlogs == 0
+    }
+
+def apply_sgpa(students, regulation=DEFAULT_REGULATION, count_failed_credits=True):
+    """Set every record's 'sgpa' from grade_students() and return its arrays.
+
+    Also the way to regrade stored records, e.g. apply_sgpa(records, "R20").
+    """
+    grades = grade_students(students, regulation, count_failed_credits)
+    for student, sgpa in zip(students, grades["sgpa"].tolist()):
+        student['sgpa'] = sgpa
+    return grades
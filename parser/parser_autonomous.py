@@ -5,10 +5,12 @@ from .parser_autonomous_dynamic import (
 )
 
 # Main exports for backward compatibility
-def parse_autonomous_pdf(file_path, semester="Unknown", university="Autonomous", streaming_callback=None):
+def parse_autonomous_pdf(file_path, semester="Unknown", university="Autonomous", streaming_callback=None,
+                         pages=None):
     """Main autonomous PDF parser - now uses dynamic detection"""
-    return parse_autonomous_pdf_dynamic(file_path, semester, university, streaming_callback)
+    return parse_autonomous_pdf_dynamic(file_path, semester, university, streaming_callback, pages)
 
-def parse_autonomous_pdf_generator(file_path, semester="Unknown", university="Autonomous", batch_size=50):
+def parse_autonomous_pdf_generator(file_path, semester="Unknown", university="Autonomous", batch_size=50,
+                                   pages=None):
     """Generator version for batch processing"""
-    return parse_autonomous_pdf_generator_dynamic(file_path, semester, university, batch_size)
+    return parse_autonomous_pdf_generator_dynamic(file_path, semester, university, batch_size, pages)
@@ -2,37 +2,88 @@ import pdfplumber
 import re
 from datetime import datetime
 import time
-from collections import defaultdict
+import itertools
+from collections import OrderedDict, defaultdict
 
-def detect_pdf_format(text):
-    """Detect the format of the PDF to choose appropriate parsing strategy"""
-    print("Detecting PDF format...")
-    
-    # Check for tabular format (like the new PDF)
-    tabular_indicators = [
-        r'Sno\s+Htno\s+Subcode\s+Subname\s+Internals\s+Grade\s+Credits',
-        r'\d+\s+[A-Z0-9]{8,12}\s+[A-Z0-9]{6,10}\s+.+?\s+\d+\s+[A-FS]\s+[\d.]+',
-        r'Htno.*?Subcode.*?Grade.*?Credits'
-    ]
-    
-    # Check for grouped format (original format)
-    grouped_indicators = [
-        r'[A-Z0-9]{10}\s+(?:[A-FS\-]+\s+)+\d+\.\d{2}',
-        r'\d+\)\s*[A-Z0-9]+\s*-\s*.+?(?=\d+\)|$)'
+from .grading import apply_sgpa
+from .parser_jntuk import HallTicketReappeared
+
+# Bump whenever a change alters the records produced for the same PDF
+PARSER_VERSION = "4"
+
+HEADER_LINES = 40  # lines at the top of the first page used to fingerprint the layout
+MAX_CACHED_FINGERPRINTS = 256
+
+# Layout indicators, bounded to single lines so a search never backtracks across the page
+FORMAT_INDICATORS = {
+    # Tabular format (one subject per line)
+    "tabular": [
+        re.compile(r'^Sno\s+Htno\s+Subcode\s+Subname\s+Internals\s+Grade\s+Credits', re.IGNORECASE | re.MULTILINE),
+        re.compile(r'\d+\s+[A-Z0-9]{8,12}\s+[A-Z0-9]{6,10}\s+[^\n]+?\s+\d+\s+[A-FS]\s+[\d.]+', re.IGNORECASE),
+        re.compile(r'Htno[^\n]*?Subcode[^\n]*?Grade[^\n]*?Credits', re.IGNORECASE)
+    ],
+    # Grouped format (original format)
+    "grouped": [
+        re.compile(r'[A-Z0-9]{10}[ \t]+(?:[A-FS\-]+[ \t]+)+\d+\.\d{2}', re.IGNORECASE),
+        re.compile(r'\d+\)[ \t]*[A-Z0-9]+[ \t]*-', re.IGNORECASE)
+    ],
+    # Matrix format (subjects as columns)
+    "matrix": [
+        re.compile(r'Programme\s*:\s*[IVX]+\s*B\.?Tech\.?\s*\(\s*[IVX]+\s*Semester\s*\)', re.IGNORECASE),
+        re.compile(r'Htno[ \t]+Name[^\n]*?(?:[A-Z]{2,8}[ \t]*){3}[^\n]*?SGPA', re.IGNORECASE),
+        re.compile(r'[A-Z0-9]{10}[ \t]+[A-Z \t.]+?[ \t]+(?:[A-FS\-]+[ \t]*){4}[^\n]*?\d+\.\d{2}', re.IGNORECASE),
+        re.compile(r'S\.?No\.?[ \t]+Htno[ \t]+Name[^\n]*?(?:[A-Z]{2,8}[ \t]+){3}', re.IGNORECASE),
+        re.compile(r'\d+[ \t]+[A-Z0-9]{10}[ \t]+[A-Z \t.]+?[ \t]+(?:[A-FS\-]+[ \t]+){3}', re.IGNORECASE)
     ]
+}
+
+# The column header row: the line naming the hall ticket or SGPA column
+COLUMN_HEADER_PATTERN = re.compile(r'^[^\n]*(?:Htno|H\.T\.No|SGPA)[^\n]*$', re.IGNORECASE | re.MULTILINE)
+
+_fingerprint_cache = {}  # (producer, column header layout) -> format
+
+def header_region(text):
+    """The first HEADER_LINES lines of text, where every layout states its format"""
+    end = -1
+    for _ in range(HEADER_LINES):
+        end = text.find("\n", end + 1)
+        if end < 0:
+            return text
+    return text[:end]
+
+def layout_fingerprint(text, producer=None):
+    """Cache key for a document layout: its PDF producer and column header row.
+
+    Tokens with digits (subject codes, serial numbers) are masked so documents
+    of the same layout for other semesters or branches share a fingerprint.
+    Returns None when the header region has no column header row.
+    """
+    header_match = COLUMN_HEADER_PATTERN.search(header_region(text))
+    if not header_match:
+        return None
+    columns = " ".join("#" if any(ch.isdigit() for ch in token) else token.lower()
+                       for token in header_match.group(0).split())
+    return (producer or "", columns)
+
+def detect_pdf_format(text, producer=None):
+    """Detect the format of the PDF to choose appropriate parsing strategy.
+
+    Only the header region of text is scored, so detection takes the same time
+    whatever the document length. Results are cached by layout_fingerprint(),
+    so later PDFs of a known layout skip the scoring.
+    """
+    print("Detecting PDF format...")
     
-    # Check for matrix format (subjects as columns) - improved detection
-    matrix_indicators = [
-        r'Programme\s*:\s*[IVX]+\s*B\.?Tech\.?\s*\(\s*[IVX]+\s*Semester\s*\)',
-        r'Htno\s+Name.*?(?:[A-Z]{2,8}\s*){3,}.*?SGPA',
-        r'[A-Z0-9]{10}\s+[A-Za-z\s.]+\s+(?:[A-FS\-]+\s*){4,}.*?\d+\.\d{2}',
-        r'S\.?No\.?\s+Htno\s+Name.*?(?:[A-Z]{2,8}\s+){3,}',
-        r'\d+\s+[A-Z0-9]{10}\s+[A-Za-z\s.]+\s+(?:[A-FS\-]+\s+){3,}'
-    ]
+    fingerprint = layout_fingerprint(text, producer)
+    if fingerprint in _fingerprint_cache:
+        format_type = _fingerprint_cache[fingerprint]
+        print(f"Detected format: {format_type} (cached layout)")
+        return format_type
     
-    tabular_score = sum(1 for pattern in tabular_indicators if re.search(pattern, text, re.IGNORECASE))
-    grouped_score = sum(1 for pattern in grouped_indicators if re.search(pattern, text, re.IGNORECASE))
-    matrix_score = sum(1 for pattern in matrix_indicators if re.search(pattern, text, re.IGNORECASE))
+    header = header_region(text)
+    scores = {name: sum(1 for pattern in patterns if pattern.search(header))
+              for name, patterns in FORMAT_INDICATORS.items()}
+    tabular_score, grouped_score, matrix_score = scores["tabular"], scores["grouped"], scores["matrix"]
     
     if matrix_score > max(tabular_score, grouped_score):
         format_type = "matrix"
@@ -41,6 +92,11 @@ def detect_pdf_format(text):
     else:
         format_type = "grouped"
     
+    if fingerprint is not None:
+        if len(_fingerprint_cache) >= MAX_CACHED_FINGERPRINTS:
+            _fingerprint_cache.pop(next(iter(_fingerprint_cache)))
+        _fingerprint_cache[fingerprint] = format_type
+    
     print(f"Detected format: {format_type} (tabular: {tabular_score}, grouped: {grouped_score}, matrix: {matrix_score})")
     
     return format_type
@@ -99,82 +155,70 @@ def extract_university_info(text):
     
     return "Autonomous University"
 
-def parse_tabular_format(text, semester, university):
-    """Parse the tabular format where each line is a subject record"""
-    print("Parsing tabular format...")
-    
-    # Pattern to match individual subject records
-    # Format: Sno Htno Subcode Subname Internals Grade Credits
-    record_pattern = re.compile(
-        r'(\d+)\s+([A-Z0-9]{8,12})\s+([A-Z0-9]{6,10})\s+(.+?)\s+(\d+)\s+([A-FS]|ABSENT)\s+([\d.]+)',
-        re.MULTILINE
-    )
-    
-    matches = record_pattern.findall(text)
-    print(f"Found {len(matches)} subject records")
-    
-    # Group by student ID
-    students_data = defaultdict(list)
-    
-    for match in matches:
-        sno, htno, subcode, subname, internals, grade, credits = match
-        
-        # Clean subject name
-        subname = re.sub(r'\s+', ' ', subname.strip())
-        
-        subject_record = {
+# Subject records of the tabular format: Sno Htno Subcode Subname Internals Grade Credits
+TABULAR_RECORD_PATTERN = re.compile(
+    r'(\d+)\s+([A-Z0-9]{8,12})\s+([A-Z0-9]{6,10})\s+(.+?)\s+(\d+)\s+([A-FS]|ABSENT)\s+([\d.]+)',
+    re.MULTILINE
+)
+
+# Matrix format lines, scanned in one pass: a column header row naming the subject
+# codes before SGPA (page 1 of a section adds S.No. and H.T.No.), or a student row
+# with an optional serial number, the hall ticket, one grade per subject and the SGPA
+MATRIX_LINE_PATTERN = re.compile(
+    r'^(?:(?i:S\.?[ \t]*No\.?)[ \t]+)?(?:(?i:H\.?[ \t]*T\.?[ \t]*No\.?)[ \t]+)?'
+    r'(?P<codes>(?:(?=[A-Z]*\d)[A-Z0-9]+[ \t]+)+)SGPA[ \t]*$'
+    r'|^(?:\d+[ \t]+)?(?P<htno>\d{2}[A-Z0-9]{8})[ \t]+(?P<grades>[A-Za-z+\-]+(?:[ \t]+[A-Za-z+\-]+)*)[ \t]+(?P<sgpa>\d+\.\d{2})[ \t]*$',
+    re.MULTILINE
+)
+
+DETECT_PAGES = 3  # leading pages used to detect the layout, semester and subject header
+
+def _tabular_subject_rows(text):
+    """Yield (htno, subject record) for every subject line of the tabular format"""
+    for sno, htno, subcode, subname, internals, grade, credits in TABULAR_RECORD_PATTERN.findall(text):
+        yield htno, {
             "code": subcode,
-            "subject": subname,
+            "subject": re.sub(r'\s+', ' ', subname.strip()),
             "grade": grade,
             "internals": int(internals),
             "credits": float(credits)
         }
-        
-        students_data[htno].append(subject_record)
-    
-    # Calculate SGPA for each student
+
+def _tabular_records(students_data, semester, university, upload_date):
+    """Build the records of grouped tabular subjects, with SGPA"""
     results = []
-    upload_date = datetime.now().strftime("%Y-%m-%d")
-    
     for student_id, subjects in students_data.items():
-        # Calculate SGPA based on grades and credits
-        total_credits = 0
-        total_points = 0
-        
-        grade_points = {
-            'S': 10, 'A': 9, 'B': 8, 'C': 7, 'D': 6, 'E': 5, 'F': 0, 'ABSENT': 0
-        }
-        
-        for subject in subjects:
-            credits = subject['credits']
-            grade = subject['grade']
-            points = grade_points.get(grade, 0)
-            
-            if grade not in ['F', 'ABSENT']:
-                total_credits += credits
-                total_points += points * credits
-        
-        sgpa = round(total_points / total_credits, 2) if total_credits > 0 else 0.0
-        
-        student_record = {
+        results.append({
             "student_id": student_id,
             "semester": semester,
             "university": university,
             "upload_date": upload_date,
-            "sgpa": sgpa,
+            "sgpa": 0.0,
             "subjectGrades": subjects
-        }
-        
-        results.append(student_record)
+        })
     
-    print(f"Processed {len(results)} students")
+    # Failed and absent subjects do not count towards the SGPA credits
+    apply_sgpa(results, "R20", count_failed_credits=False)
     return results
 
-def parse_grouped_format(text, semester, university):
-    """Parse the original grouped format"""
-    print("Parsing grouped format...")
+def parse_tabular_format(text, semester, university):
+    """Parse the tabular format where each line is a subject record"""
+    print("Parsing tabular format...")
     
-    # Extract subjects first
+    # Group by student ID
+    students_data = defaultdict(list)
+    subject_count = 0
+    for htno, subject_record in _tabular_subject_rows(text):
+        students_data[htno].append(subject_record)
+        subject_count += 1
+    print(f"Found {subject_count} subject records")
+    
+    results = _tabular_records(students_data, semester, university, datetime.now().strftime("%Y-%m-%d"))
+    print(f"Processed {len(results)} students")
+    return results
+
+def _grouped_subjects(text):
+    """Read the numbered subject legend of the grouped format"""
     subject_pattern = re.compile(r'\d+\)\s*([A-Z0-9]+)\s*-\s*(.+?)(?=\d+\)|$)', re.DOTALL)
     subject_matches = subject_pattern.findall(text)
     
@@ -186,27 +230,22 @@ def parse_grouped_format(text, semester, university):
         if code not in seen and len(code) > 2:
             subject_list.append((code, name))
             seen.add(code)
-    
-    num_subjects = len(subject_list)
-    print(f"Found {num_subjects} subjects")
-    
-    # Extract student data
+    return subject_list
+
+def _grouped_student_pattern(num_subjects):
     if num_subjects > 0:
         grade_pattern = r'[A-FS\-]+'
-        student_pattern = re.compile(
+        return re.compile(
             rf'([A-Z0-9]{{10}})\s+({grade_pattern}(?:\s+{grade_pattern}){{{num_subjects-1}}})\s+(\d+\.\d{{2}})',
             re.MULTILINE
         )
-    else:
-        student_pattern = re.compile(r'([A-Z0-9]{10})\s+((?:[A-FS\-]+\s+)+)(\d+\.\d{2})', re.MULTILINE)
-    
-    matches = list(student_pattern.finditer(text))
-    print(f"Found {len(matches)} student records")
-    
+    return re.compile(r'([A-Z0-9]{10})\s+((?:[A-FS\-]+\s+)+)(\d+\.\d{2})', re.MULTILINE)
+
+def _grouped_records(text, subject_list, student_pattern, semester, university, upload_date):
+    """Build the records of the grouped-format student rows in text"""
+    num_subjects = len(subject_list)
     results = []
-    upload_date = datetime.now().strftime("%Y-%m-%d")
-    
-    for match in matches:
+    for match in student_pattern.finditer(text):
         student_id = match.group(1)
         grades_str = match.group(2).strip()
         sgpa = float(match.group(3))
@@ -235,187 +274,209 @@ def parse_grouped_format(text, semester, university):
     
     return results
 
-def parse_matrix_format(text, semester, university):
-    """Parse matrix format where students are rows and subjects are columns"""
-    print("Parsing matrix format...")
+def parse_grouped_format(text, semester, university):
+    """Parse the original grouped format"""
+    print("Parsing grouped format...")
     
-    # Extract subject codes from header - try multiple patterns
-    header_patterns = [
-        # Pattern for direct subject code header (like page 2+)
-        r'(?:24[A-Z]{2}\d{4}\s+){3,}.*?SGPA',
-        # Pattern for the first page with S.No H.T.No
-        r'S\.?No\.?\s+H\.?T\.?No\.?\s+((?:24[A-Z]{2}\d{4}\s+){3,}).*?SGPA',
-        # Alternative pattern
-        r'Programme.*?\n.*?\n.*?\n.*?\n.*?((?:24[A-Z]{2}\d{4}\s+){3,}).*?SGPA'
-    ]
+    # Extract subjects first
+    subject_list = _grouped_subjects(text)
+    print(f"Found {len(subject_list)} subjects")
     
-    subject_codes = []
-    for pattern in header_patterns:
-        header_match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-        if header_match:
-            if header_match.groups():
-                codes_text = header_match.group(1)
-            else:
-                codes_text = header_match.group(0)
+    # Extract student data
+    student_pattern = _grouped_student_pattern(len(subject_list))
+    results = _grouped_records(text, subject_list, student_pattern, semester, university,
+                               datetime.now().strftime("%Y-%m-%d"))
+    print(f"Found {len(results)} student records")
+    return results
+
+def _iter_matrix_records(page_texts, semester, university, upload_date):
+    """Decode matrix-format pages, learning the subject columns from each header row.
+
+    Every section of the sheet (one per branch) repeats its header row with its
+    own subject codes; the rows after a header are decoded positionally against
+    it, so any batch year or hall ticket series works without code changes.
+    """
+    subject_codes = None
+    learned = set()
+    skipped_rows = 0
+    for text in page_texts:
+        for match in MATRIX_LINE_PATTERN.finditer(text):
+            if match.group('codes'):
+                subject_codes = match.group('codes').split()
+                if tuple(subject_codes) not in learned:
+                    learned.add(tuple(subject_codes))
+                    print(f"Learned matrix layout with {len(subject_codes)} subjects: {subject_codes[:5]}...")
+                continue
             
-            # Extract subject codes
-            codes = re.findall(r'24[A-Z]{2}\d{4}', codes_text)
-            if codes and len(codes) >= 3:
-                subject_codes = codes
-                print(f"Found subject codes using pattern: {codes[:5]}...")
-                break
-    
-    if not subject_codes:
-        print("Could not extract subject codes, trying fallback...")
-        # Fallback: look for any sequence of subject codes
-        fallback_codes = re.findall(r'24[A-Z]{2}\d{4}', text)
-        if fallback_codes:
-            # Take unique codes in order
-            seen = set()
-            subject_codes = []
-            for code in fallback_codes:
-                if code not in seen:
-                    subject_codes.append(code)
-                    seen.add(code)
-                if len(subject_codes) >= 10:  # Limit to reasonable number
-                    break
-            print(f"Using fallback codes: {subject_codes[:5]}...")
-    
-    if not subject_codes:
-        print("Could not extract subject codes from header")
-        return []
-    
-    print(f"Extracted {len(subject_codes)} subject codes: {subject_codes[:5]}...")
-    
-    # Extract student data rows - updated pattern for this format
-    student_patterns = [
-        # Pattern with serial number: Sno Htno Grades SGPA
-        re.compile(rf'(\d+)\s+(24B81A\d{{4}})\s+((?:[A-FS\-]+\s*){{4,}})\s+(\d+\.\d{{2}})', re.MULTILINE),
-        # Pattern without serial number: Htno Grades SGPA  
-        re.compile(rf'(24B81A\d{{4}})\s+((?:[A-FS\-]+\s*){{4,}})\s+(\d+\.\d{{2}})', re.MULTILINE)
-    ]
-    
-    matches = []
-    for pattern in student_patterns:
-        test_matches = pattern.findall(text)
-        if len(test_matches) > len(matches):
-            matches = test_matches
-            print(f"Using pattern with {len(test_matches)} matches")
-    
-    print(f"Found {len(matches)} student records")
-    
-    if not matches:
-        return []
-    
-    results = []
-    upload_date = datetime.now().strftime("%Y-%m-%d")
-    
-    grade_points = {
-        'S': 10, 'A': 9, 'B': 8, 'C': 7, 'D': 6, 'E': 5, 'F': 0, '-': 0
-    }
-    
-    for match in matches:
-        if len(match) == 4:  # With serial number
-            sno, student_id, grades_str, sgpa_str = match
-        elif len(match) == 3:  # Without serial number
-            student_id, grades_str, sgpa_str = match
-        else:
-            continue
+            if subject_codes is None:
+                skipped_rows += 1
+                continue
             
-        sgpa = float(sgpa_str)
-        
-        # Extract individual grades
-        grades = re.findall(r'[A-FS\-]+', grades_str.strip())
-        
-        # Create subject records
-        subjects = []
-        total_credits = 0
-        total_points = 0
-        
-        for i, grade in enumerate(grades[:len(subject_codes)]):
-            if i < len(subject_codes):
-                credits = 3.0  # Default credits
-                points = grade_points.get(grade, 0)
-                
+            # Grades line up with the subject columns of the current header
+            grades = match.group('grades').split()
+            subjects = []
+            for code, grade in zip(subject_codes, grades):
+                if grade.strip('-').upper() == "AB":  # absent is printed as -Ab-
+                    grade = "ABSENT"
                 subjects.append({
-                    "code": subject_codes[i],
-                    "subject": f"Subject {subject_codes[i]}",
+                    "code": code,
+                    "subject": f"Subject {code}",
                     "grade": grade,
                     "internals": 0,
-                    "credits": credits
+                    "credits": 3.0  # Default credits
                 })
+            
+            yield {
+                "student_id": match.group('htno'),
+                "semester": semester,
+                "university": university,
+                "upload_date": upload_date,
+                "sgpa": float(match.group('sgpa')),  # Use provided SGPA
+                "subjectGrades": subjects
+            }
+    
+    if subject_codes is None:
+        print("Could not extract subject codes from header")
+    elif skipped_rows:
+        print(f"⚠️ Skipped {skipped_rows} student rows found before any subject header")
+
+def parse_matrix_format(text, semester, university):
+    """Parse matrix format where students are rows and subjects are columns"""
+    print("Parsing matrix format...")
+    
+    results = list(_iter_matrix_records([text], semester, university, datetime.now().strftime("%Y-%m-%d")))
+    print(f"Processed {len(results)} students")
+    return results
+
+def _iter_tabular_records(page_texts, semester, university, upload_date, group_document=False):
+    """Group tabular subject rows page by page, yielding each student once their rows end.
+
+    Rows of one student are contiguous, so after a page only the student on its
+    last row can continue on the next page, also across pages without rows;
+    everyone before them is finished. A hall ticket that shows up again after its
+    record was yielded raises HallTicketReappeared; group_document=True holds every student
+    until the end instead and merges their rows.
+    """
+    pending = OrderedDict()  # htno -> subject records, in order of first appearance
+    emitted = set()
+    last_htno = None
+    for text in page_texts:
+        for htno, subject_record in _tabular_subject_rows(text):
+            if htno in emitted and htno not in pending:
+                raise HallTicketReappeared(htno, f"Hall ticket {htno} reappeared after its record was emitted; "
+                                                 f"parse with group_document=True to merge its rows")
+            pending.setdefault(htno, []).append(subject_record)
+            last_htno = htno
+        if group_document:
+            continue
+        
+        finished = OrderedDict()
+        while pending and next(iter(pending)) != last_htno:
+            htno, subjects = pending.popitem(last=False)
+            finished[htno] = subjects
+            emitted.add(htno)
+        yield from _tabular_records(finished, semester, university, upload_date)
+    
+    yield from _tabular_records(pending, semester, university, upload_date)
+
+def merge_tabular_records(first, second):
+    """Join the two halves of a tabular-format student whose rows were parsed separately"""
+    merged = dict(first, subjectGrades=first['subjectGrades'] + second['subjectGrades'])
+    apply_sgpa([merged], "R20", count_failed_credits=False)
+    return merged
+
+def iter_autonomous_records(file_path, semester="Unknown", university="Autonomous", pages=None, format_type=None,
+                            group_document=False):
+    """Yield the student records of an autonomous result PDF page by page.
+
+    Every page's text is extracted once. The layout, semester, university and
+    subject header come from the first DETECT_PAGES pages; each page is then
+    parsed on its own, so memory stays flat whatever the length of the document.
+    pages=(start, stop) parses only that 0-based page range, stop excluded; the
+    semester and university are still read from the first page, and the grouped
+    subject legend from the document's first pages. format_type
+    ("tabular", "grouped" or "matrix") skips the layout detection. A tabular hall
+    ticket that reappears after its record was yielded raises HallTicketReappeared, unless
+    group_document=True holds the tabular students to the end and merges them.
+    """
+    with pdfplumber.open(file_path) as pdf:
+        total_pages = len(pdf.pages)
+        print(f"PDF has {total_pages} pages")
+        page_numbers = range(total_pages)
+        if pages is not None:
+            page_numbers = page_numbers[pages[0]:pages[1]]
+            print(f"Parsing pages {page_numbers.start + 1}-{page_numbers.stop}")
+        
+        def extract_pages():
+            for i in page_numbers:
+                page = pdf.pages[i]
+                page_text = page.extract_text()
+                page.close()  # drop the page's cached layout objects
+                if page_text:
+                    yield page_text
                 
-                if grade not in ['F', '-']:
-                    total_credits += credits
-                    total_points += points * credits
+                if i > 0 and i % 20 == 0:
+                    print(f"Processed {i+1}/{total_pages} pages...")
         
-        # Verify calculated SGPA matches provided SGPA (within tolerance)
-        calculated_sgpa = round(total_points / total_credits, 2) if total_credits > 0 else 0.0
+        page_texts = extract_pages()
+        first_pages = list(itertools.islice(page_texts, DETECT_PAGES))
+        head_text = "\n".join(first_pages)
+        header_text = head_text
+        if page_numbers.start > 0:
+            header_text = "\n".join(filter(None, [pdf.pages[0].extract_text(), head_text]))
         
-        student_record = {
-            "student_id": student_id,
-            "semester": semester,
-            "university": university,
-            "upload_date": upload_date,
-            "sgpa": sgpa,  # Use provided SGPA
-            "subjectGrades": subjects
-        }
+        # Detect format
+        if format_type is None:
+            format_type = detect_pdf_format(head_text, pdf.metadata.get("Producer"))
         
-        results.append(student_record)
-    
-    avg_subjects = len(subject_codes) if results else 0
-    print(f"Processed {len(results)} students with average {avg_subjects} subjects each")
-    return results
+        # Extract metadata
+        detected_semester = extract_semester_info(header_text)
+        if detected_semester != "Unknown Semester":
+            semester = detected_semester
+        
+        detected_university = extract_university_info(header_text)
+        if detected_university != "Autonomous University":
+            university = detected_university
+        
+        print(f"Using semester: {semester}")
+        print(f"Using university: {university}")
+        
+        upload_date = datetime.now().strftime("%Y-%m-%d")
+        all_pages = itertools.chain(first_pages, page_texts)
+        
+        # Parse based on detected format
+        if format_type == "tabular":
+            yield from _iter_tabular_records(all_pages, semester, university, upload_date, group_document)
+        elif format_type == "matrix":
+            yield from _iter_matrix_records(all_pages, semester, university, upload_date)
+        else:
+            legend_text = head_text
+            if page_numbers.start > 0:
+                # A later range does not contain the legend, which is printed on the first pages
+                legend_pages = range(min(DETECT_PAGES, page_numbers.start, total_pages))
+                legend_text = "\n".join(filter(None, [pdf.pages[i].extract_text() for i in legend_pages] + [head_text]))
+            subject_list = _grouped_subjects(legend_text)
+            print(f"Found {len(subject_list)} subjects")
+            student_pattern = _grouped_student_pattern(len(subject_list))
+            for text in all_pages:
+                yield from _grouped_records(text, subject_list, student_pattern, semester, university, upload_date)
+
+def parse_autonomous_pdf_dynamic(file_path, semester="Unknown", university="Autonomous", streaming_callback=None,
+                                 pages=None):
+    """Dynamic autonomous PDF parser that detects format and adapts accordingly
 
-def parse_autonomous_pdf_dynamic(file_path, semester="Unknown", university="Autonomous", streaming_callback=None):
-    """Dynamic autonomous PDF parser that detects format and adapts accordingly"""
+    pages=(start, stop) parses only that 0-based page range, stop excluded.
+    streaming_callback(record, count) is called as each record is parsed; tabular
+    students are grouped over the whole document, so theirs come at the end.
+    """
     print(f"Starting dynamic autonomous parsing of: {file_path}")
     start_time = time.time()
     
-    # Extract PDF text
-    with pdfplumber.open(file_path) as pdf:
-        print(f"PDF has {len(pdf.pages)} pages")
-        text_parts = []
-        
-        for i, page in enumerate(pdf.pages):
-            if page.extract_text():
-                text_parts.append(page.extract_text())
-            
-            if i > 0 and i % 20 == 0:
-                print(f"Processed {i+1}/{len(pdf.pages)} pages...")
-        
-        text = "\n".join(text_parts)
-    
-    extraction_time = time.time() - start_time
-    print(f"PDF text extraction took: {extraction_time:.2f} seconds")
-    
-    # Detect format
-    format_type = detect_pdf_format(text)
-    
-    # Extract metadata
-    detected_semester = extract_semester_info(text)
-    if detected_semester != "Unknown Semester":
-        semester = detected_semester
-    
-    detected_university = extract_university_info(text)
-    if detected_university != "Autonomous University":
-        university = detected_university
-    
-    print(f"Using semester: {semester}")
-    print(f"Using university: {university}")
-    
-    # Parse based on detected format
-    if format_type == "matrix":
-        results = parse_matrix_format(text, semester, university)
-    elif format_type == "tabular":
-        results = parse_tabular_format(text, semester, university)
-    else:
-        results = parse_grouped_format(text, semester, university)
-    
-    # Handle streaming callback
-    if streaming_callback and results:
-        for i, record in enumerate(results):
-            streaming_callback(record, i + 1)
+    results = []
+    for record in iter_autonomous_records(file_path, semester, university, pages, group_document=True):
+        results.append(record)
+        if streaming_callback:
+            streaming_callback(record, len(results))
     
     total_time = time.time() - start_time
     print(f"Completed dynamic parsing in {total_time:.2f} seconds")
@@ -428,56 +489,32 @@ def parse_autonomous_pdf_dynamic(file_path, semester="Unknown", university="Auto
     
     return results
 
-def parse_autonomous_pdf_generator_dynamic(file_path, semester="Unknown", university="Autonomous", batch_size=50):
-    """Generator version of the dynamic parser for batch processing"""
+def parse_autonomous_pdf_generator_dynamic(file_path, semester="Unknown", university="Autonomous", batch_size=50,
+                                           pages=None, group_document=False):
+    """Generator version of the dynamic parser for batch processing; pages as in parse_autonomous_pdf_dynamic
+
+    Batches are yielded as soon as batch_size complete students have been parsed,
+    so uploads can start while later pages are still being read. A tabular hall
+    ticket that reappears after its batch was yielded raises HallTicketReappeared;
+    group_document=True merges it instead, holding the tabular students to the end.
+    """
     print(f"Starting dynamic batch autonomous parsing of: {file_path}")
     start_time = time.time()
     
-    # Extract PDF text
-    with pdfplumber.open(file_path) as pdf:
-        print(f"PDF has {len(pdf.pages)} pages")
-        text_parts = []
-        
-        for i, page in enumerate(pdf.pages):
-            if page.extract_text():
-                text_parts.append(page.extract_text())
-            
-            if i > 0 and i % 20 == 0:
-                print(f"Processed {i+1}/{len(pdf.pages)} pages...")
-        
-        text = "\n".join(text_parts)
-    
-    # Detect format and parse
-    format_type = detect_pdf_format(text)
-    detected_semester = extract_semester_info(text)
-    if detected_semester != "Unknown Semester":
-        semester = detected_semester
-    
-    detected_university = extract_university_info(text)
-    if detected_university != "Autonomous University":
-        university = detected_university
-    
-    # Parse based on format
-    if format_type == "matrix":
-        results = parse_matrix_format(text, semester, university)
-    elif format_type == "tabular":
-        results = parse_tabular_format(text, semester, university)
-    else:
-        results = parse_grouped_format(text, semester, university)
-    
     # Yield in batches
     students_processed = 0
     batch_count = 0
     current_batch = []
     
-    for student_record in results:
+    for student_record in iter_autonomous_records(file_path, semester, university, pages,
+                                                  group_document=group_document):
         current_batch.append(student_record)
         students_processed += 1
         
         if len(current_batch) >= batch_size:
             batch_count += 1
             print(f"Yielding batch {batch_count}: {len(current_batch)} students (Total: {students_processed})")
-            yield current_batch.copy()
+            yield current_batch
             current_batch = []
     
     # Yield remaining students
@@ -490,10 +527,12 @@ def parse_autonomous_pdf_generator_dynamic(file_path, semester="Unknown", univer
     print(f"Completed dynamic batch parsing in {total_time:.2f} seconds - {students_processed} total students")
 
 # Backward compatibility - keep the original function names
-def parse_autonomous_pdf(file_path, semester="Unknown", university="Autonomous", streaming_callback=None):
+def parse_autonomous_pdf(file_path, semester="Unknown", university="Autonomous", streaming_callback=None,
+                         pages=None):
     """Wrapper for backward compatibility"""
-    return parse_autonomous_pdf_dynamic(file_path, semester, university, streaming_callback)
+    return parse_autonomous_pdf_dynamic(file_path, semester, university, streaming_callback, pages)
 
-def parse_autonomous_pdf_generator(file_path, semester="Unknown", university="Autonomous", batch_size=50):
+def parse_autonomous_pdf_generator(file_path, semester="Unknown", university="Autonomous", batch_size=50,
+                                   pages=None):
     """Wrapper for backward compatibility"""
-    return parse_autonomous_pdf_generator_dynamic(file_path, semester, university, batch_size)
+    return parse_autonomous_pdf_generator_dynamic(file_path, semester, university, batch_size, pages)
@@ -1,573 +1,575 @@
-import pdfplumber
 import re
 from datetime import datetime
-from collections import defaultdict
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
 import time
 
-def parse_jntuk_pdf_generator(file_path, batch_size=None):
-    """Generator version that yields batches of student records for real-time processing"""
-    if batch_size is None:
-        batch_size = 500
-    print(f"🚀 Starting optimized batch JNTUK parsing of: {file_path}")
-    start_time = time.time()
-    
-    results = defaultdict(lambda: {
-        "subjectGrades": [],
-        "totalCredits": 0
-    })
-    
-    current_semester = None
-    current_exam_type = "regular"
-    upload_date = datetime.now().strftime("%Y-%m-%d")
-    students_processed = 0
-    processed_students = set()
-    batch_count = 0
-    
-    # Grade points for SGPA calculation
-    grade_points = {
-        'S': 10, 'A+': 9, 'A': 8, 'B+': 7, 'B': 6, 
-        'C': 5, 'D': 4, 'F': 0, 'MP': 0, 'ABSENT': 0
-    }
-    
-    with pdfplumber.open(file_path) as pdf:
-        print(f"📄 JNTUK PDF has {len(pdf.pages)} pages")
-        
-        for page_num, page in enumerate(pdf.pages):
-            text = page.extract_text()
-            if not text:
-                continue
+from .grading import apply_sgpa
+from .pdf_engines import open_pdf, resolve_engine
+
+# Bump whenever a change alters the records produced for the same PDF
+PARSER_VERSION = "3"
+
+# Support multiple JNTUK student ID formats
+VALID_HTNO_PATTERNS = [
+    r'^\d{2}[A-Z0-9]{8}$',          # 20B91A0501
+    r'^\d{2}[A-Z0-9]{9}$',          # 20B91A05010
+    r'^\d{4}[A-Z0-9]{8}$',          # 2020B91A0501
+]
+
+HTNO_PATTERN = re.compile("|".join(f"(?:{pattern})" for pattern in VALID_HTNO_PATTERNS))
+LOOSE_HTNO_PATTERN = re.compile(r'\d{2}[A-Z0-9]{8}')
+
+# One result line of the text fallback:
+#   <sno> <htno> <subcode> [<subject name ...>] <internals> <grade> <credits>
+RESULT_LINE_PATTERN = re.compile(r"""
+    \s*\S+                                     # serial number
+    \s+(?P<htno>\d{2}[A-Z0-9]{8})              # hall ticket, exactly 10 characters
+    \s+(?P<subcode>\S+)
+    (?P<subname>.*)                            # greedy: backtracks from the end of the line
+    \s(?P<internals>\d+|ABSENT)
+    \s+(?P<grade>(?:[A-FS]|MP)\S*)             # A-F with +/-, S, MP, ABSENT, COMPLE...
+    \s+(?P<credits>\d+(?:\.\d*)?)
+    \s*$""", re.VERBOSE)
+
+SEMESTER_PATTERN = re.compile(r"([I|II|III|IV]+)\s+B\.Tech\s+([I|II|III|IV|V|VI|VII|VIII]+)\s+Semester")
+SUPPLY_PATTERN = re.compile(r"supply|supplementary|supple", re.IGNORECASE)
+
+# Pages handed to each worker per task when parsing in parallel
+PAGES_PER_TASK = 8
+
+# Leading pages whose header decides the semester and exam type of the document
+HEADER_PAGES = 3
+
+class HallTicketReappeared(ValueError):
+    """A streaming parse met rows of a student whose record it had already yielded.
+
+    The document is valid; it has to be parsed again with group_document=True
+    so the student's rows are merged into one record.
+    """
+
+    def __init__(self, htno, message):
+        super().__init__(message)
+        self.htno = htno
+
+def _extract_page_rows(page, page_num, strict_htno=False, verbose=False):
+    """Extract the raw subject rows of one page without touching any accumulator state.
+
+    Returns None for pages without text, otherwise a plain dict that can be sent
+    back from a worker process:
+        semester   - "Semester N" if the page header names one, else None
+        is_supply  - True if the page looks like a supplementary result (first 3 pages only)
+        table_rows - (htno, code, subject, internals, grade, credits) tuples from extract_tables()
+        line_rows  - the same tuples from the line-based fallback
+    """
+    text = page.extract_text()
+    if not text:
+        return None
+
+    header = _page_header(text, page_num)
+    table_rows = []
+    line_rows = []
+
+    # Table extraction
+    try:
+        tables = page.extract_tables()
+        if tables:
+            if verbose:
+                print(f"🔍 Found {len(tables)} tables on page {page_num}")
+            for table_idx, table in enumerate(tables):
+                if not table or len(table) < 2:
+                    if verbose:
+                        print(f"❌ Table {table_idx} is empty or too small")
+                    continue
+
+                if verbose:
+                    print(f"✅ Processing table {table_idx} with {len(table)} rows")
+                    print(f"📊 Sample rows: {table[:3]}")  # Show first 3 rows
+
+                for row_idx, row in enumerate(table[1:]):  # Skip header
+                    if not row or len(row) < 6:
+                        if verbose and row_idx < 5:  # Only show first few invalid rows
+                            print(f"❌ Row {row_idx} invalid: {row}")
+                        continue
 
-            # Show progress for large PDFs
-            if page_num > 0 and page_num % 5 == 0:
-                print(f"📊 Processed {page_num+1}/{len(pdf.pages)} pages...")
-
-            # Optimized semester detection - search only first few pages
-            if not current_semester or page_num < 3:
-                semester_match = re.search(r"([I|II|III|IV]+)\s+B\.Tech\s+([I|II|III|IV|V|VI|VII|VIII]+)\s+Semester", text)
-                if semester_match:
-                    sem_roman = semester_match.group(2)
-                    roman_to_num = {'I': 1, 'II': 2, 'III': 3, 'IV': 4, 'V': 5, 'VI': 6, 'VII': 7, 'VIII': 8}
-                    sem_num = roman_to_num.get(sem_roman, 1)
-                    current_semester = f"Semester {sem_num}"
-                    print(f"🎯 Detected semester: {current_semester}")
-            
-            # Optimized exam type detection - check once per PDF
-            if page_num < 3:
-                if re.search(r"supply|supplementary|supple", text, re.IGNORECASE):
-                    current_exam_type = "supply"
-
-            # Process students from this page
-            page_students = []
-            page_student_records = []
-            
-            # Table extraction
-            try:
-                tables = page.extract_tables()
-                if tables:
-                    print(f"🔍 Found {len(tables)} tables on page {page_num}")
-                    for table_idx, table in enumerate(tables):
-                        if not table or len(table) < 2:
-                            print(f"❌ Table {table_idx} is empty or too small")
+                    if verbose and row_idx < 3:  # Show first few valid rows for debugging
+                        print(f"🔍 Processing row {row_idx}: {row}")
+
+                    try:
+                        if len(row) == 7:
+                            _, htno, subcode, subname, internals, grade, credits = row
+                        elif len(row) == 6:
+                            htno, subcode, subname, internals, grade, credits = row
+                        else:
+                            if verbose and row_idx < 3:
+                                print(f"❌ Invalid row length {len(row)} in row {row_idx}: {row}")
                             continue
-                        
-                        print(f"✅ Processing table {table_idx} with {len(table)} rows")
-                        print(f"📊 Sample rows: {table[:3]}")  # Show first 3 rows
-                            
-                        for row_idx, row in enumerate(table[1:]):  # Skip header
-                            if not row or len(row) < 6:
-                                if row_idx < 5:  # Only show first few invalid rows
-                                    print(f"❌ Row {row_idx} invalid: {row}")
+
+                        if strict_htno:
+                            # Enhanced student ID pattern matching
+                            htno_str = str(htno).strip()
+                            if not htno_str:
+                                if verbose and row_idx < 3:
+                                    print(f"❌ Empty HTNO in row {row_idx}")
                                 continue
-                            
-                            if row_idx < 3:  # Show first few valid rows for debugging
-                                print(f"🔍 Processing row {row_idx}: {row}")
-                                
-                            try:
-                                if len(row) == 7:
-                                    _, htno, subcode, subname, internals, grade, credits = row
-                                elif len(row) == 6:
-                                    htno, subcode, subname, internals, grade, credits = row
-                                else:
-                                    if row_idx < 3:
-                                        print(f"❌ Invalid row length {len(row)} in row {row_idx}: {row}")
-                                    continue
-
-                                # Enhanced student ID pattern matching
-                                htno_str = str(htno).strip()
-                                if not htno_str:
-                                    if row_idx < 3:
-                                        print(f"❌ Empty HTNO in row {row_idx}")
-                                    continue
-                                
-                                # Support multiple JNTUK student ID formats
-                                valid_patterns = [
-                                    r'^\d{2}[A-Z0-9]{8}$',          # 20B91A0501
-                                    r'^\d{2}[A-Z0-9]{9}$',          # 20B91A05010  
-                                    r'^\d{4}[A-Z0-9]{8}$',          # 2020B91A0501
-                                ]
-                                
-                                is_valid_htno = any(re.match(pattern, htno_str) for pattern in valid_patterns)
-                                
-                                if not is_valid_htno:
-                                    if row_idx < 5:
-                                        print(f"❌ Invalid HTNO '{htno_str}' in row {row_idx}")
-                                    continue
-                                
-                                if row_idx < 3:
-                                    print(f"✅ Valid HTNO found: {htno_str}")
-
-                                internals_val = 0 if str(internals).strip() == 'ABSENT' else int(internals or 0)
-                                credits_val = float(credits or 0)
-
-                                student = results[htno]
-                                student['student_id'] = htno
-                                student['university'] = "JNTUK"
-                                student['semester'] = current_semester or "Unknown"
-                                student['examType'] = current_exam_type
-                                student['upload_date'] = upload_date
-
-                                student['subjectGrades'].append({
-                                    "code": str(subcode or "").strip(),
-                                    "subject": str(subname or "").strip(),
-                                    "internals": internals_val,
-                                    "grade": str(grade or "").strip(),
-                                    "credits": credits_val
-                                })
-
-                                student['totalCredits'] += credits_val
-                                
-                                # Add to page students if not already processed
-                                if htno not in processed_students:
-                                    processed_students.add(htno)
-                                    page_students.append(htno)
-                                    # Add full student record for batching
-                                    student_data = results[htno]
-                                    if student_data.get('subjectGrades'):
-                                        # Calculate SGPA
-                                        total_points = 0
-                                        total_credits = 0
-                                        for subject in student_data['subjectGrades']:
-                                            grade = subject.get('grade', 'F')
-                                            credits = subject.get('credits', 0)
-                                            points = grade_points.get(grade, 0)
-                                            total_points += points * credits
-                                            total_credits += credits
-                                        sgpa = round(total_points / total_credits, 2) if total_credits > 0 else 0.0
-                                        page_student_records.append({
-                                            "student_id": student_data['student_id'],
-                                            "semester": student_data['semester'],
-                                            "university": student_data['university'],
-                                            "upload_date": student_data['upload_date'],
-                                            "sgpa": sgpa,
-                                            "subjectGrades": student_data['subjectGrades']
-                                        })
-                                    
-                            except (ValueError, TypeError, AttributeError):
+
+                            if not HTNO_PATTERN.match(htno_str):
+                                if verbose and row_idx < 5:
+                                    print(f"❌ Invalid HTNO '{htno_str}' in row {row_idx}")
                                 continue
-            except Exception:
-                pass
 
-            # Line-based extraction
-            try:
-                lines = text.split('\n')
-                for line in lines:
-                    if not line.strip() or 'Htno' in line or 'Subcode' in line:
+                            if verbose and row_idx < 3:
+                                print(f"✅ Valid HTNO found: {htno_str}")
+                        elif not htno or not LOOSE_HTNO_PATTERN.match(str(htno)):
+                            continue
+
+                        internals_val = 0 if str(internals).strip() == 'ABSENT' else int(internals or 0)
+                        credits_val = float(credits or 0)
+
+                        table_rows.append((
+                            htno,
+                            str(subcode or "").strip(),
+                            str(subname or "").strip(),
+                            internals_val,
+                            str(grade or "").strip(),
+                            credits_val
+                        ))
+                    except (ValueError, TypeError, AttributeError):
                         continue
+    except Exception:
+        pass
+
+    # Line-based extraction
+    for line in text.split('\n'):
+        if 'Htno' in line or 'Subcode' in line:
+            continue
+        row = _parse_result_line(line)
+        if row:
+            line_rows.append(row)
+
+    return dict(header, table_rows=table_rows, line_rows=line_rows)
+
+def _page_header(text, page_num):
+    """Read the semester and supplementary flag from one page's text"""
+    semester = None
+    semester_match = SEMESTER_PATTERN.search(text)
+    if semester_match:
+        sem_roman = semester_match.group(2)
+        roman_to_num = {'I': 1, 'II': 2, 'III': 3, 'IV': 4, 'V': 5, 'VI': 6, 'VII': 7, 'VIII': 8}
+        sem_num = roman_to_num.get(sem_roman, 1)
+        semester = f"Semester {sem_num}"
+
+    return {
+        "semester": semester,
+        "is_supply": page_num < HEADER_PAGES and bool(SUPPLY_PATTERN.search(text))
+    }
 
-                    parts = line.strip().split()
-                    if len(parts) >= 6:
-                        try:
-                            if len(parts) > 1 and len(str(parts[1])) == 10 and re.match(r'\d{2}[A-Z0-9]{8}', str(parts[1])):
-                                htno = parts[1]
-                                
-                                if htno in processed_students:
-                                    continue
-                                    
-                                subcode = parts[2] if len(parts) > 2 else ""
-                                credits = parts[-1]
-                                grade = parts[-2]
-                                internals = parts[-3]
-
-                                if (re.match(r'\d+|ABSENT', str(internals)) and 
-                                    re.match(r'[A-F][\+\-]?|MP|ABSENT|S|COMPLE', str(grade)) and
-                                    re.match(r'\d+(?:\.\d+)?', str(credits))):
-
-                                    internals_val = 0 if str(internals) == 'ABSENT' else int(internals)
-                                    credits_val = float(credits)
-                                    subname_parts = parts[3:-3] if len(parts) > 6 else []
-                                    subname = ' '.join(subname_parts)
-
-                                    student = results[htno]
-                                    student['student_id'] = htno
-                                    student['university'] = "JNTUK"
-                                    student['semester'] = current_semester or "Unknown"
-                                    student['examType'] = current_exam_type
-                                    student['upload_date'] = upload_date
-
-                                    student['subjectGrades'].append({
-                                        "code": str(subcode).strip(),
-                                        "subject": subname.strip(),
-                                        "internals": internals_val,
-                                        "grade": str(grade).strip(),
-                                        "credits": credits_val
-                                    })
-
-                                    student['totalCredits'] += credits_val
-                                    
-                                    # Add to page students if not already processed
-                                    if htno not in processed_students:
-                                        processed_students.add(htno)
-                                        page_students.append(htno)
-                                        # Add full student record for batching
-                                        student_data = results[htno]
-                                        if student_data.get('subjectGrades'):
-                                            # Calculate SGPA
-                                            total_points = 0
-                                            total_credits = 0
-                                            for subject in student_data['subjectGrades']:
-                                                grade = subject.get('grade', 'F')
-                                                credits = subject.get('credits', 0)
-                                                points = grade_points.get(grade, 0)
-                                                total_points += points * credits
-                                                total_credits += credits
-                                            sgpa = round(total_points / total_credits, 2) if total_credits > 0 else 0.0
-                                            page_student_records.append({
-                                                "student_id": student_data['student_id'],
-                                                "semester": student_data['semester'],
-                                                "university": student_data['university'],
-                                                "upload_date": student_data['upload_date'],
-                                                "sgpa": sgpa,
-                                                "subjectGrades": student_data['subjectGrades']
-                                            })
-                                        
-                        except (ValueError, IndexError, AttributeError):
-                            continue
-            except Exception:
-                pass
-            
-            # Yield batch when we have enough students
-            if len(page_student_records) >= batch_size:
-                batch_records = page_student_records[:batch_size]
-                if batch_records:
-                    batch_count += 1
-                    students_processed += len(batch_records)
-                    print(f"🚀 Yielding batch {batch_count}: {len(batch_records)} students (Total: {students_processed})")
-                    yield batch_records
-                # Remove processed students from page_students and page_student_records
-                page_students = page_students[batch_size:]
-                page_student_records = page_student_records[batch_size:]
-            
-            # Also check if we've accumulated enough students across all results
-            if len(results) >= batch_size and len(results) % batch_size == 0:
-                # Yield a batch from accumulated results
-                batch_records = []
-                students_to_yield = []
-                
-                for htno, student_data in list(results.items()):
-                    if htno not in processed_students and len(students_to_yield) < batch_size:
-                        students_to_yield.append(htno)
-                        processed_students.add(htno)
-                
-                for htno in students_to_yield:
-                    student_data = results[htno]
-                    if student_data.get('subjectGrades'):
-                        # Calculate SGPA
-                        total_points = 0
-                        total_credits = 0
-                        
-                        for subject in student_data['subjectGrades']:
-                            grade = subject.get('grade', 'F')
-                            credits = subject.get('credits', 0)
-                            points = grade_points.get(grade, 0)
-                            total_points += points * credits
-                            total_credits += credits
-                        
-                        sgpa = round(total_points / total_credits, 2) if total_credits > 0 else 0.0
-                        
-                        batch_records.append({
-                            "student_id": student_data['student_id'],
-                            "semester": student_data['semester'],
-                            "university": student_data['university'],
-                            "upload_date": student_data['upload_date'],
-                            "sgpa": sgpa,
-                            "subjectGrades": student_data['subjectGrades']
-                        })
-                
-                if batch_records:
-                    batch_count += 1
-                    students_processed += len(batch_records)
-                    print(f"🚀 Yielding page batch {batch_count}: {len(batch_records)} students (Total: {students_processed})")
-                    yield batch_records
-
-    # Yield remaining students in proper batches
-    remaining_student_records = []
-    for htno, student_data in results.items():
-        if student_data.get('subjectGrades'):
-            # Calculate SGPA
-            total_points = 0
-            total_credits = 0
-            for subject in student_data['subjectGrades']:
-                grade = subject.get('grade', 'F')
-                credits = subject.get('credits', 0)
-                points = grade_points.get(grade, 0)
-                total_points += points * credits
-                total_credits += credits
-            sgpa = round(total_points / total_credits, 2) if total_credits > 0 else 0.0
-            remaining_student_records.append({
-                "student_id": student_data['student_id'],
-                "semester": student_data['semester'],
-                "university": student_data['university'],
-                "upload_date": student_data['upload_date'],
-                "sgpa": sgpa,
-                "subjectGrades": student_data['subjectGrades']
-            })
-    for i in range(0, len(remaining_student_records), batch_size):
-        batch_records = remaining_student_records[i:i + batch_size]
-        if batch_records:
-            batch_count += 1
-            students_processed += len(batch_records)
-            print(f"🚀 Yielding final batch {batch_count}: {len(batch_records)} students (Total: {students_processed})")
-            yield batch_records
+def _extract_page_header(page, page_num):
+    """Page rows without any subject rows: only the header, from the page text"""
+    text = page.extract_text()
+    if not text:
+        return None
+    return dict(_page_header(text, page_num), table_rows=[], line_rows=[])
+
+def _parse_result_line(line):
+    """Classify and capture one text line with a single match; None if it is not a result row"""
+    match = RESULT_LINE_PATTERN.match(line)
+    if not match:
+        return None
+    htno, subcode, subname, internals, grade, credits = match.groups()
+    return (
+        htno,
+        subcode,
+        " ".join(subname.split()),
+        0 if internals == 'ABSENT' else int(internals),
+        grade,
+        float(credits)
+    )
+
+def _extract_page_range(file_path, start, end, strict_htno=False, verbose=False, engine=None):
+    """Worker entry point: open the PDF separately and extract pages [start, end)"""
+    with open_pdf(file_path, engine) as pdf:
+        return [
+            _extract_page_rows(pdf.pages[page_num], page_num, strict_htno, verbose)
+            for page_num in range(start, end)
+        ]
+
+def _load_page_checkpoint(checkpoint_path, header):
+    """Read the pages already extracted into checkpoint_path.
+
+    The checkpoint is a JSON Lines log: a header line identifying the parser
+    settings, then one {"page": n, "rows": page_rows} line per completed page.
+    Returns (done_pages, valid_bytes): valid_bytes is the length of the log up to
+    its last complete line, or None when there is no usable log (missing,
+    unreadable or written with other settings). A torn last line is ignored.
+    """
+    done_pages = {}
+    if not os.path.exists(checkpoint_path):
+        return done_pages, None
+
+    try:
+        with open(checkpoint_path, 'rb') as f:
+            raw = f.read()
+        valid_bytes = raw.rfind(b'\n') + 1
+        lines = raw[:valid_bytes].decode('utf-8').split('\n')
+        if not valid_bytes or json.loads(lines[0]) != header:
+            print("⚠️ Page checkpoint was written by a different parser setup - starting over")
+            return done_pages, None
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            rows = entry['rows']
+            if rows is not None:
+                rows['table_rows'] = [tuple(row) for row in rows['table_rows']]
+                rows['line_rows'] = [tuple(row) for row in rows['line_rows']]
+            done_pages[entry['page']] = rows
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Could not read page checkpoint {checkpoint_path}: {e}")
+        return {}, None
+
+    return done_pages, valid_bytes
+
+def _open_page_checkpoint(checkpoint_path, header, valid_bytes):
+    """Return an append handle on the checkpoint.
+
+    A validated log is only cut back to its last complete line and appended to;
+    without one a new log is started with the header line.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(checkpoint_path)), exist_ok=True)
+    if valid_bytes is None:
+        log = open(checkpoint_path, 'w', encoding='utf-8')
+        log.write(json.dumps(header) + '\n')
+        log.flush()
+        return log
+    os.truncate(checkpoint_path, valid_bytes)
+    return open(checkpoint_path, 'a', encoding='utf-8')
+
+def _page_window(pages, total_pages):
+    """Map a pages argument to the range of page numbers to parse.
+
+    pages is a (start, stop) pair of 0-based page numbers with stop excluded, like
+    a slice: (0, 3) is the first three pages and (200, None) everything from page
+    201 on. None selects the whole document.
+    """
+    if pages is None:
+        return range(total_pages)
+    start, stop = pages
+    return range(total_pages)[start:stop]
+
+def _iter_page_rows(file_path, strict_htno=False, verbose=False, workers=None, engine=None,
+                    checkpoint_path=None, pages=None, merge_line_rows=True):
+    """Yield (page_num, total_pages, page_rows) in page order.
+
+    With workers > 1 the page ranges are extracted in a ProcessPoolExecutor and
+    merged back in page order, so callers see exactly what the serial path sees.
+    With a checkpoint_path every extracted page is logged as it completes, and
+    pages found in an existing log are replayed instead of being extracted again.
+    The log's header names the parser version, extraction engine and row
+    settings (merge_line_rows is only recorded there), so a log written by
+    another setup is discarded rather than mixed into this run.
+    pages limits parsing to a page range (see _page_window). The header pages
+    before the range are still read, without their rows, so the semester and
+    exam type match a full parse.
+    """
+    done_pages = {}
+    log = None
+    if checkpoint_path:
+        header = {"parser_version": PARSER_VERSION, "engine": resolve_engine(engine), "strict_htno": strict_htno,
+                  "merge_line_rows": merge_line_rows}
+        done_pages, valid_bytes = _load_page_checkpoint(checkpoint_path, header)
+        log = _open_page_checkpoint(checkpoint_path, header, valid_bytes)
+
+    try:
+        with open_pdf(file_path, engine) as pdf:
+            total_pages = len(pdf.pages)
+            print(f"📄 JNTUK PDF has {total_pages} pages")
+            window = _page_window(pages, total_pages)
+            if pages is not None:
+                print(f"📑 Parsing pages {window.start + 1}-{window.stop} of {total_pages}")
+            done_in_window = sum(1 for page_num in window if page_num in done_pages)
+            if done_in_window:
+                print(f"♻️ Resuming from checkpoint: {done_in_window}/{len(window)} pages already extracted")
+
+            for page_num in range(min(window.start, HEADER_PAGES)):
+                yield page_num, total_pages, _extract_page_header(pdf.pages[page_num], page_num)
+
+            pending = [page_num for page_num in window if page_num not in done_pages]
+            if not workers or workers <= 1 or len(pending) <= PAGES_PER_TASK:
+                extracted = ((page_num, _extract_page_rows(pdf.pages[page_num], page_num, strict_htno, verbose))
+                             for page_num in pending)
+                yield from _merge_page_rows(window, total_pages, done_pages, extracted, log)
+                return
+
+        yield from _merge_page_rows(window, total_pages, done_pages,
+                                    _extract_parallel(file_path, pending, strict_htno, verbose, workers, engine),
+                                    log)
+    finally:
+        if log:
+            log.close()
+
+def _extract_parallel(file_path, pending, strict_htno, verbose, workers, engine):
+    """Extract the pending pages in contiguous ranges on a process pool, yielding in page order"""
+    ranges = []
+    for page_num in pending:
+        if ranges and ranges[-1][1] == page_num and ranges[-1][1] - ranges[-1][0] < PAGES_PER_TASK:
+            ranges[-1][1] = page_num + 1
+        else:
+            ranges.append([page_num, page_num + 1])
+    workers = min(workers, len(ranges))
+    print(f"⚡ Extracting {len(ranges)} page ranges with {workers} worker processes")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_extract_page_range, file_path, start, end, strict_htno, verbose, engine)
+                   for start, end in ranges]
+        for (start, _), future in zip(ranges, futures):
+            for offset, page_rows in enumerate(future.result()):
+                yield start + offset, page_rows
+
+def _merge_page_rows(window, total_pages, done_pages, extracted, log):
+    """Interleave checkpointed pages with freshly extracted ones, logging the latter"""
+    for page_num in window:
+        if page_num in done_pages:
+            yield page_num, total_pages, done_pages[page_num]
+            continue
+
+        extracted_num, page_rows = next(extracted)
+        if log:
+            log.write(json.dumps({"page": extracted_num, "rows": page_rows}) + '\n')
+            log.flush()
+        yield extracted_num, total_pages, page_rows
+
+def _resolve_workers(parallel):
+    """Map the parallel argument (False/True/int) to a worker count"""
+    if parallel is True:
+        return os.cpu_count() or 1
+    if not parallel:
+        return None
+    return int(parallel)
+
+def _add_subject_row(results, row, current_semester, current_exam_type, upload_date):
+    """Merge one extracted subject row into the per-htno accumulator"""
+    htno, code, subject, internals_val, grade, credits_val = row
+
+    student = results[htno]
+    student['student_id'] = htno
+    student['university'] = "JNTUK"
+    student['semester'] = current_semester or "Unknown"
+    student['examType'] = current_exam_type
+    student['upload_date'] = upload_date
+
+    student['subjectGrades'].append({
+        "code": code,
+        "subject": subject,
+        "internals": internals_val,
+        "grade": grade,
+        "credits": credits_val
+    })
 
-    total_time = time.time() - start_time
-    print(f"✅ Completed batch parsing in {total_time:.2f} seconds - {students_processed} total students")
+    student['totalCredits'] += credits_val
+    return student
 
-def parse_jntuk_pdf(file_path, streaming_callback=None):
-    print(f"🚀 Starting real-time JNTUK parsing of: {file_path}")
-    start_time = time.time()
-    
-    results = defaultdict(lambda: {
+def _new_student():
+    return {
         "subjectGrades": [],
         "totalCredits": 0
-    })
+    }
+
+def _student_record(student_data):
+    """Build the output record of one accumulated student; apply_sgpa() fills in the SGPA"""
+    return {
+        "student_id": student_data['student_id'],
+        "semester": student_data['semester'],
+        "university": student_data['university'],
+        "upload_date": student_data['upload_date'],
+        "sgpa": 0.0,
+        "subjectGrades": student_data['subjectGrades']
+    }
+
+def _iter_students(file_path, strict_htno=False, verbose=False, merge_line_rows=True,
+                   workers=None, engine=None, checkpoint_path=None, pages=None, group_document=False):
+    """Yield finished student records in order of first appearance.
+
+    The result tables are grouped by hall ticket, so after a page only the students
+    on its last row can continue on the next one; a page without rows carries that
+    student over. Every other student is finished: its record is built with SGPA,
+    yielded and dropped, which keeps about one page of students in memory whatever
+    the size of the PDF. A hall ticket that reappears after its record was yielded
+    raises HallTicketReappeared rather than producing a second, partial record;
+    group_document=True instead holds every student until the end of the document
+    and merges such rows, at the cost of keeping all records in memory.
+    merge_line_rows adds every line-based fallback row to its student; otherwise the
+    fallback only contributes the first row of students the tables missed.
+    """
+    pending = OrderedDict()  # htno -> accumulated student, in order of first appearance
+    complete = set()         # pending htnos whose block of rows is closed
+    seen = set()             # every htno met so far
+    open_htnos = set()       # htnos that may continue on the next page
 
     current_semester = None
     current_exam_type = "regular"
     upload_date = datetime.now().strftime("%Y-%m-%d")  # Calculate once
+
+    def add_row(row):
+        htno = row[0]
+        if htno not in pending:
+            if htno in seen:
+                raise HallTicketReappeared(htno, f"Hall ticket {htno} reappeared on page {page_num + 1} after its "
+                                                 f"record was emitted; parse with group_document=True to merge its rows")
+            pending[htno] = _new_student()
+        complete.discard(htno)
+        seen.add(htno)
+        _add_subject_row(pending, row, current_semester, current_exam_type, upload_date)
+
+    def release_complete():
+        # Only the front of the queue is released, so records keep first-appearance order
+        finished = []
+        while pending:
+            htno = next(iter(pending))
+            if htno not in complete:
+                break
+            complete.discard(htno)
+            finished.append(_student_record(pending.popitem(last=False)[1]))
+        # Grade everyone finished on this page in one pass
+        apply_sgpa(finished)
+        return finished
+
+    page_iter = _iter_page_rows(file_path, strict_htno=strict_htno, verbose=verbose, workers=workers,
+                                engine=engine, checkpoint_path=checkpoint_path, pages=pages,
+                                merge_line_rows=merge_line_rows)
+    for page_num, total_pages, page_rows in page_iter:
+        if page_rows is None:
+            continue
+
+        # Show progress for large PDFs
+        if page_num > 0 and page_num % 5 == 0:
+            print(f"📊 Processed {page_num+1}/{total_pages} pages...")
+
+        # Optimized semester detection - search only first few pages
+        if not current_semester or page_num < HEADER_PAGES:
+            if page_rows['semester']:
+                current_semester = page_rows['semester']
+                print(f"🎯 Detected semester: {current_semester}")
+
+        # Optimized exam type detection - check once per PDF
+        if page_rows['is_supply']:
+            current_exam_type = "supply"
+
+        # Table rows first, then the line-based fallback rows
+        for row in page_rows['table_rows']:
+            add_row(row)
+        for row in page_rows['line_rows']:
+            if merge_line_rows or row[0] not in seen:
+                add_row(row)
+
+        # Only the last student of each extraction may continue on the next page;
+        # a page without rows leaves the previous page's open student open
+        if page_rows['table_rows'] or page_rows['line_rows']:
+            open_htnos = {rows[-1][0] for rows in (page_rows['table_rows'], page_rows['line_rows']) if rows}
+        if not group_document:
+            complete.update(htno for htno in pending if htno not in open_htnos)
+            yield from release_complete()
+
+    # Every remaining student is finished at the end of the document
+    complete.update(pending)
+    yield from release_complete()
+
+def parse_jntuk_pdf_generator(file_path, batch_size=None, parallel=False, engine=None, checkpoint_path=None,
+                              pages=None, group_document=False):
+    """Generator version that yields batches of student records for real-time processing
+
+    Students are batched as soon as their rows are finished, so each batch costs
+    O(batch) and only about one page of students plus one batch is held in memory.
+
+    Set parallel=True (or a worker count) to extract page ranges in separate processes.
+    engine selects the extraction backend ("pdfplumber" or "pymupdf").
+    checkpoint_path logs every extracted page so an interrupted run can resume; the
+    replayed pages yield the same batches again, in the same order.
+    pages=(start, stop) parses only that 0-based page range, stop excluded.
+    A hall ticket that reappears after its batch was yielded raises
+    HallTicketReappeared; group_document=True holds every student to the end of
+    the document and merges their rows instead.
+    """
+    if batch_size is None:
+        batch_size = 500
+    print(f"🚀 Starting optimized batch JNTUK parsing of: {file_path}")
+    start_time = time.time()
+
     students_processed = 0
-    processed_students = set()  # Track processed students for streaming
-    
-    with pdfplumber.open(file_path) as pdf:
-        print(f"📄 JNTUK PDF has {len(pdf.pages)} pages")
-        
-        for page_num, page in enumerate(pdf.pages):
-            text = page.extract_text()
-            if not text:
-                continue
+    batch_count = 0
+    batch_records = []
+
+    students = _iter_students(file_path, strict_htno=True, verbose=True, merge_line_rows=False,
+                              workers=_resolve_workers(parallel), engine=engine,
+                              checkpoint_path=checkpoint_path, pages=pages, group_document=group_document)
+    for record in students:
+        batch_records.append(record)
+        if len(batch_records) == batch_size:
+            batch_count += 1
+            students_processed += len(batch_records)
+            print(f"🚀 Yielding batch {batch_count}: {len(batch_records)} students (Total: {students_processed})")
+            yield batch_records
+            batch_records = []
 
-            # Show progress for large PDFs
-            if page_num > 0 and page_num % 5 == 0:
-                print(f"📊 Processed {page_num+1}/{len(pdf.pages)} pages...")
-
-            # Optimized semester detection - search only first few pages
-            if not current_semester or page_num < 3:
-                semester_match = re.search(r"([I|II|III|IV]+)\s+B\.Tech\s+([I|II|III|IV|V|VI|VII|VIII]+)\s+Semester", text)
-                if semester_match:
-                    sem_roman = semester_match.group(2)
-                    roman_to_num = {'I': 1, 'II': 2, 'III': 3, 'IV': 4, 'V': 5, 'VI': 6, 'VII': 7, 'VIII': 8}
-                    sem_num = roman_to_num.get(sem_roman, 1)
-                    current_semester = f"Semester {sem_num}"
-                    print(f"🎯 Detected semester: {current_semester}")
-            
-            # Optimized exam type detection - check once per PDF
-            if page_num < 3:
-                if re.search(r"supply|supplementary|supple", text, re.IGNORECASE):
-                    current_exam_type = "supply"
-
-            # Optimized table extraction
-            try:
-                tables = page.extract_tables()
-                if tables:
-                    for table in tables:
-                        if not table or len(table) < 2:
-                            continue
-                            
-                        for row in table[1:]:  # Skip header
-                            if not row or len(row) < 6:
-                                continue
-                                
-                            try:
-                                if len(row) == 7:
-                                    _, htno, subcode, subname, internals, grade, credits = row
-                                elif len(row) == 6:
-                                    htno, subcode, subname, internals, grade, credits = row
-                                else:
-                                    continue
-
-                                if not htno or not re.match(r'\d{2}[A-Z0-9]{8}', str(htno)):
-                                    continue
-
-                                internals_val = 0 if str(internals).strip() == 'ABSENT' else int(internals or 0)
-                                credits_val = float(credits or 0)
-
-                                student = results[htno]
-                                student['student_id'] = htno
-                                student['university'] = "JNTUK"
-                                student['semester'] = current_semester or "Unknown"
-                                student['examType'] = current_exam_type
-                                student['upload_date'] = upload_date
-
-                                student['subjectGrades'].append({
-                                    "code": str(subcode or "").strip(),
-                                    "subject": str(subname or "").strip(),
-                                    "internals": internals_val,
-                                    "grade": str(grade or "").strip(),
-                                    "credits": credits_val
-                                })
-
-                                student['totalCredits'] += credits_val
-                                
-                                # Send real-time update if callback provided
-                                if streaming_callback and htno not in processed_students:
-                                    processed_students.add(htno)
-                                    students_processed += 1
-                                    
-                                    # Calculate and send complete student record
-                                    grade_points = {
-                                        'S': 10, 'A+': 9, 'A': 8, 'B+': 7, 'B': 6, 
-                                        'C': 5, 'D': 4, 'F': 0, 'MP': 0, 'ABSENT': 0
-                                    }
-                                    
-                                    total_points = 0
-                                    total_credits = 0
-                                    for subject in student['subjectGrades']:
-                                        grade = subject.get('grade', 'F')
-                                        credits = subject.get('credits', 0)
-                                        points = grade_points.get(grade, 0)
-                                        total_points += points * credits
-                                        total_credits += credits
-                                    
-                                    sgpa = round(total_points / total_credits, 2) if total_credits > 0 else 0.0
-                                    
-                                    complete_record = {
-                                        "student_id": student['student_id'],
-                                        "semester": student['semester'],
-                                        "university": student['university'],
-                                        "upload_date": student['upload_date'],
-                                        "sgpa": sgpa,
-                                        "subjectGrades": student['subjectGrades'].copy()
-                                    }
-                                    
-                                    streaming_callback(complete_record, students_processed)
-                            except (ValueError, TypeError, AttributeError):
-                                continue
-            except Exception:
-                pass
+    if batch_records:
+        batch_count += 1
+        students_processed += len(batch_records)
+        print(f"🚀 Yielding final batch {batch_count}: {len(batch_records)} students (Total: {students_processed})")
+        yield batch_records
 
-            # Fast line-based extraction for other formats
-            try:
-                lines = text.split('\n')
-                for line in lines:
-                    if not line.strip() or 'Htno' in line or 'Subcode' in line:
-                        continue
+    total_time = time.time() - start_time
+    print(f"✅ Completed batch parsing in {total_time:.2f} seconds - {students_processed} total students")
 
-                    parts = line.strip().split()
-                    if len(parts) >= 6:
-                        try:
-                            if len(parts) > 1 and len(str(parts[1])) == 10 and re.match(r'\d{2}[A-Z0-9]{8}', str(parts[1])):
-                                htno = parts[1]
-                                subcode = parts[2] if len(parts) > 2 else ""
-                                credits = parts[-1]
-                                grade = parts[-2]
-                                internals = parts[-3]
-
-                                if (re.match(r'\d+|ABSENT', str(internals)) and 
-                                    re.match(r'[A-F][\+\-]?|MP|ABSENT|S|COMPLE', str(grade)) and
-                                    re.match(r'\d+(?:\.\d+)?', str(credits))):
-
-                                    internals_val = 0 if str(internals) == 'ABSENT' else int(internals)
-                                    credits_val = float(credits)
-                                    subname_parts = parts[3:-3] if len(parts) > 6 else []
-                                    subname = ' '.join(subname_parts)
-
-                                    student = results[htno]
-                                    student['student_id'] = htno
-                                    student['university'] = "JNTUK"
-                                    student['semester'] = current_semester or "Unknown"
-                                    student['examType'] = current_exam_type
-                                    student['upload_date'] = upload_date
-
-                                    student['subjectGrades'].append({
-                                        "code": str(subcode).strip(),
-                                        "subject": subname.strip(),
-                                        "internals": internals_val,
-                                        "grade": str(grade).strip(),
-                                        "credits": credits_val
-                                    })
-
-                                    student['totalCredits'] += credits_val
-                                    
-                                    # Send real-time update if callback provided
-                                    if streaming_callback and htno not in processed_students:
-                                        processed_students.add(htno)
-                                        students_processed += 1
-                                        
-                                        # Calculate and send complete student record
-                                        grade_points = {
-                                            'S': 10, 'A+': 9, 'A': 8, 'B+': 7, 'B': 6, 
-                                            'C': 5, 'D': 4, 'F': 0, 'MP': 0, 'ABSENT': 0
-                                        }
-                                        
-                                        total_points = 0
-                                        total_credits = 0
-                                        for subject in student['subjectGrades']:
-                                            grade = subject.get('grade', 'F')
-                                            credits = subject.get('credits', 0)
-                                            points = grade_points.get(grade, 0)
-                                            total_points += points * credits
-                                            total_credits += credits
-                                        
-                                        sgpa = round(total_points / total_credits, 2) if total_credits > 0 else 0.0
-                                        
-                                        complete_record = {
-                                            "student_id": student['student_id'],
-                                            "semester": student['semester'],
-                                            "university": student['university'],
-                                            "upload_date": student['upload_date'],
-                                            "sgpa": sgpa,
-                                            "subjectGrades": student['subjectGrades'].copy()
-                                        }
-                                        
-                                        streaming_callback(complete_record, students_processed)
-                        except (ValueError, IndexError, AttributeError):
-                            continue
-            except Exception:
-                pass
+def parse_jntuk_pdf_stream(file_path, streaming_callback=None, parallel=False, engine=None, checkpoint_path=None,
+                           pages=None, group_document=False):
+    """Yield JNTUK student records one at a time, as soon as each student is finished.
+
+    Finished students are dropped from the parser, so peak memory stays flat with
+    respect to the PDF size as long as the caller does not keep the records. A hall
+    ticket that reappears after its record was yielded raises HallTicketReappeared;
+    group_document=True merges it instead, holding every student to the end.
+    streaming_callback(record, count) is called with each finished record.
+    The records match parse_jntuk_pdf exactly; see it for the other arguments.
+    """
+    students = _iter_students(file_path, workers=_resolve_workers(parallel), engine=engine,
+                              checkpoint_path=checkpoint_path, pages=pages, group_document=group_document)
+    for students_processed, record in enumerate(students, 1):
+        if streaming_callback:
+            streaming_callback(record, students_processed)
+        yield record
+
+def parse_jntuk_pdf(file_path, streaming_callback=None, parallel=False, engine=None, checkpoint_path=None,
+                    pages=None):
+    """Parse a JNTUK result PDF into per-student records.
+
+    Set parallel=True (or a worker count) to extract page ranges in separate processes;
+    the records are merged in page order and match the serial output exactly.
+    engine selects the extraction backend ("pdfplumber" or "pymupdf").
+    checkpoint_path logs every extracted page so an interrupted run can resume.
+    pages=(start, stop) parses only that 0-based page range, stop excluded; a student
+    whose rows cross a range boundary comes out partially in each range.
+    Rows are grouped by hall ticket over the whole document, so a student whose
+    rows reappear later is still one record. streaming_callback(record, count)
+    receives each student at the end; use parse_jntuk_pdf_stream to process
+    records without keeping them all in memory.
+    """
+    print(f"🚀 Starting real-time JNTUK parsing of: {file_path}")
+    start_time = time.time()
 
-    # Convert results to final format with SGPA calculation
     final_results = []
-    grade_points = {
-        'S': 10, 'A+': 9, 'A': 8, 'B+': 7, 'B': 6, 
-        'C': 5, 'D': 4, 'F': 0, 'MP': 0, 'ABSENT': 0
-    }
-    
-    for htno, student_data in results.items():
-        if student_data.get('subjectGrades'):
-            # Calculate SGPA
-            total_points = 0
-            total_credits = 0
-            
-            for subject in student_data['subjectGrades']:
-                grade = subject.get('grade', 'F')
-                credits = subject.get('credits', 0)
-                points = grade_points.get(grade, 0)
-                total_points += points * credits
-                total_credits += credits
-            
-            sgpa = round(total_points / total_credits, 2) if total_credits > 0 else 0.0
-            
-            final_results.append({
-                "student_id": student_data['student_id'],
-                "semester": student_data['semester'],
-                "university": student_data['university'],
-                "upload_date": student_data['upload_date'],
-                "sgpa": sgpa,
-                "subjectGrades": student_data['subjectGrades']
-            })
+    students = _iter_students(file_path, workers=_resolve_workers(parallel), engine=engine,
+                              checkpoint_path=checkpoint_path, pages=pages, group_document=True)
+    for record in students:
+        final_results.append(record)
+        if streaming_callback:
+            streaming_callback(record, len(final_results))
 
     total_time = time.time() - start_time
     print(f"✅ Extracted {len(final_results)} JNTUK student records in {total_time:.2f} seconds")
-    
+
     if final_results:
         print(f"📝 Sample record: {final_results[0]['student_id']} has {len(final_results[0]['subjectGrades'])} subjects")
     else:
@@ -0,0 +1,143 @@
+"""
+Pluggable PDF extraction engines for the result parsers.
+
+Every engine returns a document object that behaves like ``pdfplumber.open()``:
+it is a context manager with a ``pages`` sequence, and each page offers
+``extract_text()`` and ``extract_tables()``. The parsers only use that much of
+the pdfplumber API, so any engine can be swapped in per call.
+"""
+
+import pdfplumber
+
+try:
+    import pymupdf as fitz
+except ImportError:
+    try:
+        import fitz  # PyMuPDF < 1.24
+    except ImportError:
+        fitz = None
+
+PYMUPDF_AVAILABLE = fitz is not None
+
+DEFAULT_ENGINE = "pdfplumber"
+ENGINES = ("pdfplumber", "pymupdf")
+
+# Words whose tops differ by less than this many points share a row
+ROW_TOLERANCE = 3.0
+# Slack when assigning a word to the column whose header starts left of it
+COLUMN_TOLERANCE = 2.0
+
+class PyMuPDFPage:
+    """pdfplumber-style page built from PyMuPDF word bounding boxes"""
+
+    def __init__(self, page):
+        self._page = page
+        self._rows = None
+
+    def _word_rows(self):
+        """Group the page words into rows of (x0, text) ordered top to bottom, left to right"""
+        if self._rows is None:
+            # The JNTUK sheets put the Credits column slightly past the page edge
+            words = self._page.get_text("words", clip=fitz.INFINITE_RECT())
+            words.sort(key=lambda w: (w[1], w[0]))
+
+            rows = []
+            row_top = None
+            for x0, y0, x1, y1, text, *_ in words:
+                if row_top is None or abs(y0 - row_top) > ROW_TOLERANCE:
+                    rows.append([])
+                    row_top = y0
+                rows[-1].append((x0, text))
+
+            self._rows = [sorted(row) for row in rows]
+        return self._rows
+
+    def extract_text(self):
+        return "\n".join(" ".join(text for _, text in row) for row in self._word_rows())
+
+    def extract_tables(self):
+        """Rebuild the Sno/Htno/Subcode/Subname/Internals/Grade/Credits tables.
+
+        Column boundaries come from the x position of each header word; every
+        later word is placed in the right-most column that starts at or before it.
+        """
+        tables = []
+        columns = None
+
+        for row in self._word_rows():
+            texts = [text for _, text in row]
+            if 'Htno' in texts and ('Subcode' in texts or 'Subname' in texts):
+                columns = [x0 for x0, _ in row]
+                tables.append([texts])
+                continue
+
+            if columns is None:
+                continue
+
+            cells = [[] for _ in columns]
+            for x0, text in row:
+                col = 0
+                for idx, start in enumerate(columns):
+                    if start <= x0 + COLUMN_TOLERANCE:
+                        col = idx
+                cells[col].append(text)
+
+            tables[-1].append([" ".join(cell) if cell else None for cell in cells])
+
+        return tables
+
+class _PyMuPDFPages:
+    """Lazy page sequence so large documents are wrapped one page at a time"""
+
+    def __init__(self, doc):
+        self._doc = doc
+
+    def __len__(self):
+        return len(self._doc)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return PyMuPDFPage(self._doc[index])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+class PyMuPDFDocument:
+    """Context manager mirroring the subset of pdfplumber.PDF the parsers use"""
+
+    def __init__(self, file_path):
+        self._doc = fitz.open(file_path)
+        self.pages = _PyMuPDFPages(self._doc)
+
+    @property
+    def metadata(self):
+        """Document info with pdfplumber's key names, e.g. 'Producer'"""
+        return {key[:1].upper() + key[1:]: value for key, value in (self._doc.metadata or {}).items() if value}
+
+    def close(self):
+        self._doc.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def resolve_engine(engine=None):
+    """The name of the engine open_pdf() actually uses for the requested one"""
+    engine = (engine or DEFAULT_ENGINE).lower()
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown extraction engine '{engine}'. Must be one of: {', '.join(ENGINES)}")
+    if engine == "pymupdf" and not PYMUPDF_AVAILABLE:
+        return DEFAULT_ENGINE
+    return engine
+
+def open_pdf(file_path, engine=None):
+    """Open a PDF with the requested engine, falling back to pdfplumber"""
+    if (engine or "").lower() == "pymupdf" and not PYMUPDF_AVAILABLE:
+        print("⚠️ PyMuPDF not installed - falling back to pdfplumber")
+    if resolve_engine(engine) == "pymupdf":
+        return PyMuPDFDocument(file_path)
+    return pdfplumber.open(file_path)
@@ -0,0 +1,64 @@
+"""
+Quick preview of an uploaded result PDF.
+
+Only the first few pages are parsed, so the upload UI can show the detected
+layout, semester, exam type and a sample of records, plus an estimate of the
+full parse time, within a second of the upload instead of after a full parse.
+"""
+
+import time
+
+from .parser_autonomous_dynamic import detect_pdf_format
+from .parser_jntuk import HEADER_PAGES, SUPPLY_PATTERN
+from .pdf_engines import open_pdf
+from .registry import FORMATS, parse_pdf, probe_text, resolve_format
+
+PREVIEW_PAGES = 2  # pages parsed for a preview
+MAX_PREVIEW_PAGES = 10
+SAMPLE_SIZE = 5    # records returned as a sample
+TEXT_ENGINE = "pymupdf"  # engine for the quick text pass; falls back to pdfplumber
+
+def preview_pdf(file_path, format_type="jntuk", pages=PREVIEW_PAGES, sample_size=SAMPLE_SIZE, engine=None,
+                probe=None):
+    """Parse the first pages of a result PDF and describe what a full parse would produce.
+
+    format_type picks the parser as registry.resolve_format() does ("jntuk",
+    "autonomous" or "auto"); engine is passed to the JNTUK parser. The layout,
+    semester and exam type come from a quick text pass over the header pages,
+    which also probes the format unless the caller passes its probe_pdf()
+    result as probe. The parse time estimate scales the preview by the page count and excludes
+    uploads; the last sample student may be cut off.
+    """
+    start_time = time.time()
+
+    with open_pdf(file_path, TEXT_ENGINE) as pdf:
+        total_pages = len(pdf.pages)
+        preview_pages = min(pages, total_pages)
+        page_texts = [pdf.pages[page_num].extract_text() or ""
+                      for page_num in range(min(max(preview_pages, HEADER_PAGES), total_pages))]
+    text = "\n".join(page_texts[:preview_pages])
+    # The text pass already read the first page, so the probe does not open the PDF again
+    probe = probe or probe_text(page_texts[0] if page_texts else "", total_pages)
+    format_name = resolve_format(file_path, format_type, probe)
+
+    parse_start = time.time()
+    options = {"engine": engine} if format_name == "jntuk" else {}
+    records = parse_pdf(file_path, format_name, pages=(0, preview_pages), probe=probe, **options)
+    parse_time = time.time() - parse_start
+
+    seconds_per_page = parse_time / preview_pages if preview_pages else 0.0
+    is_supply = bool(SUPPLY_PATTERN.search("\n".join(page_texts[:HEADER_PAGES])))
+
+    return {
+        "format": FORMATS[format_name].family,
+        "parser": format_name,
+        "layout": detect_pdf_format(text) if text else None,
+        "semester": records[0]['semester'] if records else None,
+        "exam_type": "supply" if is_supply else "regular",
+        "total_pages": total_pages,
+        "pages_parsed": preview_pages,
+        "students_found": len(records),
+        "estimated_parse_seconds": round(seconds_per_page * total_pages, 1),
+        "preview_seconds": round(time.time() - start_time, 3),
+        "sample_records": records[:sample_size]
+    }
@@ -0,0 +1,270 @@
+"""
+Registry of the result PDF formats and the driver every format shares.
+
+Each registered format scores the header of a PDF's first page and streams
+student records. probe_pdf() reads the first page once and picks the best
+scoring format, so callers no longer choose a parser from a form field or the
+file name. iter_records() and iter_batches() then run any format with page
+ranges spread over worker processes, and parse_cache namespaces its entries by
+the registered format names and versions.
+"""
+
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from .parser_autonomous_dynamic import (
+    FORMAT_INDICATORS, PARSER_VERSION as AUTONOMOUS_PARSER_VERSION,
+    header_region, iter_autonomous_records, merge_tabular_records
+)
+from .parser_jntuk import (
+    PAGES_PER_TASK, PARSER_VERSION as JNTUK_PARSER_VERSION, SUPPLY_PATTERN,
+    _resolve_workers, parse_jntuk_pdf_generator, parse_jntuk_pdf_stream
+)
+from .pdf_engines import open_pdf
+from .result_batch import ResultBatch
+
+PROBE_ENGINE = "pymupdf"  # engine for the first-page probe; falls back to pdfplumber
+FAMILIES = ("jntuk", "autonomous")  # the values of the upload form's format field
+
+JNTUK_HEADER_PATTERN = re.compile(r'JAWAHARLAL\s+NEHRU\s+TECHNOLOGICAL\s+UNIVERSITY', re.IGNORECASE)
+AUTONOMOUS_HEADER_PATTERN = re.compile(r'\(\s*AUTONOMOUS\s*\)', re.IGNORECASE)
+# "II B.Tech I Semester" (JNTUK) or "I B.Tech. ( I Semester)" (autonomous)
+YEAR_SEMESTER_PATTERN = re.compile(r'\b(IV|I{1,3})\s*B\.?\s*Tech\.?\s*\(?\s*(IV|I{1,3})\s+Semester', re.IGNORECASE)
+ROMAN_NUMERALS = {'I': 1, 'II': 2, 'III': 3, 'IV': 4}
+
+class ResultFormat:
+    """A registered result layout: how to recognise it and how to parse it"""
+
+    def __init__(self, name, family, version, probe, stream, batches=None, merge=None, native_parallel=False,
+                 checkpoints=False):
+        self.name = name
+        self.family = family                    # "jntuk" or "autonomous", as stored with the results
+        self.version = version                  # parser version, part of the parse cache key
+        self.probe = probe                      # probe(header_text) -> score, 0 if not this layout
+        self.stream = stream                    # stream(file_path, pages=None, parallel=False, **options)
+        self.batches = batches                  # optional batches(file_path, batch_size, pages, parallel, **options)
+        self.merge = merge                      # merge(first, second) for a student split across page ranges
+        self.native_parallel = native_parallel  # stream() spreads pages over processes itself
+        self.checkpoints = checkpoints          # stream() takes a checkpoint_path to resume from
+
+FORMATS = {}  # name -> ResultFormat, in registration order
+
+def register_format(result_format):
+    """Add a format to the registry; a later registration of the same name replaces it"""
+    FORMATS[result_format.name] = result_format
+    return result_format
+
+def _indicator_probe(layout, header_pattern=None):
+    """Score a header by the layout indicators, plus one if header_pattern matches"""
+    patterns = FORMAT_INDICATORS[layout]
+    def probe(header):
+        score = sum(1 for pattern in patterns if pattern.search(header))
+        if score and header_pattern is not None and header_pattern.search(header):
+            score += 1
+        return score
+    return probe
+
+def _jntuk_stream(file_path, pages=None, parallel=False, **options):
+    return parse_jntuk_pdf_stream(file_path, parallel=parallel, pages=pages, **options)
+
+def _jntuk_batches(file_path, batch_size, pages=None, parallel=False, **options):
+    return parse_jntuk_pdf_generator(file_path, batch_size=batch_size, parallel=parallel, pages=pages, **options)
+
+def _autonomous_stream(layout):
+    def stream(file_path, pages=None, parallel=False, **options):
+        return iter_autonomous_records(file_path, pages=pages, format_type=layout, **options)
+    return stream
+
+register_format(ResultFormat(
+    "jntuk", "jntuk", JNTUK_PARSER_VERSION,
+    probe=_indicator_probe("tabular", JNTUK_HEADER_PATTERN),
+    stream=_jntuk_stream, batches=_jntuk_batches, native_parallel=True, checkpoints=True
+))
+register_format(ResultFormat(
+    "autonomous_tabular", "autonomous", AUTONOMOUS_PARSER_VERSION,
+    probe=_indicator_probe("tabular", AUTONOMOUS_HEADER_PATTERN),
+    stream=_autonomous_stream("tabular"), merge=merge_tabular_records
+))
+register_format(ResultFormat(
+    "grouped", "autonomous", AUTONOMOUS_PARSER_VERSION,
+    probe=_indicator_probe("grouped"), stream=_autonomous_stream("grouped")
+))
+register_format(ResultFormat(
+    "matrix", "autonomous", AUTONOMOUS_PARSER_VERSION,
+    probe=_indicator_probe("matrix"), stream=_autonomous_stream("matrix")
+))
+
+def probe_pdf(file_path):
+    """Read the first page of a PDF once and score every registered format.
+
+    Returns a dict with the best scoring format name ("format", None when no
+    format recognises the page), its family, every format's score, the page
+    count, and the year, semester and exam type printed in the header.
+    """
+    with open_pdf(file_path, PROBE_ENGINE) as pdf:
+        total_pages = len(pdf.pages)
+        text = (pdf.pages[0].extract_text() or "") if total_pages else ""
+    return probe_text(text, total_pages)
+
+def probe_text(text, total_pages):
+    """probe_pdf() for a first page whose text the caller has already extracted"""
+    header = header_region(text)
+    scores = {name: result_format.probe(header) for name, result_format in FORMATS.items()}
+    best = max(scores, key=scores.get) if scores else None  # ties go to the earliest registration
+    if best is not None and scores[best] == 0:
+        best = None
+
+    year = semester = None
+    year_semester = YEAR_SEMESTER_PATTERN.search(header)
+    if year_semester:
+        year = f"{ROMAN_NUMERALS[year_semester.group(1).upper()]} Year"
+        semester = f"Semester {ROMAN_NUMERALS[year_semester.group(2).upper()]}"
+
+    return {
+        "format": best,
+        "family": FORMATS[best].family if best else None,
+        "scores": scores,
+        "total_pages": total_pages,
+        "year": year,
+        "semester": semester,
+        "exam_type": "supplementary" if SUPPLY_PATTERN.search(header) else "regular"
+    }
+
+def resolve_format(file_path, requested=None, probe=None):
+    """Pick the registered format for a PDF.
+
+    requested is a format name, a family ("jntuk" or "autonomous") or None/"auto"
+    to let the first-page probe decide. A family picks its best scoring format.
+    Raises ValueError for an unknown request or an unrecognised PDF.
+    """
+    requested = (requested or "auto").lower()
+    if requested in FORMATS and requested not in FAMILIES:
+        return requested
+    if requested == "jntuk":
+        return "jntuk"  # the only JNTUK layout
+    if requested not in FAMILIES and requested != "auto":
+        raise ValueError(f"Unknown format '{requested}'. Must be 'auto', one of {', '.join(FAMILIES)} "
+                         f"or one of {', '.join(FORMATS)}")
+
+    probe = probe or probe_pdf(file_path)
+    if requested == "auto":
+        if probe["format"] is None:
+            raise ValueError("Could not recognise the result layout on the first page")
+        return probe["format"]
+
+    candidates = [name for name, result_format in FORMATS.items() if result_format.family == requested]
+    best = max(candidates, key=lambda name: probe["scores"][name])
+    # An unrecognised autonomous sheet falls back to the grouped parser, as detect_pdf_format does
+    return best if probe["scores"][best] else "grouped"
+
+def _page_ranges(total_pages, pages):
+    """Split the pages to parse into contiguous ranges of PAGES_PER_TASK pages"""
+    window = range(total_pages)
+    if pages is not None:
+        window = window[pages[0]:pages[1]]
+    return [(start, min(start + PAGES_PER_TASK, window.stop)) for start in range(window.start, window.stop, PAGES_PER_TASK)]
+
+def _parse_page_range(format_name, file_path, page_range, options):
+    """Worker-process side of the driver: parse one page range to a ResultBatch"""
+    return ResultBatch(FORMATS[format_name].stream(file_path, pages=page_range, **options))
+
+def _iter_parallel(result_format, file_path, pages, workers, options, probe=None):
+    """Parse page ranges on a process pool, yielding records in page order.
+
+    A student whose rows straddle two ranges comes back as two records; they
+    are joined with the format's merge() when it has one. With the
+    group_document option every record is held to the end, so a student who
+    reappears in a later range is merged too. The page count comes from probe
+    when the caller has one.
+    """
+    if probe is None:
+        with open_pdf(file_path, PROBE_ENGINE) as pdf:
+            total_pages = len(pdf.pages)
+    else:
+        total_pages = probe["total_pages"]
+    ranges = _page_ranges(total_pages, pages)
+    workers = min(workers, len(ranges))
+    print(f"⚡ Parsing {len(ranges)} page ranges of {result_format.name} with {workers} worker processes")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_parse_page_range, result_format.name, file_path, page_range, options)
+                   for page_range in ranges]
+        if options.get('group_document') and result_format.merge:
+            grouped = {}  # student_id -> record, in order of first appearance
+            for future in futures:
+                for record in future.result().to_records():
+                    student_id = record['student_id']
+                    grouped[student_id] = (result_format.merge(grouped[student_id], record)
+                                           if student_id in grouped else record)
+            yield from grouped.values()
+            return
+
+        previous = None
+        for future in futures:
+            records = future.result().to_records()
+            if previous is not None and records and result_format.merge \
+                    and records[0]['student_id'] == previous['student_id']:
+                records[0] = result_format.merge(previous, records[0])
+            elif previous is not None:
+                yield previous
+            if records:
+                yield from records[:-1]
+                previous = records[-1]
+        if previous is not None:
+            yield previous
+
+def iter_records(file_path, format_name=None, pages=None, parallel=False, probe=None, **options):
+    """Stream the student records of a PDF with a registered format.
+
+    format_name is anything resolve_format() accepts. pages=(start, stop) limits
+    the 0-based page range, stop excluded. parallel (True or a worker count)
+    spreads the pages over processes: formats that do this themselves get the
+    flag, the others are split into page ranges here. options are passed on to
+    the format's parser (e.g. engine and checkpoint_path for JNTUK, semester and
+    university for the autonomous layouts); a checkpoint_path is dropped for
+    formats that cannot resume. probe is the caller's probe_pdf() result, so
+    the PDF is not probed again. A student who reappears after their record was
+    streamed raises HallTicketReappeared unless group_document=True holds the
+    records to the end of the document and merges them.
+    """
+    result_format = FORMATS[resolve_format(file_path, format_name, probe)]
+    if not result_format.checkpoints:
+        options.pop('checkpoint_path', None)
+    workers = _resolve_workers(parallel)
+    if result_format.native_parallel:
+        return result_format.stream(file_path, pages=pages, parallel=parallel, **options)
+    if workers and workers > 1:
+        return _iter_parallel(result_format, file_path, pages, workers, options, probe)
+    return result_format.stream(file_path, pages=pages, **options)
+
+def iter_batches(file_path, batch_size, format_name=None, pages=None, parallel=False, probe=None, **options):
+    """Yield lists of up to batch_size records; see iter_records() for the arguments"""
+    result_format = FORMATS[resolve_format(file_path, format_name, probe)]
+    if not result_format.checkpoints:
+        options.pop('checkpoint_path', None)
+    if result_format.batches:
+        yield from result_format.batches(file_path, batch_size, pages=pages, parallel=parallel, **options)
+        return
+
+    batch = []
+    for record in iter_records(file_path, result_format.name, pages, parallel, probe, **options):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def parse_pdf(file_path, format_name=None, pages=None, parallel=False, probe=None, **options):
+    """All student records of a PDF as a list; see iter_records() for the arguments.
+
+    The whole document is collected anyway, so a reappearing student is merged
+    (group_document defaults to True).
+    """
+    options.setdefault('group_document', True)
+    return list(iter_records(file_path, format_name, pages, parallel, probe, **options))
+
+def parse_results(file_path, format_name=None, pages=None, parallel=False, probe=None, **options):
+    """All student records of a PDF as a ResultBatch, grouped over the document as parse_pdf() does"""
+    options.setdefault('group_document', True)
+    return ResultBatch(iter_records(file_path, format_name, pages, parallel, probe, **options))
@@ -0,0 +1,210 @@
+"""
+Columnar in-memory form of parsed student results.
+
+A parsed PDF is thousands of student dicts, each holding a list of 5-key
+subject dicts that repeat the same subject codes and names. ResultBatch keeps
+the subjects as typed array columns instead: code and name indexes into
+interned tables, internals, grade indexes and credits. Students are __slots__
+objects that point at their slice of the columns. The usual record dicts are
+only rebuilt at the JSON and Firestore boundary, with to_records().
+
+Every record and subject keeps its own key layout, so records with extra or
+missing keys round trip as they came in. Values that do not fit their typed
+column are kept as they are beside it.
+"""
+
+from array import array
+
+SUBJECT_COLUMNS = ('code', 'subject', 'grade', 'internals', 'credits')
+INT_RANGE = range(-2**31, 2**31)  # what an array('i') holds
+
+class StudentResult:
+    """One student of a ResultBatch: the rows start:stop of the subject columns"""
+
+    __slots__ = ('student_id', 'sgpa', 'fields', 'layout', 'start', 'stop')
+
+    def __init__(self, student_id, sgpa, fields, layout, start, stop):
+        self.student_id = student_id
+        self.sgpa = sgpa
+        self.fields = fields  # the other record fields, a dict shared by students with equal values
+        self.layout = layout  # index of the record's key order in ResultBatch.record_layouts
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+def _fields_key(fields):
+    """Intern key of a field dict; types are part of it, since True == 1 == 1.0"""
+    return tuple((key, type(value), value) for key, value in fields.items())
+
+class _Table:
+    """Interned values and their indexes, in order of first appearance.
+
+    Values are keyed with their type, so True, 1 and 1.0 stay distinct.
+    """
+
+    __slots__ = ('values', 'index')
+
+    def __init__(self):
+        self.values = []
+        self.index = {}
+
+    def code(self, value):
+        key = (type(value), value)
+        code = self.index.get(key)
+        if code is None:
+            code = self.index[key] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __getstate__(self):
+        return self.values
+
+    def __setstate__(self, values):
+        self.values = values
+        self.index = {(type(value), value): code for code, value in enumerate(values)}
+
+class ResultBatch:
+    """Student records in columnar form; see the module docstring"""
+
+    def __init__(self, records=()):
+        self.students = []
+        self.record_layouts = _Table()   # key orders of the record dicts
+        self.subject_layouts = _Table()  # key orders of the subject dicts
+        self.codes = _Table()
+        self.names = _Table()
+        self.grades = _Table()
+        self.code_column = array('I')
+        self.name_column = array('I')
+        self.grade_column = array('H')
+        self.internals = array('i')
+        self.credits = array('d')
+        self.layout_column = array('H')  # subject_layouts index of each subject row
+        self.extras = {}  # row -> the subject values that are not in a column
+        self._fields = {}  # interned per-student field dicts
+        self.extend(records)
+
+    @classmethod
+    def from_records(cls, records):
+        return cls(records)
+
+    def append(self, record):
+        """Add one record dict (student_id, sgpa, subjectGrades and any other fields)"""
+        start = len(self.credits)
+        columns = ('student_id', 'sgpa', 'subjectGrades')
+        if not isinstance(record.get('subjectGrades'), list):
+            columns = ('student_id', 'sgpa')  # anything else is kept with the other fields
+        for subject in record['subjectGrades'] if 'subjectGrades' in columns else ():
+            self._append_subject(subject)
+
+        fields = {key: value for key, value in record.items() if key not in columns}
+        try:
+            fields = self._fields.setdefault(_fields_key(fields), fields)
+        except TypeError:
+            pass  # unhashable values (lists, dicts) are not shared
+        self.students.append(StudentResult(record.get('student_id'), record.get('sgpa'), fields,
+                                           self.record_layouts.code(tuple(record)), start, len(self.credits)))
+
+    def _append_subject(self, subject):
+        row = len(self.credits)
+        extra = {key: value for key, value in subject.items() if key not in SUBJECT_COLUMNS}
+        indexes = []
+        for key, table in (('code', self.codes), ('subject', self.names), ('grade', self.grades)):
+            index = 0
+            if key in subject:
+                try:
+                    index = table.code(subject[key])
+                except TypeError:
+                    extra[key] = subject[key]
+            indexes.append(index)
+
+        internals, credits = subject.get('internals', 0), subject.get('credits', 0.0)
+        if type(internals) is not int or internals not in INT_RANGE:
+            extra['internals'], internals = internals, 0
+        if type(credits) is not float:
+            extra['credits'], credits = credits, 0.0
+        for key in ('internals', 'credits'):
+            if key not in subject:
+                extra.pop(key, None)
+
+        self.code_column.append(indexes[0])
+        self.name_column.append(indexes[1])
+        self.grade_column.append(indexes[2])
+        self.internals.append(internals)
+        self.credits.append(credits)
+        self.layout_column.append(self.subject_layouts.code(tuple(subject)))
+        if extra:
+            self.extras[row] = extra
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def set_field(self, key, value, where=None):
+        """Set a record field on every student, or on those where(student) accepts, as record[key] = value does"""
+        if key in ('student_id', 'sgpa', 'subjectGrades'):
+            raise ValueError(f"{key} is a column, not a field")
+        for student in self.students:
+            if where is not None and not where(student):
+                continue
+            layout = self.record_layouts.values[student.layout]
+            if key not in layout:
+                student.layout = self.record_layouts.code(layout + (key,))
+            fields = dict(student.fields)
+            fields[key] = value
+            try:
+                fields = self._fields.setdefault(_fields_key(fields), fields)
+            except TypeError:
+                pass
+            student.fields = fields
+
+    def __len__(self):
+        return len(self.students)
+
+    def __iter__(self):
+        return iter(self.students)
+
+    def __getitem__(self, index):
+        return self.students[index]
+
+    def subjects(self, student):
+        """The subject dicts of one student"""
+        layouts, codes, names, grades = (self.subject_layouts.values, self.codes.values,
+                                         self.names.values, self.grades.values)
+        subjects = []
+        for row in range(student.start, student.stop):
+            values = {
+                'code': codes[self.code_column[row]] if codes else None,
+                'subject': names[self.name_column[row]] if names else None,
+                'grade': grades[self.grade_column[row]] if grades else None,
+                'internals': self.internals[row],
+                'credits': self.credits[row]
+            }
+            values.update(self.extras.get(row, ()))
+            subjects.append({key: values[key] for key in layouts[self.layout_column[row]]})
+        return subjects
+
+    def record(self, student):
+        """The record dict of one student, as the parsers produce it"""
+        values = {'student_id': student.student_id, 'sgpa': student.sgpa, 'subjectGrades': self.subjects(student)}
+        values.update(student.fields)  # holds subjectGrades when it was not a list
+        return {key: values[key] for key in self.record_layouts.values[student.layout]}
+
+    def to_records(self):
+        """Every student as a record dict, for JSON files and Firestore"""
+        return [self.record(student) for student in self.students]
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_fields']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._fields = {}
+        for student in self.students:
+            try:
+                self._fields.setdefault(_fields_key(student.fields), student.fields)
+            except TypeError:
+                pass
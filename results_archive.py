@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Columnar archives of the parsed result files in data/
+Each data/<name>.json can have a data/<name>.npz beside it holding its students
+column by column: every record field is a typed or dictionary-encoded array and
+the subject rows are flattened into columns of their own. Readers load only the
+columns they ask for, and skip a file from its header (exam type, format) or
+from a column's value table (semester, student id) before any row is read.
+The JSON stays the source of truth; an archive that is missing or older than its
+JSON is ignored and the results index answers for that file instead. Point and
+semester lookups stay on the results index; the archives serve column
+projections (?fields=) and whole-column scans for analytics.
+
+Usage:
+    python results_archive.py build [<json> ...]
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+import results_index
+from data_cache import load_data_file
+
+ARCHIVE_SUFFIX = '.npz'
+ARCHIVE_VERSION = 1
+SUBJECTS_KEY = 'subjectGrades'
+
+_MISSING = object()
+
+def archive_path(json_path):
+    return Path(json_path).with_suffix(ARCHIVE_SUFFIX)
+
+def _encode_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+def _column_kind(values):
+    """'float' or 'int' when every present value has that type, else 'json' (dictionary-encoded)"""
+    kinds = {type(value) for value in values}
+    if kinds == {float}:
+        return 'float'
+    if kinds == {int} and all(-2 ** 63 <= value < 2 ** 63 for value in values):
+        return 'int'
+    return 'json'
+
+def _encode_table(rows, prefix, arrays):
+    """Store a list of dicts as columns named <prefix><n>; returns their layout for the header.
+
+    Rows keep their own key order: each distinct key sequence is a layout and
+    <prefix>layout holds every row's layout number.
+    """
+    layouts, layout_index, columns = [], {}, {}
+    row_layouts = np.empty(len(rows), dtype=np.int32)
+    for row_number, row in enumerate(rows):
+        keys = tuple(row)
+        if keys not in layout_index:
+            layout_index[keys] = len(layouts)
+            layouts.append(list(keys))
+        row_layouts[row_number] = layout_index[keys]
+        for key in keys:
+            columns.setdefault(key, None)
+    arrays[f"{prefix}layout"] = row_layouts
+
+    column_info = []
+    for number, key in enumerate(columns):
+        name = f"{prefix}{number}"
+        values = [row.get(key, _MISSING) for row in rows]
+        kind = _column_kind([value for value in values if value is not _MISSING])
+        if kind == 'float':
+            arrays[name] = np.array([0.0 if value is _MISSING else value for value in values], dtype=np.float64)
+        elif kind == 'int':
+            arrays[name] = np.array([0 if value is _MISSING else value for value in values], dtype=np.int64)
+        else:
+            table, table_index = [], {}
+            codes = np.full(len(values), -1, dtype=np.int32)  # -1: the row has no such key
+            for row_number, value in enumerate(values):
+                if value is _MISSING:
+                    continue
+                encoded = _encode_json(value)
+                code = table_index.get(encoded)
+                if code is None:
+                    code = table_index[encoded] = len(table)
+                    table.append(encoded)
+                codes[row_number] = code
+            arrays[f"{name}_codes"] = codes
+            arrays[f"{name}_values"] = np.array(table, dtype=str)
+        column_info.append({"key": key, "name": name, "kind": kind})
+    return {"layouts": layouts, "columns": column_info}
+
+def write_archive(json_path, data=None):
+    """Write the archive of one result file; data is its decoded JSON if already in memory"""
+    json_path = Path(json_path)
+    stat = json_path.stat()
+    data = load_data_file(json_path) if data is None else data
+    metadata = data.get("metadata", {})
+    students = data.get("students", [])
+
+    # subjectGrades is flattened only when every record holds a list of subject dicts
+    nested = all(isinstance(student.get(SUBJECTS_KEY, []), list)
+                 and all(isinstance(subject, dict) for subject in student.get(SUBJECTS_KEY, []))
+                 for student in students)
+    arrays = {}
+    if nested:
+        records = [{key: (None if key == SUBJECTS_KEY else value) for key, value in student.items()}
+                   for student in students]
+        subjects = [subject for student in students for subject in student.get(SUBJECTS_KEY, [])]
+        offsets = np.zeros(len(students) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(student.get(SUBJECTS_KEY, [])) for student in students])
+        arrays["subject_offsets"] = offsets
+        subject_info = _encode_table(subjects, "s", arrays)
+    else:
+        records, subject_info = students, None
+    record_info = _encode_table(records, "r", arrays)
+
+    file_format, file_exam_type = results_index._file_filters(metadata)
+    header = {
+        "version": ARCHIVE_VERSION,
+        "source": {"filename": json_path.name, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size},
+        "metadata": metadata,
+        "format": file_format,
+        "exam_type": file_exam_type,
+        "student_count": len(students),
+        "records": record_info,
+        "subjects": subject_info
+    }
+    arrays["header"] = np.array(_encode_json(header))
+
+    target = archive_path(json_path)
+    tmp_path = target.with_name(f"{target.stem}.tmp{ARCHIVE_SUFFIX}")
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, target)
+    return target
+
+def archive_result_file(json_path, data=None):
+    """Archive a result file that was just written; a failure only costs the columnar fast path"""
+    try:
+        return write_archive(json_path, data)
+    except Exception as e:
+        print(f"⚠️ Could not archive {os.path.basename(json_path)}: {e}")
+        return None
+
+class ResultArchive:
+    """An open archive; columns are read from the file only when asked for"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._npz = np.load(self.path, allow_pickle=False)
+        self.header = json.loads(self._npz["header"].item())
+        self.count = self.header["student_count"]
+        self._columns = {column["key"]: column for column in self.header["records"]["columns"]}
+
+    def close(self):
+        self._npz.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def is_current(self, json_path):
+        """True when the archive was written from the JSON file as it is now"""
+        stat = os.stat(json_path)
+        source = self.header["source"]
+        return (self.header["version"] == ARCHIVE_VERSION
+                and (source["mtime_ns"], source["size"]) == (stat.st_mtime_ns, stat.st_size))
+
+    def matching_rows(self, key, value):
+        """Row numbers whose record has key == value, found through the column's value table"""
+        column = self._columns.get(key)
+        if column is None:
+            return np.empty(0, dtype=np.int64)
+        if column["kind"] != 'json':
+            if type(value) is not (float if column["kind"] == 'float' else int):
+                return np.empty(0, dtype=np.int64)
+            present = self._present_rows(key)
+            return present[self._npz[column["name"]][present] == value]
+        table = self._npz[f"{column['name']}_values"]
+        code = np.flatnonzero(table == _encode_json(value))
+        if not len(code):
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self._npz[f"{column['name']}_codes"] == code[0])
+
+    def _present_rows(self, key):
+        layouts = [key in layout for layout in self.header["records"]["layouts"]]
+        return np.flatnonzero(np.array(layouts, dtype=bool)[self._npz["rlayout"]])
+
+    def _decode(self, table_info, prefix, rows, keys):
+        """Decode the selected rows of one stored table to dicts with only the given keys"""
+        columns = {}
+        for column in table_info["columns"]:
+            if keys is not None and column["key"] not in keys:
+                continue
+            if column["kind"] == 'json':
+                table = [json.loads(value) for value in self._npz[f"{column['name']}_values"].tolist()]
+                codes = self._npz[f"{column['name']}_codes"][rows].tolist()
+                columns[column["key"]] = (table, codes)
+            else:
+                columns[column["key"]] = (None, self._npz[column["name"]][rows].tolist())
+
+        layouts = [[key for key in layout if key in columns] for layout in table_info["layouts"]]
+        decoded = []
+        for position, layout in enumerate(self._npz[f"{prefix}layout"][rows].tolist()):
+            row = {}
+            for key in layouts[layout]:
+                table, values = columns[key]
+                value = values[position]
+                if table is not None:
+                    value = table[value]
+                    if isinstance(value, (dict, list)):
+                        value = json.loads(_encode_json(value))  # no two rows share a mutable value
+                row[key] = value
+            decoded.append(row)
+        return decoded
+
+    def records(self, rows=None, columns=None):
+        """Records of the given rows (default all), projected to the given columns (default all)"""
+        rows = np.arange(self.count) if rows is None else np.asarray(rows, dtype=np.int64)
+        keys = None if columns is None else set(columns)
+        records = self._decode(self.header["records"], "r", rows, keys)
+        subject_info = self.header["subjects"]
+        if subject_info is None or (keys is not None and SUBJECTS_KEY not in keys):
+            return records
+
+        offsets = self._npz["subject_offsets"]
+        starts, stops = offsets[rows], offsets[rows + 1]
+        subject_rows = np.concatenate([np.arange(start, stop) for start, stop in zip(starts, stops)]) \
+            if len(rows) else np.empty(0, dtype=np.int64)
+        subjects = self._decode(subject_info, "s", subject_rows, None)
+        position = 0
+        for record, start, stop in zip(records, starts.tolist(), stops.tolist()):
+            if SUBJECTS_KEY in record:
+                record[SUBJECTS_KEY] = subjects[position:position + stop - start]
+            position += stop - start
+        return records
+
+    def query(self, columns=None, exam_type=None, format_type=None, **equals):
+        """Records matching the file filters and key == value predicates, projected to columns"""
+        if format_type and self.header["format"] != format_type.lower():
+            return []
+        if exam_type and self.header["exam_type"] != exam_type.lower():
+            return []
+        rows = None
+        for key, value in equals.items():
+            if value is None:
+                continue
+            matches = self.matching_rows(key, value)
+            rows = matches if rows is None else np.intersect1d(rows, matches)
+            if not len(rows):
+                return []
+        return self.records(rows, columns)
+
+def open_current_archive(json_path):
+    """The ResultArchive of a JSON file if it exists and is up to date, else None"""
+    path = archive_path(json_path)
+    if not path.exists():
+        return None
+    try:
+        archive = ResultArchive(path)
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable archive {path.name}: {e}")
+        return None
+    try:
+        if archive.is_current(json_path):
+            return archive
+    except OSError:
+        pass
+    archive.close()
+    return None
+
+def query_archives(data_dir=None, columns=None, exam_type=None, format_type=None, filenames=None, **equals):
+    """Query the current archives in data/, of every file or of the given JSON filenames.
+
+    Returns (records, filenames): the matching records in filename order with
+    their "source_file", and the JSON filenames that were answered from an
+    archive, whether or not they matched.
+    """
+    data_dir = Path(data_dir or results_index.DATA_DIR)
+    records, archived = [], []
+    if not data_dir.exists():
+        return records, archived
+    json_paths = sorted(data_dir.glob("*.json")) if filenames is None else [data_dir / name for name in filenames]
+    for json_path in json_paths:
+        archive = open_current_archive(json_path)
+        if archive is None:
+            continue
+        with archive:
+            archived.append(json_path.name)
+            for record in archive.query(columns, exam_type, format_type, **equals):
+                record["source_file"] = json_path.name
+                records.append(record)
+    return records, archived
+
+def _with_index_results(archived_results, index_query, columns):
+    """Merge archive results with the index's results for the files without an archive"""
+    records, archived = archived_results
+    for record in index_query(exclude_files=archived):
+        if columns is not None:
+            record = {key: value for key, value in record.items() if key in columns or key == "source_file"}
+        records.append(record)
+    records.sort(key=lambda record: record["source_file"])  # stable: file order, then position
+    return records
+
+def query_semester_columns(semester, columns, exam_type=None, format_type=None, data_dir=None):
+    """The given columns of every record for a semester.
+
+    The results index names the files that hold the semester, so only their
+    archives are opened; files without a current archive are answered by the
+    index.
+    """
+    filenames = results_index.query_result_files(semester, exam_type, format_type)
+    return _with_index_results(
+        query_archives(data_dir, columns, exam_type, format_type, filenames, semester=semester),
+        lambda exclude_files: results_index.query_semester_results(semester, exam_type, format_type,
+                                                                   exclude_files=exclude_files),
+        columns
+    )
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Manage the columnar archives of data/")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    build_cmd = commands.add_parser("build", help="Archive result files (default: every file in data/)")
+    build_cmd.add_argument("files", nargs="*", help="Result JSON files to archive")
+    args = arg_parser.parse_args()
+
+    start = time.time()
+    files = args.files or sorted(str(path) for path in results_index.DATA_DIR.glob("*.json"))
+    json_bytes = archive_bytes = 0
+    for json_file in files:
+        target = archive_result_file(json_file)
+        if target is None:
+            continue
+        json_bytes += os.path.getsize(json_file)
+        archive_bytes += os.path.getsize(target)
+        print(f"📦 {os.path.basename(json_file)} -> {target.name}")
+    print(f"✅ Archived {len(files)} files in {time.time() - start:.2f}s: "
+          f"{json_bytes / 1024:.0f} KB of JSON in {archive_bytes / 1024:.0f} KB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+SQLite index over the parsed result files in data/
+Serves student, semester and exam-type lookups without loading every JSON file,
+and doubles as the catalog of per-file metadata used for listings and reports
+
+Usage:
+    python results_index.py rebuild
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from data_cache import load_data_file
+from jsonl_output import HEADER_SUFFIX, legacy_json_path, load_jsonl_header
+
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'results_index.db')
+DATA_DIR = Path(os.path.dirname(os.path.abspath(__file__))) / 'data'
+
+# How often query helpers re-check data/ for files written outside the app
+SYNC_INTERVAL = 10  # seconds
+
+_sync_lock = threading.Lock()
+_last_sync = 0.0
+
+_schema_lock = threading.Lock()
+_migrated_paths = set()  # index files this process has brought to SCHEMA_VERSION
+
+# Bump when the tables change; an outdated index is dropped and rebuilt from data/
+SCHEMA_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    directory TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    ctime REAL NOT NULL,
+    format TEXT,
+    exam_type TEXT,
+    student_count INTEGER NOT NULL DEFAULT 0,
+    metadata TEXT,
+    firebase_status TEXT,
+    firebase_upload TEXT,
+    error TEXT,
+    PRIMARY KEY (directory, filename)
+);
+CREATE TABLE IF NOT EXISTS students (
+    directory TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    student_id TEXT,
+    semester TEXT,
+    exam_type TEXT,
+    format TEXT,
+    record TEXT NOT NULL,
+    PRIMARY KEY (directory, filename, position)
+);
+CREATE INDEX IF NOT EXISTS idx_students_student ON students (directory, student_id, semester, exam_type, format);
+CREATE INDEX IF NOT EXISTS idx_students_semester ON students (directory, semester, exam_type, format);
+"""
+
+def _migrate(index_path):
+    """Bring the index at index_path to SCHEMA_VERSION, once per process.
+
+    The version is checked again under a write lock, so of several threads or
+    processes finding an outdated index only the first drops and recreates the
+    tables; the others wait for its commit and leave the new tables alone.
+    """
+    with _schema_lock:
+        if index_path in _migrated_paths:
+            return
+        conn = sqlite3.connect(index_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                    conn.execute("DROP TABLE IF EXISTS students")
+                    conn.execute("DROP TABLE IF EXISTS files")
+                    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                for statement in filter(str.strip, SCHEMA.split(";")):
+                    conn.execute(statement)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        _migrated_paths.add(index_path)
+
+def _connect():
+    os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+    _migrate(INDEX_PATH)
+    conn = sqlite3.connect(INDEX_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+def _directory(data_dir=None):
+    """Rows are keyed by the resolved directory of their file, so that syncing one
+    directory, or the same one reached from another working directory, never
+    touches the rows of another"""
+    return str(Path(data_dir or DATA_DIR).resolve())
+
+@contextmanager
+def _index():
+    """Open the index, commit on success and always close the connection"""
+    conn = _connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def _file_filters(metadata):
+    """Format and exam type are filtered per file, lower-cased, as the JSON scans did"""
+    return (
+        str(metadata.get("format", "") or "").lower(),
+        str(metadata.get("exam_type", "") or "").lower()
+    )
+
+def _encode(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+def _file_row(directory, filename, stat, metadata, student_count, firebase_status=None, firebase_upload=None, error=None):
+    file_format, file_exam_type = _file_filters(metadata)
+    return (directory, filename, stat.st_mtime_ns, stat.st_size, stat.st_ctime, file_format, file_exam_type, student_count,
+            _encode(metadata), _encode(firebase_status or {}), _encode(firebase_upload or {}), error)
+
+def _student_rows(directory, filename, metadata, students, start_position=0):
+    file_format, file_exam_type = _file_filters(metadata)
+    for position, student in enumerate(students, start_position):
+        yield (
+            directory,
+            filename,
+            position,
+            student.get("student_id"),
+            student.get("semester"),
+            file_exam_type,
+            file_format,
+            _encode(student)
+        )
+
+def _replace_file(conn, json_path, stat):
+    """(Re)index one result file; unreadable files are recorded with no students"""
+    directory, filename = _directory(Path(json_path).parent), os.path.basename(json_path)
+    data = {}
+    metadata = {}
+    students = []
+    error = None
+    try:
+        data = load_data_file(json_path)
+        metadata = data.get("metadata", {})
+        students = data.get("students", [])
+    except Exception as e:
+        error = str(e)
+        print(f"⚠️ Could not index {filename}: {e}")
+
+    conn.execute("DELETE FROM students WHERE directory = ? AND filename = ?", (directory, filename))
+    conn.executemany("INSERT INTO students VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     _student_rows(directory, filename, metadata, students))
+    conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                 _file_row(directory, filename, stat, metadata, len(students),
+                           data.get("firebase_status"), data.get("firebase_upload"), error))
+
+def index_result_file(json_path):
+    """Index a result file that was just written (replaces any previous rows for it)"""
+    with _index() as conn:
+        _replace_file(conn, json_path, os.stat(json_path))
+
+def sync_index(data_dir=None, force=False):
+    """Bring the index up to date with data/ using only stat() calls.
+
+    New or modified files are re-indexed and deleted files are dropped; rows of
+    files in other directories are left alone. Runs at most once every
+    SYNC_INTERVAL seconds unless forced.
+    """
+    global _last_sync
+    data_dir = Path(data_dir or DATA_DIR)
+    directory = _directory(data_dir)
+
+    with _sync_lock:
+        if not force and time.time() - _last_sync < SYNC_INTERVAL:
+            return
+        _last_sync = time.time()
+
+        on_disk = {}
+        if data_dir.exists():
+            for json_file in data_dir.glob("*.json"):
+                try:
+                    on_disk[json_file.name] = (json_file, json_file.stat())
+                except OSError:
+                    continue
+
+        with _index() as conn:
+            indexed = {filename: (mtime_ns, size) for filename, mtime_ns, size in conn.execute(
+                "SELECT filename, mtime_ns, size FROM files WHERE directory = ?", (directory,))}
+
+            for filename in indexed.keys() - on_disk.keys():
+                conn.execute("DELETE FROM students WHERE directory = ? AND filename = ?", (directory, filename))
+                conn.execute("DELETE FROM files WHERE directory = ? AND filename = ?", (directory, filename))
+
+            for filename, (json_file, stat) in on_disk.items():
+                if indexed.get(filename) != (stat.st_mtime_ns, stat.st_size):
+                    _replace_file(conn, json_file, stat)
+
+def _query_records(where, params, exclude_files=()):
+    where.append("directory = ?")
+    params.append(_directory())
+    if exclude_files:
+        where.append(f"filename NOT IN ({', '.join('?' * len(exclude_files))})")
+        params.extend(exclude_files)
+    sync_index()
+    with _index() as conn:
+        rows = conn.execute(
+            f"SELECT record, filename FROM students WHERE {' AND '.join(where)} ORDER BY filename, position",
+            params
+        ).fetchall()
+
+    results = []
+    for record, filename in rows:
+        student = json.loads(record)
+        # Add source file info
+        student["source_file"] = filename
+        results.append(student)
+    return results
+
+def _add_file_filters(where, params, exam_type, format_type):
+    if format_type:
+        where.append("format = ?")
+        params.append(format_type.lower())
+    if exam_type:
+        where.append("exam_type = ?")
+        params.append(exam_type.lower())
+
+def query_student_results(student_id, semester=None, exam_type=None, format_type=None, exclude_files=()):
+    """All indexed records of one student, optionally narrowed by semester, exam type and format"""
+    where, params = ["student_id = ?"], [student_id]
+    if semester:
+        where.append("semester = ?")
+        params.append(semester)
+    _add_file_filters(where, params, exam_type, format_type)
+    return _query_records(where, params, exclude_files)
+
+def query_semester_results(semester, exam_type=None, format_type=None, exclude_files=()):
+    """All indexed records for a semester, optionally narrowed by exam type and format"""
+    where, params = ["semester = ?"], [semester]
+    _add_file_filters(where, params, exam_type, format_type)
+    return _query_records(where, params, exclude_files)
+
+def query_result_files(semester=None, exam_type=None, format_type=None):
+    """Sorted filenames of the files holding records for a semester, narrowed by exam type and format"""
+    where, params = ["directory = ?"], [_directory()]
+    if semester:
+        where.append("semester = ?")
+        params.append(semester)
+    _add_file_filters(where, params, exam_type, format_type)
+    sync_index()
+    with _index() as conn:
+        rows = conn.execute(f"SELECT DISTINCT filename FROM students WHERE {' AND '.join(where)}", params).fetchall()
+    return sorted(row[0] for row in rows)
+
+def query_semesters():
+    """Sorted list of every semester that appears in an indexed record"""
+    sync_index()
+    with _index() as conn:
+        rows = conn.execute("SELECT DISTINCT semester FROM students WHERE directory = ? AND semester IS NOT NULL",
+                            (_directory(),)).fetchall()
+    return sorted(row[0] for row in rows)
+
+def list_in_progress_files(data_dir=None):
+    """Catalog entries for batch runs still writing data/<name>.jsonl, sorted by filename.
+
+    Read from the small .jsonl.meta sidecars, which hold the metadata and counters
+    up to the last committed batch; their records are not indexed until the run
+    materializes its .json. Runs that were interrupted stay listed until resumed.
+    """
+    data_dir = Path(data_dir or DATA_DIR)
+    entries = []
+    if not data_dir.exists():
+        return entries
+    for sidecar in sorted(data_dir.glob(f"*.jsonl{HEADER_SUFFIX}")):
+        jsonl_path = str(sidecar)[:-len(HEADER_SUFFIX)]
+        if os.path.exists(legacy_json_path(jsonl_path)):
+            continue  # already materialized
+        header, error = {}, None
+        try:
+            header = load_jsonl_header(jsonl_path)
+            stat = os.stat(jsonl_path)
+        except (OSError, ValueError) as e:
+            error, stat = str(e), None
+        metadata = header.get("metadata", {})
+        entries.append({
+            "filename": os.path.basename(jsonl_path),
+            "size": header.get("committed_bytes", 0),
+            "ctime": stat.st_ctime if stat else 0.0,
+            "student_count": metadata.get("total_students", 0),
+            "metadata": metadata,
+            "firebase_status": {},
+            "firebase_upload": header.get("firebase_upload", {}),
+            "error": error,
+            "in_progress": True,
+            "committed_bytes": header.get("committed_bytes", 0)
+        })
+    return entries
+
+def list_result_files(data_dir=None, include_in_progress=False):
+    """Catalog entries for every result file in data/, sorted by filename.
+
+    Only stat() calls touch data/; metadata, counts and upload status come from
+    the index. Files that could not be parsed carry their error and no metadata.
+    include_in_progress adds the batch runs that have not materialized their
+    .json yet, see list_in_progress_files(); every entry has "in_progress".
+    """
+    sync_index(data_dir, force=True)
+    with _index() as conn:
+        rows = conn.execute(
+            "SELECT filename, size, ctime, student_count, metadata, firebase_status, firebase_upload, error "
+            "FROM files WHERE directory = ? ORDER BY filename", (_directory(data_dir),)
+        ).fetchall()
+
+    entries = [{
+        "filename": filename,
+        "size": size,
+        "ctime": ctime,
+        "student_count": student_count,
+        "metadata": json.loads(metadata or "{}"),
+        "firebase_status": json.loads(firebase_status or "{}"),
+        "firebase_upload": json.loads(firebase_upload or "{}"),
+        "error": error,
+        "in_progress": False
+    } for filename, size, ctime, student_count, metadata, firebase_status, firebase_upload, error in rows]
+    if include_in_progress:
+        entries = sorted(entries + list_in_progress_files(data_dir), key=lambda entry: entry["filename"])
+    return entries
+
+def rebuild_index(data_dir=None):
+    """Drop the index rows of data_dir and re-read every result file in it"""
+    directory = _directory(data_dir)
+    with _index() as conn:
+        conn.execute("DELETE FROM students WHERE directory = ?", (directory,))
+        conn.execute("DELETE FROM files WHERE directory = ?", (directory,))
+    sync_index(data_dir, force=True)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Manage the student results index")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="Re-read every file in data/ into the index")
+    arg_parser.parse_args()
+
+    start = time.time()
+    rebuild_index()
+    with _index() as conn:
+        file_count = conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        student_count = conn.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+    print(f"✅ Indexed {student_count} student records from {file_count} files in {time.time() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Byte-offset index of the student records in the result files of data/
+For each data/<name>.json, cache/offsets/<name>.npy holds the byte range and
+student id of every record in its "students" array, and <name>.json beside it
+the rest of the document. A page of students or a single student is then read
+by slicing an mmap of the result file, so serving it costs the same for a
+50 MB file as for a small one. An index is written after each result file and
+rebuilt on first use when its file has changed since.
+
+Usage:
+    python results_offsets.py build [<json> ...]
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+
+from data_cache import load_data_file
+
+OFFSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'offsets')
+OFFSETS_VERSION = 1
+STUDENTS_KEY = 'students'
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_decoder = json.JSONDecoder()
+
+def _index_paths(json_path):
+    stem = Path(json_path).stem
+    return os.path.join(OFFSETS_DIR, f"{stem}.npy"), os.path.join(OFFSETS_DIR, f"{stem}.json")
+
+def scan_student_offsets(raw):
+    """Find the byte range of every record in the top-level "students" array of a result file.
+
+    raw is the file's bytes. Returns (document without students, (start, end)
+    of the array, [(start, end, student_id)]) or None when the file is not an
+    object with a students list. Decoding as latin-1 maps every byte to one
+    character, so string positions are byte offsets; UTF-8 text is restored
+    for the values that are kept.
+    """
+    text = raw.decode('latin-1')
+    position = _WHITESPACE.match(text, 0).end()
+    if not text.startswith('{', position):
+        return None
+
+    document, students_range, records = {}, None, []
+    position = _WHITESPACE.match(text, position + 1).end()
+    while not text.startswith('}', position):
+        key, position = _decoder.raw_decode(text, position)
+        position = _WHITESPACE.match(text, position).end()
+        if not text.startswith(':', position):
+            raise ValueError(f"Expecting ':' at byte {position}")
+        position = _WHITESPACE.match(text, position + 1).end()
+
+        if key == STUDENTS_KEY and text.startswith('[', position):
+            array_start = position
+            position = _WHITESPACE.match(text, position + 1).end()
+            while not text.startswith(']', position):
+                start = position
+                record, position = _decoder.raw_decode(text, position)
+                student_id = record.get('student_id') if isinstance(record, dict) else None
+                if isinstance(student_id, str):
+                    student_id = student_id.encode('latin-1').decode('utf-8')
+                records.append((start, position, student_id))
+                position = _WHITESPACE.match(text, position).end()
+                if text.startswith(',', position):
+                    position = _WHITESPACE.match(text, position + 1).end()
+            position += 1
+            students_range = (array_start, position)
+            document[STUDENTS_KEY] = None  # placeholder keeps the key order
+        else:
+            start = position
+            _, position = _decoder.raw_decode(text, position)
+            document[key] = json.loads(raw[start:position])
+
+        position = _WHITESPACE.match(text, position).end()
+        if text.startswith(',', position):
+            position = _WHITESPACE.match(text, position + 1).end()
+
+    if _WHITESPACE.match(text, position + 1).end() != len(text):
+        raise ValueError(f"Extra data at byte {position + 1}")
+    if students_range is None:
+        return None
+    return document, students_range, records
+
+def build_offset_index(json_path):
+    """Write the offset index of one result file; returns its header, or None if it cannot be indexed"""
+    stat = os.stat(json_path)
+    with open(json_path, 'rb') as f:
+        scanned = scan_student_offsets(f.read())
+    if scanned is None:
+        return None
+    document, students_range, records = scanned
+
+    ids = [(student_id if isinstance(student_id, str) else '').encode('utf-8') for _, _, student_id in records]
+    entries = np.zeros(len(records), dtype=[('start', '<i8'), ('end', '<i8'),
+                                            ('student_id', f"S{max((len(i) for i in ids), default=1) or 1}")])
+    entries['start'] = [start for start, _, _ in records]
+    entries['end'] = [end for _, end, _ in records]
+    entries['student_id'] = ids
+
+    header = {
+        "version": OFFSETS_VERSION,
+        "source": {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size},
+        "students_range": list(students_range),
+        "count": len(records),
+        "document": document
+    }
+    os.makedirs(OFFSETS_DIR, exist_ok=True)
+    entries_path, header_path = _index_paths(json_path)
+    tmp_suffix = f".{os.getpid()}.tmp"
+    with open(entries_path + tmp_suffix, 'wb') as f:
+        np.save(f, entries)
+    with open(header_path + tmp_suffix, 'w', encoding='utf-8') as f:
+        json.dump(header, f, ensure_ascii=False)
+    # The header is replaced last: it names the source version the entries belong to
+    os.replace(entries_path + tmp_suffix, entries_path)
+    os.replace(header_path + tmp_suffix, header_path)
+    return header
+
+def index_student_offsets(json_path):
+    """Index a result file that was just written; a failure only costs the sliced reads"""
+    try:
+        return build_offset_index(json_path)
+    except Exception as e:
+        print(f"⚠️ Could not index student offsets of {os.path.basename(json_path)}: {e}")
+        return None
+
+def _load_index(json_path, stat):
+    """(header, mmapped entries) if the index matches the file as stat describes it, else None"""
+    entries_path, header_path = _index_paths(json_path)
+    try:
+        with open(header_path, 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        if header.get("version") != OFFSETS_VERSION or \
+                (header["source"]["mtime_ns"], header["source"]["size"]) != (stat.st_mtime_ns, stat.st_size):
+            return None
+        entries = np.load(entries_path, mmap_mode='r' if header["count"] else None)  # an empty array cannot be mapped
+        if len(entries) != header["count"]:
+            return None
+        return header, entries
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _read_sliced(json_path, select):
+    """Decode the records that select(header, entries) picks, straight from an mmap of the file.
+
+    Returns (document without its students, total students, records), or None
+    when the file cannot be indexed.
+    """
+    for attempt in range(2):
+        with open(json_path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            loaded = _load_index(json_path, stat)
+            if loaded is None:
+                if attempt or build_offset_index(json_path) is None:
+                    return None
+                continue  # the file may have been replaced meanwhile; re-check against the new index
+            header, entries = loaded
+            rows = select(header, entries)
+            if not len(rows):
+                return header["document"], header["count"], []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                records = [json.loads(mm[entries['start'][row]:entries['end'][row]]) for row in rows]
+            return header["document"], header["count"], records
+    return None
+
+def _decoded(json_path):
+    """Fallback for files that cannot be indexed: the whole document, decoded through the shared cache"""
+    data = load_data_file(json_path)
+    document = dict(data) if isinstance(data, dict) else {}
+    students = document.get(STUDENTS_KEY)
+    return document, students if isinstance(students, list) else []
+
+def read_students_page(json_path, offset=0, limit=None):
+    """The document of a result file with only students[offset:offset + limit], plus "pagination" """
+    def select(header, entries):
+        stop = header["count"] if limit is None else min(header["count"], offset + limit)
+        return range(min(offset, stop), stop)
+
+    sliced = _read_sliced(json_path, select)
+    if sliced is None:
+        document, students = _decoded(json_path)
+        total = len(students)
+        page = students[offset:] if limit is None else students[offset:offset + limit]
+    else:
+        document, total, page = sliced
+        document = dict(document)
+
+    document[STUDENTS_KEY] = page
+    document["pagination"] = {"offset": offset, "limit": limit, "total": total, "returned": len(page)}
+    return document
+
+def read_student(json_path, student_id):
+    """The document of a result file with only the records of one student; None if none match"""
+    def select(header, entries):
+        return np.flatnonzero(entries['student_id'] == student_id.encode('utf-8')).tolist()
+
+    sliced = _read_sliced(json_path, select)
+    if sliced is None:
+        document, students = _decoded(json_path)
+        matches = [student for student in students
+                   if isinstance(student, dict) and student.get('student_id') == student_id]
+    else:
+        document, _, matches = sliced
+        document = dict(document)
+
+    if not matches:
+        return None
+    document[STUDENTS_KEY] = matches
+    return document
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Manage the student offset indexes of data/")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    build_cmd = commands.add_parser("build", help="Index result files (default: every file in data/)")
+    build_cmd.add_argument("files", nargs="*", help="Result JSON files to index")
+    args = arg_parser.parse_args()
+
+    start = time.time()
+    files = args.files or sorted(str(path) for path in Path("data").glob("*.json"))
+    indexed = 0
+    for json_file in files:
+        header = index_student_offsets(json_file)
+        if header is not None:
+            indexed += 1
+            print(f"📑 {os.path.basename(json_file)}: {header['count']} students")
+    print(f"✅ Indexed {indexed} of {len(files)} files in {time.time() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test the page-by-page autonomous parser and its batch generator
+"""
+
+import json
+import os
+import tempfile
+import pdfplumber
+from pdfplumber.page import Page
+import batch_pdf_processor as processor
+from parser.parser_jntuk import HallTicketReappeared
+from parser.parser_autonomous_dynamic import (
+    _iter_tabular_records, detect_pdf_format, iter_autonomous_records, parse_autonomous_pdf_dynamic,
+    parse_autonomous_pdf_generator_dynamic, parse_matrix_format, parse_tabular_format
+)
+
+PAGES = (0, 12)
+
+def whole_text_records(pdf_path, parse_format):
+    with pdfplumber.open(pdf_path) as pdf:
+        text = "\n".join(filter(None, (pdf.pages[i].extract_text() for i in range(*PAGES))))
+    assert parse_format.__name__ == f"parse_{detect_pdf_format(text)}_format"
+    records = list(iter_autonomous_records(pdf_path, pages=PAGES))
+    semester, university = records[0]['semester'], records[0]['university']
+    return records, parse_format(text, semester, university)
+
+def test_streamed_records_match_whole_text_parse():
+    for pdf_path, parse_format in (("sample_autonomous.pdf", parse_tabular_format),
+                                   ("sample_autonomous_new.pdf", parse_matrix_format)):
+        if not os.path.exists(pdf_path):
+            print(f"❌ PDF not found: {pdf_path}")
+            continue
+
+        streamed, expected = whole_text_records(pdf_path, parse_format)
+        assert streamed and streamed == expected
+        print(f"✅ {pdf_path}: {len(streamed)} streamed records match the whole-text parse")
+
+def test_ranged_grouped_parse_keeps_the_legend():
+    pdf_path = "sample_autonomous_new.pdf"
+    if not os.path.exists(pdf_path):
+        print(f"❌ PDF not found: {pdf_path}")
+        return
+
+    # The legend of a grouped sheet is only printed on its first pages
+    full = {record['student_id']: record for record in iter_autonomous_records(pdf_path, pages=(0, 14), format_type="grouped")}
+    ranged = list(iter_autonomous_records(pdf_path, pages=(10, 14), format_type="grouped"))
+    assert ranged and all(record['subjectGrades'] for record in ranged)
+    assert all(record['subjectGrades'] == full[record['student_id']]['subjectGrades'] for record in ranged)
+    print(f"✅ Grouped pages 11-14: {len(ranged)} students with the subjects of the first pages' legend")
+
+def tabular_page(*rows):
+    return "Sno Htno Subcode Subname Internals Grade Credits\n" + "\n".join(
+        f"{sno} {htno} {code} SUBJECT {code} 20 A 3" for sno, (htno, code) in enumerate(rows, 1))
+
+def test_tabular_students_are_not_split():
+    # A page without rows keeps the student of the previous page open
+    pages = [tabular_page(("20B81A0101", "R2022011"), ("20B81A0102", "R2022011")), "Page 2 of 3",
+             tabular_page(("20B81A0102", "R2022012"), ("20B81A0103", "R2022011"))]
+    records = list(_iter_tabular_records(pages, "Semester 1", "Autonomous", "2024-01-01"))
+    assert [(r["student_id"], len(r["subjectGrades"])) for r in records] == \
+        [("20B81A0101", 1), ("20B81A0102", 2), ("20B81A0103", 1)]
+    print("✅ A tabular student continues across a page without rows")
+
+    # A hall ticket that comes back after its record was yielded
+    pages = [tabular_page(("20B81A0101", "R2022011"), ("20B81A0102", "R2022011")),
+             tabular_page(("20B81A0103", "R2022011"), ("20B81A0101", "R2022012"))]
+    try:
+        list(_iter_tabular_records(pages, "Semester 1", "Autonomous", "2024-01-01"))
+        raise AssertionError("a reappearing hall ticket was emitted twice")
+    except HallTicketReappeared as e:
+        assert e.htno == "20B81A0101"
+    records = list(_iter_tabular_records(pages, "Semester 1", "Autonomous", "2024-01-01", group_document=True))
+    assert [(r["student_id"], len(r["subjectGrades"])) for r in records] == \
+        [("20B81A0101", 2), ("20B81A0102", 1), ("20B81A0103", 1)]
+    print("✅ A reappearing tabular hall ticket fails the stream and is merged over the whole document")
+
+def test_generator_yields_before_the_last_page():
+    pdf_path = "sample_autonomous.pdf"
+    if not os.path.exists(pdf_path):
+        print(f"❌ PDF not found: {pdf_path}")
+        return
+
+    # Count the pages read before the first batch comes out
+    extract_text = Page.extract_text
+    pages_read = []
+    def counting_extract_text(page, *args, **kwargs):
+        pages_read.append(page.page_number)
+        return extract_text(page, *args, **kwargs)
+
+    Page.extract_text = counting_extract_text
+    try:
+        batches = parse_autonomous_pdf_generator_dynamic(pdf_path, batch_size=20, pages=PAGES)
+        first_batch = next(batches)
+        pages_at_first_batch = len(pages_read)
+        batches = [first_batch] + list(batches)
+    finally:
+        Page.extract_text = extract_text
+
+    assert len(first_batch) == 20
+    assert pages_at_first_batch < len(pages_read) == PAGES[1] - PAGES[0]
+    assert all(len(batch) == 20 for batch in batches[:-1])
+    assert [student for batch in batches for student in batch] == parse_autonomous_pdf_dynamic(pdf_path, pages=PAGES)
+    print(f"✅ First batch after {pages_at_first_batch}/{len(pages_read)} pages, {len(batches)} batches in total")
+
+def test_batch_run_merges_a_reappearing_tabular_student():
+    pdf_path = "sample_autonomous_new.pdf"
+    if not os.path.exists(pdf_path):
+        print(f"❌ PDF not found: {pdf_path}")
+        return
+
+    from test_checkpoint_claims import patch_processor
+    # The first pages of the real PDF read as a tabular sheet listing 20B81A0101 twice
+    pages = {1: tabular_page(("20B81A0101", "R2022011"), ("20B81A0102", "R2022011")),
+             2: tabular_page(("20B81A0103", "R2022011")),
+             3: tabular_page(("20B81A0104", "R2022011"), ("20B81A0101", "R2022012"))}
+    extract_text = Page.extract_text
+    Page.extract_text = lambda page, *args, **kwargs: pages.get(page.page_number, "")
+    with tempfile.TemporaryDirectory() as tmp:
+        originals = patch_processor(tmp)
+        original_batch_size = processor.BATCH_SIZE
+        processor.BATCH_SIZE = 1
+        uploaded = []
+        def upload(batch, *args, **kwargs):
+            uploaded.extend(batch)
+            return len(batch), 0, []
+        processor.batch_upload_to_firebase = upload
+        try:
+            result = processor.process_single_pdf(pdf_path, None, None, format_name="autonomous_tabular")
+            assert result["success"] and result["total_students"] == 4
+            with open(result["json_path"], 'r', encoding='utf-8') as f:
+                students = json.load(f)["students"]
+            assert [(s["student_id"], len(s["subjectGrades"])) for s in students] == \
+                [("20B81A0101", 2), ("20B81A0102", 1), ("20B81A0103", 1), ("20B81A0104", 1)]
+            # The streamed upload of the first half is followed by the merged record
+            assert [len(s["subjectGrades"]) for s in uploaded if s["student_id"] == "20B81A0101"][-1] == 2
+            print("✅ A batch run re-parses a tabular PDF with a reappearing student as a whole document")
+        finally:
+            Page.extract_text = extract_text
+            processor.BATCH_SIZE = original_batch_size
+            for name, value in originals.items():
+                setattr(processor, name, value)
+
+if __name__ == "__main__":
+    test_streamed_records_match_whole_text_parse()
+    test_ranged_grouped_parse_keeps_the_legend()
+    test_tabular_students_are_not_split()
+    test_generator_yields_before_the_last_page()
+    test_batch_run_merges_a_reappearing_tabular_student()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test that the batch generator yields every student exactly once, complete,
+whatever the batch size
+"""
+
+import json
+import os
+import tempfile
+import batch_pdf_processor as processor
+from parser import parser_jntuk
+from parser.parser_jntuk import HallTicketReappeared, parse_jntuk_pdf, parse_jntuk_pdf_generator, parse_jntuk_pdf_stream
+from test_checkpoint_claims import PDF_PATH, patch_processor
+from test_firestore_upload import FakeFirestore
+
+def row(htno, code):
+    return (htno, code, f"SUBJECT {code}", 20, "A", 3.0)
+
+def fake_pages(*pages):
+    """Stand-in for _iter_page_rows: one list of table rows per page"""
+    def iter_page_rows(file_path, **kwargs):
+        for page_num, rows in enumerate(pages):
+            yield page_num, len(pages), {"semester": "Semester 1", "is_supply": False,
+                                         "table_rows": rows, "line_rows": []}
+    return iter_page_rows
+
+def test_batches_independent_of_batch_size():
+    pdf_path = "Results of I B.Tech II Semester (R23R20R19R16) RegularSupplementary Examinations, July-2024.pdf"
+    if not os.path.exists(pdf_path):
+        print(f"❌ PDF not found: {pdf_path}")
+        return
+
+    def records(batch_size):
+        batches = list(parse_jntuk_pdf_generator(pdf_path, batch_size=batch_size, engine="pymupdf"))
+        assert all(len(batch) == batch_size for batch in batches[:-1])
+        return [student for batch in batches for student in batch]
+
+    large = records(500)
+    small = records(7)
+    assert large
+    assert small == large
+    assert len({student['student_id'] for student in small}) == len(small)
+    print(f"✅ {len(small)} students, each yielded once, identical for batch sizes 7 and 500")
+
+def test_students_are_not_split():
+    original = parser_jntuk._iter_page_rows
+    try:
+        # A page without rows keeps the student of the previous page open
+        parser_jntuk._iter_page_rows = fake_pages([row("A1", "S1"), row("B2", "S1")], [], [row("B2", "S2"), row("C3", "S1")])
+        records = parse_jntuk_pdf_stream("fake.pdf")
+        assert [(r["student_id"], len(r["subjectGrades"])) for r in records] == [("A1", 1), ("B2", 2), ("C3", 1)]
+        print("✅ A student continues across a page without rows")
+
+        # A hall ticket that comes back after its record was released
+        parser_jntuk._iter_page_rows = fake_pages([row("A1", "S1"), row("B2", "S1")], [row("C3", "S1"), row("A1", "S2")])
+        try:
+            list(parse_jntuk_pdf_stream("fake.pdf"))
+            raise AssertionError("a reappearing hall ticket was emitted twice")
+        except HallTicketReappeared as e:
+            assert e.htno == "A1"
+        try:
+            list(parse_jntuk_pdf_generator("fake.pdf", batch_size=1))
+            raise AssertionError("a reappearing hall ticket was emitted twice")
+        except HallTicketReappeared:
+            pass
+        records = parse_jntuk_pdf("fake.pdf")
+        assert [(r["student_id"], len(r["subjectGrades"])) for r in records] == [("A1", 2), ("B2", 1), ("C3", 1)]
+        grouped = [r for batch in parse_jntuk_pdf_generator("fake.pdf", batch_size=1, group_document=True) for r in batch]
+        assert grouped == records
+        print("✅ A reappearing hall ticket fails the stream and is merged by the whole-document parse")
+    finally:
+        parser_jntuk._iter_page_rows = original
+
+def test_batch_run_merges_a_reappearing_student():
+    if not os.path.exists(PDF_PATH):
+        print(f"❌ PDF not found: {PDF_PATH}")
+        return
+
+    original = parser_jntuk._iter_page_rows
+    with tempfile.TemporaryDirectory() as tmp:
+        originals = patch_processor(tmp)
+        processor.batch_upload_to_firebase = originals["batch_upload_to_firebase"]
+        try:
+            # A1 is uploaded with one subject before its second page shows up
+            parser_jntuk._iter_page_rows = fake_pages([row("A1", "S1"), row("B2", "S1")], [row("C3", "S1")],
+                                                      [row("D4", "S1"), row("A1", "S2")])
+            source = lambda path, page_log_path, format_name, group_document=False: \
+                parse_jntuk_pdf_generator(path, batch_size=1, group_document=group_document)
+            db = FakeFirestore()
+            result = processor.process_single_pdf(PDF_PATH, db, None, batch_source=source)
+            assert result["success"] and (result["total_students"], result["saved"], result["skipped"]) == (4, 4, 0)
+
+            with open(result["json_path"], 'r', encoding='utf-8') as f:
+                students = json.load(f)["students"]
+            assert [(s["student_id"], len(s["subjectGrades"])) for s in students] == \
+                [("A1", 2), ("B2", 1), ("C3", 1), ("D4", 1)]
+            docs = list(db.collection('student_results').docs.values())
+            assert sorted((d["student_id"], len(d["subjectGrades"])) for d in docs) == \
+                [("A1", 2), ("B2", 1), ("C3", 1), ("D4", 1)]
+            print("✅ A batch run re-parses a PDF with a reappearing student and rewrites its uploads")
+        finally:
+            parser_jntuk._iter_page_rows = original
+            for name, value in originals.items():
+                setattr(processor, name, value)
+
+def test_resumed_run_rewrites_uploads_of_the_interrupted_one():
+    if not os.path.exists(PDF_PATH):
+        print(f"❌ PDF not found: {PDF_PATH}")
+        return
+
+    original = parser_jntuk._iter_page_rows
+    with tempfile.TemporaryDirectory() as tmp:
+        originals = patch_processor(tmp)
+        processor.batch_upload_to_firebase = originals["batch_upload_to_firebase"]
+        try:
+            parser_jntuk._iter_page_rows = fake_pages([row("A1", "S1"), row("B2", "S1")], [row("C3", "S1")],
+                                                      [row("D4", "S1"), row("A1", "S2")])
+            def source(path, page_log_path, format_name, group_document=False):
+                return parse_jntuk_pdf_generator(path, batch_size=1, group_document=group_document)
+            def interrupted_source(path, page_log_path, format_name):
+                batches = source(path, page_log_path, format_name)
+                yield next(batches)
+                yield next(batches)
+                raise RuntimeError("interrupted")
+
+            db = FakeFirestore()
+            db.collection('student_results').docs["other_pdf"] = {"student_id": "D4", "subjectGrades": []}
+            result = processor.process_single_pdf(PDF_PATH, db, None, batch_source=interrupted_source)
+            assert not result["success"] and result["total_students"] == 2
+
+            # The retry resumes after A1 and B2, then finds A1 again and re-parses the whole PDF
+            result = processor.process_single_pdf(PDF_PATH, db, None, batch_source=source)
+            assert result["success"] and (result["total_students"], result["saved"], result["skipped"]) == (4, 3, 1)
+            with open(result["json_path"], 'r', encoding='utf-8') as f:
+                students = json.load(f)["students"]
+            assert [(s["student_id"], len(s["subjectGrades"])) for s in students] == \
+                [("A1", 2), ("B2", 1), ("C3", 1), ("D4", 1)]
+            docs = db.collection('student_results').docs
+            assert sorted((d["student_id"], len(d["subjectGrades"])) for d in docs.values()) == \
+                [("A1", 2), ("B2", 1), ("C3", 1), ("D4", 0)]
+            print("✅ A resumed run rewrites what the interrupted run uploaded when it re-parses the PDF")
+        finally:
+            parser_jntuk._iter_page_rows = original
+            for name, value in originals.items():
+                setattr(processor, name, value)
+
+if __name__ == "__main__":
+    test_batches_independent_of_batch_size()
+    test_students_are_not_split()
+    test_batch_run_merges_a_reappearing_student()
+    test_resumed_run_rewrites_uploads_of_the_interrupted_one()
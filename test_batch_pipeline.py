@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test the threaded parse -> upload -> persist pipeline
+"""
+
+import time
+from batch_pipeline import PipelineStage, run_pipeline
+
+def test_pipeline_overlaps_stages():
+    def source():
+        for i in range(20):
+            time.sleep(0.02)
+            yield [i] * 10
+
+    persisted = []
+    def upload(batch):
+        time.sleep(0.02)
+        return batch
+    def persist(batch):
+        time.sleep(0.02)
+        persisted.append(batch[0])
+
+    start = time.time()
+    stages = run_pipeline(source(), [PipelineStage("upload", upload), PipelineStage("persist", persist)])
+    elapsed = time.time() - start
+
+    assert persisted == list(range(20))
+    assert [stage.name for stage in stages] == ["parse", "upload", "persist"]
+    assert all(stage.summary()["records"] == 200 and stage.batches == 20 for stage in stages)
+    # Sequential processing would take 1.2s; overlapped stages approach the slowest one
+    assert elapsed < 0.9
+    print(f"✅ 20 batches through 3 stages in {elapsed:.2f}s: "
+          f"{[(stage.name, stage.summary()['records_per_second']) for stage in stages]}")
+
+def test_pipeline_failure_drains_downstream():
+    uploaded = []
+    persisted = []
+    def upload(batch):
+        if batch[0] == 5:
+            raise RuntimeError("upload failed")
+        uploaded.append(batch[0])
+        return batch
+    def persist(batch):
+        time.sleep(0.01)
+        persisted.append(batch[0])
+
+    try:
+        run_pipeline(([i] for i in range(100)), [PipelineStage("upload", upload), PipelineStage("persist", persist)])
+        raise AssertionError("pipeline error was not raised")
+    except RuntimeError as e:
+        assert str(e) == "upload failed"
+
+    # Everything uploaded before the failure is still persisted, in order
+    assert uploaded == persisted == [0, 1, 2, 3, 4]
+    print("✅ Failure stopped upstream stages and drained downstream ones")
+
+if __name__ == "__main__":
+    test_pipeline_overlaps_stages()
+    test_pipeline_failure_drains_downstream()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test checkpoint claims: overlapping runs of one PDF never share a checkpoint,
+a stopped run's checkpoint is resumed, and a failed write leaves it resumable
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import batch_pdf_processor as processor
+from parser.parser_jntuk import PARSER_VERSION, _load_page_checkpoint, _open_page_checkpoint, parse_jntuk_pdf
+
+PDF_PATH = "sample_autonomous_new.pdf"
+
+def records(prefix, count):
+    return [{"student_id": f"{prefix}{i:04d}", "semester": "Semester 1", "sgpa": 8.0, "subjectGrades": []}
+            for i in range(count)]
+
+def patch_processor(tmp):
+    """Write outputs and checkpoints under tmp and keep the run away from Firebase and the shared caches"""
+    originals = {name: getattr(processor, name) for name in
+                 ("CHECKPOINT_DIR", "DATA_DIR", "cached_batches", "batch_upload_to_firebase",
+                  "index_result_file", "archive_result_file", "index_student_offsets")}
+    processor.CHECKPOINT_DIR = os.path.join(tmp, "checkpoints")
+    processor.DATA_DIR = os.path.join(tmp, "data")
+    processor.cached_batches = lambda path, name, generator, batch_size, pdf_hash=None: generator(path)
+    processor.batch_upload_to_firebase = lambda batch, *args, **kwargs: (len(batch), 0, [])
+    for name in ("index_result_file", "archive_result_file", "index_student_offsets"):
+        setattr(processor, name, lambda *args, **kwargs: None)
+    return originals
+
+def test_overlapping_runs_use_separate_checkpoints():
+    if not os.path.exists(PDF_PATH):
+        print(f"❌ PDF not found: {PDF_PATH}")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        originals = patch_processor(tmp)
+        try:
+            first_started, first_may_finish = threading.Event(), threading.Event()
+            seen_logs = {}
+
+            def slow_source(path, page_log_path, format_name):
+                seen_logs["first"] = page_log_path
+                yield records("A", 50)
+                first_started.set()
+                first_may_finish.wait(30)
+                yield records("A", 50)[:20]
+
+            def fast_source(path, page_log_path, format_name):
+                seen_logs["second"] = page_log_path
+                yield records("B", 50)
+                yield records("B", 50)[:10]
+
+            results = {}
+            first = threading.Thread(target=lambda: results.setdefault(
+                "first", processor.process_single_pdf(PDF_PATH, None, None, batch_source=slow_source)))
+            first.start()
+            assert first_started.wait(60)
+
+            # The same PDF again while the first run is still appending
+            results["second"] = processor.process_single_pdf(PDF_PATH, None, None, batch_source=fast_source)
+            first_may_finish.set()
+            first.join(60)
+
+            assert seen_logs["first"] != seen_logs["second"]
+            for name, total in (("first", 70), ("second", 60)):
+                result = results[name]
+                assert result["success"] and result["total_students"] == total
+                with open(result["json_path"], 'r', encoding='utf-8') as f:
+                    assert len(json.load(f)["students"]) == total
+            # Neither run leaves a lock or a checkpoint behind
+            assert os.listdir(processor.CHECKPOINT_DIR) == []
+            print("✅ Overlapping runs of one PDF kept separate checkpoints and complete outputs")
+        finally:
+            for name, value in originals.items():
+                setattr(processor, name, value)
+
+def test_stopped_run_is_resumed():
+    with tempfile.TemporaryDirectory() as tmp:
+        originals = patch_processor(tmp)
+        try:
+            dead = subprocess.Popen([sys.executable, "-c", "pass"])
+            dead.wait()
+            os.makedirs(processor.CHECKPOINT_DIR)
+            lock_path = os.path.join(processor.CHECKPOINT_DIR, "cafe.lock")
+            with open(lock_path, 'w', encoding='utf-8') as f:
+                json.dump({"pid": dead.pid, "host": processor.socket.gethostname(), "thread": 0, "started": 0}, f)
+
+            page_log_path, manifest_path, claimed_lock = processor.claim_checkpoint("cafe")
+            assert claimed_lock == lock_path
+            assert (page_log_path, manifest_path) == processor.get_checkpoint_paths("cafe")
+
+            # A live owner keeps its claim
+            page_log_path, _, private_lock = processor.claim_checkpoint("cafe")
+            assert private_lock is None and page_log_path != processor.get_checkpoint_paths("cafe")[0]
+            processor.release_checkpoint(lock_path)
+            assert not os.path.exists(lock_path)
+            print("✅ A stopped run's checkpoint is taken over, a live one is not")
+
+            # The page log is appended to, past its last complete line
+            header = {"parser_version": "test"}
+            log_path = os.path.join(tmp, "pages.jsonl")
+            with open(log_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(header) + '\n' + json.dumps({"page": 0, "rows": None}) + '\n{"page": 1, "ro')
+            done_pages, valid_bytes = _load_page_checkpoint(log_path, header)
+            with _open_page_checkpoint(log_path, header, valid_bytes) as log:
+                log.write(json.dumps({"page": 1, "rows": None}) + '\n')
+            assert sorted(_load_page_checkpoint(log_path, header)[0]) == [0, 1] and list(done_pages) == [0]
+            print("✅ The page log keeps its pages and drops only a torn line")
+        finally:
+            for name, value in originals.items():
+                setattr(processor, name, value)
+
+def test_persist_failure_fails_the_run():
+    if not os.path.exists(PDF_PATH):
+        print(f"❌ PDF not found: {PDF_PATH}")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        originals = patch_processor(tmp)
+        original_append = processor.append_jsonl_batch
+        def failing_append(jsonl_path, header, batch_records):
+            if header["metadata"]["last_batch_processed"] == 2:
+                raise OSError("disk full")
+            original_append(jsonl_path, header, batch_records)
+        processor.append_jsonl_batch = failing_append
+        try:
+            source = lambda path, page_log_path, format_name: iter([records("A", 50), records("B", 50)])
+            result = processor.process_single_pdf(PDF_PATH, None, None, batch_source=source)
+            assert not result["success"] and "disk full" in result["error"]
+            # Nothing is materialized, and the checkpoint is left for a retry to resume
+            assert not [name for name in os.listdir(processor.DATA_DIR) if name.endswith('.json')]
+            assert [name for name in os.listdir(processor.CHECKPOINT_DIR) if name.endswith('.run.json')]
+            assert not [name for name in os.listdir(processor.CHECKPOINT_DIR) if name.endswith('.lock')]
+            print("✅ A failed write fails the run and keeps it resumable")
+        finally:
+            processor.append_jsonl_batch = original_append
+            for name, value in originals.items():
+                setattr(processor, name, value)
+
+def test_page_log_of_another_engine_is_discarded():
+    pdf_path = "BTECH 2-1 RESULT FEB 2025.pdf"
+    if not os.path.exists(pdf_path):
+        print(f"❌ PDF not found: {pdf_path}")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A page log left by a pymupdf run, holding a student the PDF does not have
+        log_path = os.path.join(tmp, "pages.jsonl")
+        header = {"parser_version": PARSER_VERSION, "engine": "pymupdf", "strict_htno": False,
+                  "merge_line_rows": True}
+        rows = {"semester": None, "is_supply": False, "line_rows": [],
+                "table_rows": [["99X99X9999", "S1", "SUBJECT", 20, "A", 3.0]]}
+        def run_on_log(engine):
+            with open(log_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(dict(header, engine=engine)) + '\n' + json.dumps({"page": 0, "rows": rows}) + '\n')
+            records = parse_jntuk_pdf(pdf_path, engine="pdfplumber", checkpoint_path=log_path, pages=(0, 1))
+            return {record["student_id"] for record in records}
+
+        # The same engine replays the logged page; another one extracts it again
+        assert run_on_log("pdfplumber") == {"99X99X9999"}
+        student_ids = run_on_log("pymupdf")
+        assert student_ids and "99X99X9999" not in student_ids
+        with open(log_path, 'r', encoding='utf-8') as f:
+            assert json.loads(f.readline())["engine"] == "pdfplumber"
+        print("✅ A pdfplumber run discarded the page log of a pymupdf run")
+
+if __name__ == "__main__":
+    test_overlapping_runs_use_separate_checkpoints()
+    test_stopped_run_is_resumed()
+    test_persist_failure_fails_the_run()
+    test_page_log_of_another_engine_is_discarded()
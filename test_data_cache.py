@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test the in-process data file cache: hits, mtime invalidation and LRU eviction
+"""
+
+import json
+import os
+import tempfile
+from data_cache import DataFileCache, decoded_size_estimate
+
+def _write(path, document):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f)
+
+def test_data_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        first = os.path.join(tmp, "first.json")
+        second = os.path.join(tmp, "second.json")
+        _write(first, {"metadata": {"total_students": 1}, "students": [{"student_id": "A1"}]})
+        _write(second, {"metadata": {"total_students": 0}, "students": []})
+
+        cache = DataFileCache()
+        assert cache.load(first)["students"][0]["student_id"] == "A1"
+        assert cache.load(first) is cache.load(first)
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"]) == (2, 1)
+        print(f"✅ Cache hits: {stats}")
+
+        # A rewrite with a new mtime must be picked up
+        _write(first, {"metadata": {"total_students": 2}, "students": [{"student_id": "B2"}, {"student_id": "C3"}]})
+        os.utime(first, ns=(1, 1))
+        assert cache.load(first)["metadata"]["total_students"] == 2
+        assert cache.stats()["entries"] == 1
+        print("✅ Modified file reloaded")
+
+        # Budget only fits the most recently used file
+        small = DataFileCache(max_bytes=decoded_size_estimate(os.path.getsize(first)))
+        small.load(first)
+        small.load(second)
+        stats = small.stats()
+        assert stats["entries"] == 1 and stats["evictions"] == 1
+        assert stats["bytes"] <= stats["max_bytes"]
+        print(f"✅ LRU eviction within budget: {stats}")
+
+        # The budget is charged with the decoded size, not the size on disk
+        assert stats["bytes"] == decoded_size_estimate(os.path.getsize(second)) > os.path.getsize(second)
+        tiny = DataFileCache(max_bytes=os.path.getsize(first))
+        tiny.load(first)
+        assert tiny.stats()["entries"] == 0
+        print("✅ Budget charged with the estimated decoded size")
+
+if __name__ == "__main__":
+    test_data_cache()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Test bulk duplicate detection and batched writes against an in-memory Firestore fake
+"""
+
+import itertools
+import os
+import tempfile
+import threading
+import time
+from google.api_core.exceptions import Aborted, DeadlineExceeded, PermissionDenied
+from firestore_upload import BatchUploader, existing_document_ids, existing_field_values, write_documents
+import batch_pdf_processor as processor
+from batch_pdf_processor import batch_upload_to_firebase
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+class FakeDocument:
+    def __init__(self, collection, doc_id):
+        self.collection = collection
+        self.id = doc_id
+
+class FakeQuery:
+    def __init__(self, collection, field, values):
+        self.collection, self.field, self.values = collection, field, values
+
+    def stream(self):
+        self.collection.db.round_trips += 1
+        for doc_id, data in list(self.collection.docs.items()):
+            if data.get(self.field) in self.values:
+                yield FakeSnapshot(doc_id, data)
+
+class FakeCollection:
+    def __init__(self, db):
+        self.db = db
+        self.docs = {}
+
+    def document(self, doc_id=None):
+        return FakeDocument(self, doc_id or f"auto{next(self.db.auto_ids)}")
+
+    def where(self, field, op, values):
+        assert op == 'in' and len(values) <= 30
+        return FakeQuery(self, field, values)
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.writes = []
+
+    def set(self, ref, data):
+        self.writes.append((ref, dict(data)))
+
+    def commit(self):
+        assert len(self.writes) <= 500
+        with self.db.lock:
+            self.db.round_trips += 1
+            self.db.in_flight += 1
+            self.db.max_in_flight = max(self.db.max_in_flight, self.db.in_flight)
+            failure = self.db.failures.pop(0) if self.db.failures else None
+            late_failure = self.db.late_failures.pop(0) if self.db.late_failures else None
+        try:
+            time.sleep(self.db.commit_latency)
+            if failure:
+                raise failure
+            with self.db.lock:
+                self.db.commits += 1
+                for ref, data in self.writes:
+                    ref.collection.docs[ref.id] = data
+            if late_failure:
+                raise late_failure
+        finally:
+            with self.db.lock:
+                self.db.in_flight -= 1
+
+class FakeFirestore:
+    def __init__(self):
+        self.collections = {}
+        self.auto_ids = itertools.count()
+        self.round_trips = 0
+        self.commits = 0
+        self.lock = threading.Lock()
+        self.failures = []      # exceptions raised by the next commits, in order
+        self.late_failures = [] # exceptions raised by the next commits after their writes were applied
+        self.commit_latency = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def collection(self, name):
+        return self.collections.setdefault(name, FakeCollection(self))
+
+    def get_all(self, refs):
+        self.round_trips += 1
+        for ref in refs:
+            yield FakeSnapshot(ref.id, ref.collection.docs.get(ref.id))
+
+    def batch(self):
+        return FakeBatch(self)
+
+def test_bulk_existence_checks():
+    db = FakeFirestore()
+    db.collection('student_results').docs.update({
+        "A1_doc": {"student_id": "A1"},
+        "B2_doc": {"student_id": "B2"}
+    })
+
+    ids = [f"S{i}_doc" for i in range(250)] + ["A1_doc", "B2_doc"]
+    assert existing_document_ids(db, ids) == {"A1_doc", "B2_doc"}
+    assert db.round_trips == 3
+    print(f"✅ get_all resolved {len(ids)} IDs in {db.round_trips} round trips")
+
+    db.round_trips = 0
+    values = [f"S{i}" for i in range(59)] + ["A1"]
+    assert existing_field_values(db, 'student_id', values) == {"A1"}
+    assert db.round_trips == 2
+    print(f"✅ 'in' queries resolved {len(values)} IDs in {db.round_trips} round trips")
+
+    db.round_trips = 0
+    saved, errors = write_documents(db, [(f"W{i}", {"student_id": f"W{i}"}) for i in range(1200)])
+    assert (saved, errors, db.commits) == (1200, [], 3)
+    print(f"✅ Wrote {saved} documents in {db.commits} batch commits")
+
+def test_batch_upload_to_firebase():
+    db = FakeFirestore()
+    db.collection('student_results').docs["old"] = {"student_id": "S0005"}
+
+    records = [{"student_id": f"S{i:04d}", "sgpa": 8.0} for i in range(1800)]
+    records.append({"student_id": "S0010", "sgpa": 9.0})  # repeated within the upload
+    records.append({"sgpa": 0})
+
+    saved, skipped, errors = batch_upload_to_firebase(
+        records, "1 Year", ["Semester 1"], ["regular"], "jntuk", "upload_1", "results.pdf", db=db
+    )
+    assert (saved, skipped) == (1799, 2)
+    assert errors == ["Missing student_id"]
+    assert len(db.collection('student_results').docs) == 1800
+    assert all(doc.get("pdf_filename") == "results.pdf"
+               for doc_id, doc in db.collection('student_results').docs.items() if doc_id != "old")
+    assert db.round_trips == 60 + 4
+    print(f"✅ Uploaded 1800 students in {db.round_trips} round trips: {saved} saved, {skipped} skipped")
+
+def test_batch_uploader_concurrency_and_retries():
+    db = FakeFirestore()
+    db.commit_latency = 0.05
+    with BatchUploader(db, max_in_flight=3, batch_size=100, retry_base_delay=0.01) as uploader:
+        for i in range(1000):
+            uploader.add(f"S{i}", {"student_id": f"S{i}"})
+    assert (uploader.saved, uploader.failed, uploader.batches_committed) == (1000, 0, 10)
+    assert db.max_in_flight == 3
+    print(f"✅ 10 batches committed with at most {db.max_in_flight} in flight")
+
+    # Transient errors are retried; anything else fails only its own batch
+    db = FakeFirestore()
+    db.failures = [Aborted("contention"), DeadlineExceeded("slow"), PermissionDenied("denied")]
+    with BatchUploader(db, max_in_flight=1, batch_size=100, retry_base_delay=0.01) as uploader:
+        for i in range(300):
+            uploader.add(f"S{i}", {"student_id": f"S{i}"})
+    assert (uploader.saved, uploader.failed, uploader.retried) == (200, 100, 2)
+    assert (uploader.batches_committed, uploader.batches_failed) == (2, 1)
+    assert len(db.collection('student_results').docs) == 200
+    assert len(uploader.errors) == 1 and "denied" in uploader.errors[0]
+    print(f"✅ Retried {uploader.retried} transient failures, {uploader.failed} documents failed")
+
+    # Retries are bounded
+    db = FakeFirestore()
+    db.failures = [Aborted("contention")] * 3
+    with BatchUploader(db, retries=2, retry_base_delay=0.01) as uploader:
+        uploader.add("S1", {"student_id": "S1"})
+    assert (uploader.saved, uploader.failed, uploader.retried) == (0, 1, 2)
+    print("✅ Gave up after the retry limit")
+
+def test_retried_commit_does_not_duplicate_auto_id_documents():
+    # The deadline passes after the server applied the commit; the retry must rewrite the same documents
+    db = FakeFirestore()
+    db.late_failures = [DeadlineExceeded("slow")]
+    saved, skipped, errors = batch_upload_to_firebase(
+        [{"student_id": f"S{i:04d}", "sgpa": 8.0} for i in range(150)],
+        "1 Year", ["Semester 1"], ["regular"], "jntuk", "upload_1", "results.pdf", db=db
+    )
+    docs = db.collection('student_results').docs
+    assert (saved, skipped, errors) == (150, 0, [])
+    assert db.commits == 2 and len(docs) == 150
+    assert sorted(doc["student_id"] for doc in docs.values()) == [f"S{i:04d}" for i in range(150)]
+    print(f"✅ A retried commit left {len(docs)} documents, no duplicates")
+
+def test_pdf_batches_share_one_uploader():
+    from test_checkpoint_claims import PDF_PATH, patch_processor, records
+    if not os.path.exists(PDF_PATH):
+        print(f"❌ PDF not found: {PDF_PATH}")
+        return
+
+    created = []
+    class RecordingUploader(BatchUploader):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        originals = patch_processor(tmp)
+        originals["BatchUploader"] = processor.BatchUploader
+        processor.batch_upload_to_firebase = batch_upload_to_firebase
+        processor.BatchUploader = RecordingUploader
+        try:
+            db = FakeFirestore()
+            source = lambda path, page_log_path, format_name: iter([records(prefix, 50) for prefix in "ABC"])
+            result = processor.process_single_pdf(PDF_PATH, db, None, batch_source=source)
+            assert result["success"] and result["saved"] == 150
+            # Every batch of the PDF went through one uploader, shut down when the PDF was done
+            assert len(created) == 1 and created[0].batches_committed == 3
+            assert created[0]._executor._shutdown
+            print("✅ The batches of a PDF were committed through one uploader")
+        finally:
+            for name, value in originals.items():
+                setattr(processor, name, value)
+
+if __name__ == "__main__":
+    test_bulk_existence_checks()
+    test_batch_upload_to_firebase()
+    test_batch_uploader_concurrency_and_retries()
+    test_retried_commit_does_not_duplicate_auto_id_documents()
+    test_pdf_batches_share_one_uploader()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test header-region format fingerprinting and its layout cache
+"""
+
+import os
+import time
+import parser.parser_autonomous_dynamic as autonomous
+from parser.parser_autonomous_dynamic import detect_pdf_format, layout_fingerprint
+from parser.pdf_engines import open_pdf
+
+EXPECTED_FORMATS = {
+    "BTECH 2-1 RESULT FEB 2025.pdf": "tabular",
+    "sample_autonomous_new.pdf": "matrix"
+}
+
+def test_detection_reads_only_the_header():
+    for pdf_path, expected in EXPECTED_FORMATS.items():
+        if not os.path.exists(pdf_path):
+            print(f"❌ PDF not found: {pdf_path}")
+            continue
+
+        with open_pdf(pdf_path, "pymupdf") as pdf:
+            page_texts = [page.extract_text() for page in pdf.pages]
+
+        autonomous._fingerprint_cache.clear()
+        start = time.perf_counter()
+        assert detect_pdf_format(page_texts[0]) == expected
+        first_page_time = time.perf_counter() - start
+
+        autonomous._fingerprint_cache.clear()
+        start = time.perf_counter()
+        assert detect_pdf_format("\n".join(page_texts)) == expected
+        whole_document_time = time.perf_counter() - start
+
+        assert whole_document_time < first_page_time * 10 + 0.01
+        print(f"✅ {pdf_path}: {expected} on 1 page in {first_page_time * 1000:.1f} ms, "
+              f"on {len(page_texts)} pages in {whole_document_time * 1000:.1f} ms")
+
+def test_fingerprint_cache():
+    header = ("Programme : I B.Tech. ( I Semester) (CR24) Regular\n"
+              "S.No. H.T.No. 24BS1003 24BS1107 24BS1101 24CE1104 SGPA\n"
+              "1 24B81A0101 D E C D 7.03\n")
+    other_branch = header.replace("24CE1104", "24EE1104").replace("24B81A0101", "24B81A0201")
+    assert layout_fingerprint(header, "Crystal Reports") == layout_fingerprint(other_branch, "Crystal Reports")
+    assert layout_fingerprint(header, "Crystal Reports") != layout_fingerprint(header, "Other Producer")
+    assert layout_fingerprint("no column header here") is None
+
+    autonomous._fingerprint_cache.clear()
+    detected = detect_pdf_format(header, "Crystal Reports")
+    assert autonomous._fingerprint_cache == {layout_fingerprint(header, "Crystal Reports"): detected}
+    assert detect_pdf_format(other_branch, "Crystal Reports") == detected
+    assert len(autonomous._fingerprint_cache) == 1
+    print(f"✅ Layout cached as {detected} and reused for another branch")
+
+if __name__ == "__main__":
+    test_detection_reads_only_the_header()
+    test_fingerprint_cache()
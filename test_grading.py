@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test the vectorized SGPA engine against the per-student loop it replaced
+"""
+
+import random
+from parser.grading import GRADE_SCALES, apply_sgpa, grade_students
+
+def reference_sgpa(subjects, scale, count_failed_credits=True):
+    total_points = 0
+    total_credits = 0
+    for subject in subjects:
+        grade = subject.get('grade', 'F')
+        credits = subject.get('credits', 0)
+        if not count_failed_credits and grade in ('F', 'ABSENT'):
+            continue
+        total_points += scale.get(grade, 0) * credits
+        total_credits += credits
+    return round(total_points / total_credits, 2) if total_credits > 0 else 0.0
+
+def test_grade_students_matches_reference():
+    rng = random.Random(7)
+    grades = ['S', 'A+', 'A', 'B+', 'B', 'C', 'D', 'E', 'F', 'ABSENT', 'COMPLE']
+    students = [
+        {"student_id": f"S{i}", "subjectGrades": [
+            {"grade": rng.choice(grades), "credits": rng.choice([0, 0.5, 1, 1.5, 2, 3, 4])}
+            for _ in range(rng.randint(0, 12))
+        ]}
+        for i in range(20000)
+    ]
+
+    for regulation in ("jntuk", "R20"):
+        for count_failed_credits in (True, False):
+            result = grade_students(students, regulation, count_failed_credits)
+            expected = [reference_sgpa(student['subjectGrades'], GRADE_SCALES[regulation], count_failed_credits)
+                        for student in students]
+            assert result["sgpa"].tolist() == expected
+
+    backlogs = [sum(subject['grade'] in ('F', 'ABSENT') for subject in student['subjectGrades'])
+                for student in students]
+    assert result["backlogs"].tolist() == backlogs
+    assert result["passed"].tolist() == [count == 0 for count in backlogs]
+    print(f"✅ {len(students)} students graded identically to the per-student loop")
+
+def test_apply_sgpa_regrades_records():
+    records = [
+        {"student_id": "A1", "sgpa": 0.0, "subjectGrades": [
+            {"grade": "A", "credits": 3.0}, {"grade": "E", "credits": 1.5}, {"grade": "F", "credits": 0.0}
+        ]},
+        {"student_id": "B2", "sgpa": 0.0, "subjectGrades": []}
+    ]
+    result = apply_sgpa(records)
+    assert [record['sgpa'] for record in records] == [5.33, 0.0]
+    assert result["total_credits"].tolist() == [4.5, 0.0]
+    assert result["backlogs"].tolist() == [1, 0]
+
+    apply_sgpa(records, "R23")
+    assert [record['sgpa'] for record in records] == [7.67, 0.0]
+    print("✅ Records regraded for a new regulation")
+
+    try:
+        grade_students(records, "R99")
+        raise AssertionError("unknown regulation was accepted")
+    except ValueError:
+        pass
+
+if __name__ == "__main__":
+    test_grade_students_matches_reference()
+    test_apply_sgpa_regrades_records()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Test the bounded-memory streaming mode of the JNTUK parser
+"""
+
+import os
+import tracemalloc
+from parser.parser_jntuk import parse_jntuk_pdf, parse_jntuk_pdf_stream
+
+def test_stream_matches_list_with_flat_memory():
+    pdf_path = "BTECH 2-1 RESULT FEB 2025.pdf"
+    if not os.path.exists(pdf_path):
+        print(f"❌ PDF not found: {pdf_path}")
+        return
+
+    tracemalloc.start()
+    results = parse_jntuk_pdf(pdf_path, engine="pymupdf")
+    list_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # Consume the stream without keeping the records
+    callback_counts = []
+    first_record = None
+    tracemalloc.start()
+    for record in parse_jntuk_pdf_stream(pdf_path, lambda record, count: callback_counts.append(count),
+                                         engine="pymupdf"):
+        if first_record is None:
+            first_record = record
+        assert record == results[len(callback_counts) - 1]
+    stream_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    assert results and first_record == results[0]
+    assert callback_counts == list(range(1, len(results) + 1))
+    # Only about one page of students is alive at a time
+    assert stream_peak * 5 < list_peak
+    print(f"✅ Streamed {len(results)} students: peak {stream_peak // 1024} KB vs {list_peak // 1024} KB for the list")
+
+if __name__ == "__main__":
+    test_stream_matches_list_with_flat_memory()
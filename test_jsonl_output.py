@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test the append-only JSON Lines output and its legacy JSON finalizer
+"""
+
+import json
+import os
+import tempfile
+from jsonl_output import (create_jsonl_output, load_jsonl_header, discard_uncommitted,
+                          append_jsonl_batch, iter_jsonl_records, materialize_json, read_jsonl_document)
+
+def test_jsonl_output():
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl_path = os.path.join(tmp, "parsed_results_jntuk_regular_1.jsonl")
+        metadata = {"format": "jntuk", "total_students": 0}
+        header = create_jsonl_output(jsonl_path, metadata, {"students_saved": 0})
+
+        batches = [
+            [{"student_id": "A1", "sgpa": 8.5}, {"student_id": "B2", "sgpa": 7.0}],
+            [{"student_id": "C3", "subjectGrades": [{"subject": "ENGINEERING GRAPHICS", "grade": "A"}]}]
+        ]
+        for batch in batches:
+            header['metadata']['total_students'] += len(batch)
+            append_jsonl_batch(jsonl_path, header, batch)
+        expected = [student for batch in batches for student in batch]
+
+        # A torn append after the last commit is ignored, and dropped on resume
+        with open(jsonl_path, 'a', encoding='utf-8') as f:
+            f.write('{"student_id": "TORN"')
+        assert list(iter_jsonl_records(jsonl_path)) == expected
+        header = load_jsonl_header(jsonl_path)
+        discard_uncommitted(jsonl_path, header)
+        assert os.path.getsize(jsonl_path) == header["committed_bytes"]
+        print("✅ Uncommitted records discarded")
+
+        json_path = materialize_json(jsonl_path, remove_stream=True)
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        assert data == {
+            "metadata": {"format": "jntuk", "total_students": 3},
+            "firebase_upload": {"students_saved": 0},
+            "students": expected
+        }
+        assert os.listdir(tmp) == [os.path.basename(json_path)]
+        print(f"✅ Materialized {len(data['students'])} students to {os.path.basename(json_path)}")
+
+        # An empty stream still produces a valid document
+        empty_path = os.path.join(tmp, "empty.jsonl")
+        create_jsonl_output(empty_path, {"total_students": 0}, {})
+        with open(materialize_json(empty_path), 'r', encoding='utf-8') as f:
+            assert json.load(f)["students"] == []
+        print("✅ Empty output materialized")
+
+def test_in_progress_document():
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl_path = os.path.join(tmp, "run.jsonl")
+        header = create_jsonl_output(jsonl_path, {"format": "jntuk"}, {"students_saved": 3})
+        append_jsonl_batch(jsonl_path, header, [{"student_id": f"S{i}"} for i in range(3)])
+        with open(jsonl_path, 'a', encoding='utf-8') as f:
+            f.write('{"student_id": "S3"}\n')  # appended, not committed yet
+
+        document = read_jsonl_document(jsonl_path)
+        assert document["metadata"] == {"format": "jntuk"} and document["firebase_upload"] == {"students_saved": 3}
+        assert [s["student_id"] for s in document["students"]] == ["S0", "S1", "S2"]
+        assert "pagination" not in document
+
+        page = read_jsonl_document(jsonl_path, offset=1, limit=1)
+        assert [s["student_id"] for s in page["students"]] == ["S1"]
+        assert page["pagination"] == {"offset": 1, "limit": 1, "total": 3, "returned": 1}
+        assert read_jsonl_document(jsonl_path, student_id="S2")["students"] == [{"student_id": "S2"}]
+        assert read_jsonl_document(jsonl_path, student_id="S3")["students"] == []
+        print("✅ An in-progress run is served from its committed records")
+
+if __name__ == "__main__":
+    test_jsonl_output()
+    test_in_progress_document()
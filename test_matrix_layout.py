@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test that the matrix parser learns its subject columns from the header rows
+"""
+
+import os
+from parser.parser_autonomous_dynamic import parse_autonomous_pdf_dynamic, parse_matrix_format
+
+SHEET = """Programme : I B.Tech. ( I Semester) (CR25) Regular
+Branch :CIVIL
+S.No. H.T.No. 25BS1003 25BS1107 25CE1104 SGPA
+1 25B81A0101 D E C 7.03
+2 25B81A010A -Ab- F S 0.00
+Branch :CSE
+S.No. H.T.No. 25BS1009 25CS1102 25CS1101 25AC1002 SGPA
+1 25B81A0501 A B S A 8.40
+"""
+
+CONTINUATION_PAGE = """Branch :CSE
+2 25B81A05J0 B B A S 8.10
+"""
+
+def test_layouts_learned_per_section():
+    results = parse_matrix_format(SHEET + CONTINUATION_PAGE, "Semester 1", "Autonomous")
+    assert [record['student_id'] for record in results] == ["25B81A0101", "25B81A010A", "25B81A0501", "25B81A05J0"]
+
+    civil, absent, cse, continued = results
+    assert [subject['code'] for subject in civil['subjectGrades']] == ["25BS1003", "25BS1107", "25CE1104"]
+    assert [subject['grade'] for subject in absent['subjectGrades']] == ["ABSENT", "F", "S"]
+    assert [subject['code'] for subject in cse['subjectGrades']] == ["25BS1009", "25CS1102", "25CS1101", "25AC1002"]
+    assert continued['subjectGrades'][3] == {
+        "code": "25AC1002", "subject": "Subject 25AC1002", "grade": "S", "internals": 0, "credits": 3.0
+    }
+    assert civil['sgpa'] == 7.03 and absent['sgpa'] == 0.0
+    print(f"✅ {len(results)} students decoded against 2 learned layouts")
+
+def test_every_matrix_row_is_decoded():
+    pdf_path = "sample_autonomous_new.pdf"
+    if not os.path.exists(pdf_path):
+        print(f"❌ PDF not found: {pdf_path}")
+        return
+
+    results = parse_autonomous_pdf_dynamic(pdf_path, pages=(0, 12))
+    assert len({record['student_id'] for record in results}) == len(results)
+    assert all(len(record['subjectGrades']) == 10 for record in results)
+    # Alphanumeric hall tickets and absent grades are no longer dropped
+    assert any(not record['student_id'][-3:].isdigit() for record in results)
+    print(f"✅ {len(results)} students on the first 12 pages, 10 subjects each")
+
+if __name__ == "__main__":
+    test_layouts_learned_per_section()
+    test_every_matrix_row_is_decoded()
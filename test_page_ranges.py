@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test page-range parsing and the upload preview
+"""
+
+import os
+from parser.parser_jntuk import parse_jntuk_pdf
+from parser import registry
+from parser.preview import preview_pdf
+
+PDF_PATH = "Results of I B.Tech II Semester (R23R20R19R16) RegularSupplementary Examinations, July-2024.pdf"
+
+def test_page_ranges_match_full_parse():
+    if not os.path.exists(PDF_PATH):
+        print(f"❌ PDF not found: {PDF_PATH}")
+        return
+
+    full = {record['student_id']: record for record in parse_jntuk_pdf(PDF_PATH, engine="pymupdf")}
+    head = parse_jntuk_pdf(PDF_PATH, engine="pymupdf", pages=(0, 20))
+    tail = parse_jntuk_pdf(PDF_PATH, engine="pymupdf", pages=(20, None))
+    assert head and tail
+
+    # Only a student whose rows cross the page boundary is split between the ranges
+    split = {record['student_id'] for record in head} & {record['student_id'] for record in tail}
+    assert len(split) <= 1
+    for record in head + tail:
+        if record['student_id'] not in split:
+            assert record == full[record['student_id']]
+    assert len({record['student_id'] for record in head + tail}) == len(full)
+    print(f"✅ Pages 1-20 and 21-end gave {len(head)} + {len(tail)} students matching the full parse")
+
+def test_preview_reads_only_first_pages():
+    if not os.path.exists(PDF_PATH):
+        print(f"❌ PDF not found: {PDF_PATH}")
+        return
+
+    preview = preview_pdf(PDF_PATH, "jntuk", pages=2, engine="pymupdf")
+    assert preview["pages_parsed"] == 2 and preview["total_pages"] > 100
+    assert preview["layout"] == "tabular"
+    assert preview["semester"] == "Semester 2"
+    assert preview["exam_type"] == "supply"
+    assert 0 < len(preview["sample_records"]) <= 5
+    assert preview["estimated_parse_seconds"] > 0
+
+    # An "auto" preview probes the first page its text pass read instead of opening the PDF again
+    original_open = registry.open_pdf
+    def no_reopen(*args, **kwargs):
+        raise AssertionError("the PDF was probed again")
+    registry.open_pdf = no_reopen
+    try:
+        auto = preview_pdf(PDF_PATH, "auto", pages=2, engine="pymupdf")
+    finally:
+        registry.open_pdf = original_open
+    assert auto["parser"] == "jntuk" and auto["sample_records"] == preview["sample_records"]
+    print(f"✅ Preview in {preview['preview_seconds']}s: {preview['students_found']} students on "
+          f"{preview['pages_parsed']}/{preview['total_pages']} pages, ETA {preview['estimated_parse_seconds']}s")
+
+if __name__ == "__main__":
+    test_page_ranges_match_full_parse()
+    test_preview_reads_only_first_pages()
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Test that page-parallel JNTUK parsing matches the serial parser
+"""
+
+import os
+from parser.parser_jntuk import parse_jntuk_pdf
+
+def test_parallel_matches_serial():
+    pdf_path = "Result of I B.Tech I Semester (R19R20R23) Regular  Supplementary Examinations, Jan-2024.pdf"
+
+    if not os.path.exists(pdf_path):
+        print(f"❌ PDF not found: {pdf_path}")
+        return
+
+    print(f"🧪 Comparing serial and parallel parsing of: {pdf_path}")
+
+    serial_results = parse_jntuk_pdf(pdf_path)
+    parallel_results = parse_jntuk_pdf(pdf_path, parallel=2)
+
+    print(f"📊 Serial: {len(serial_results)} students | Parallel: {len(parallel_results)} students")
+    assert serial_results == parallel_results
+    print("✅ Parallel output is identical to serial output")
+
+if __name__ == "__main__":
+    test_parallel_matches_serial()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Test that parse cache entries are keyed by the extraction engine
+"""
+
+import os
+import tempfile
+import parse_cache
+from parse_cache import cached_batches, cached_parse
+from parser.pdf_engines import PYMUPDF_AVAILABLE
+
+def test_entries_are_keyed_by_engine():
+    if not PYMUPDF_AVAILABLE:
+        print("❌ PyMuPDF not installed; both engines are pdfplumber")
+        return
+
+    original_dir = parse_cache.CACHE_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        parse_cache.CACHE_DIR = os.path.join(tmp, "parsed")
+        try:
+            pdf_path = os.path.join(tmp, "results.pdf")
+            with open(pdf_path, 'wb') as f:
+                f.write(b"%PDF-1.4 same bytes for both engines")
+
+            parsed = []
+            def parse_with(engine):
+                def parse(path):
+                    parsed.append(engine)
+                    return [{"student_id": "A1", "engine": engine}]
+                return parse
+
+            assert cached_parse(pdf_path, "jntuk", parse_with("pymupdf"), engine="pymupdf")[0]["engine"] == "pymupdf"
+            assert cached_parse(pdf_path, "jntuk", parse_with("pdfplumber"))[0]["engine"] == "pdfplumber"
+            assert cached_parse(pdf_path, "jntuk", parse_with("pymupdf"), engine="pymupdf")[0]["engine"] == "pymupdf"
+            assert parsed == ["pymupdf", "pdfplumber"]
+
+            batches = lambda path: iter([parse_with("pymupdf")(path)])
+            list(cached_batches(pdf_path, "jntuk_batch", batches, batch_size=50, engine="pymupdf"))
+            served = list(cached_batches(pdf_path, "jntuk_batch", lambda path: iter([parse_with("pdfplumber")(path)]),
+                                         batch_size=50))
+            assert served[0][0]["engine"] == "pdfplumber"
+            print("✅ Records extracted by one engine are never served to the other")
+        finally:
+            parse_cache.CACHE_DIR = original_dir
+
+if __name__ == "__main__":
+    test_entries_are_keyed_by_engine()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test the parser registry: first-page probing, format resolution and the shared driver
+"""
+
+import os
+from parser import parser_jntuk, registry
+from parser.registry import FORMATS, iter_batches, parse_pdf, probe_pdf, resolve_format
+
+EXPECTED = {
+    "BTECH 2-1 RESULT FEB 2025.pdf": ("jntuk", "2 Year", "Semester 1"),
+    "Results of I B.Tech II Semester (R23R20R19R16) RegularSupplementary Examinations, July-2024.pdf":
+        ("jntuk", "1 Year", "Semester 2"),
+    "sample_autonomous_new.pdf": ("matrix", "1 Year", "Semester 1")
+}
+
+def strip_dates(records):
+    return [{key: value for key, value in record.items() if key != 'upload_date'} for record in records]
+
+def test_probe_picks_the_format():
+    for pdf_path, (format_name, year, semester) in EXPECTED.items():
+        if not os.path.exists(pdf_path):
+            print(f"❌ PDF not found: {pdf_path}")
+            continue
+
+        probe = probe_pdf(pdf_path)
+        assert probe["format"] == format_name
+        assert (probe["year"], probe["semester"]) == (year, semester)
+        assert probe["family"] == FORMATS[format_name].family
+        assert resolve_format(pdf_path, "auto", probe) == format_name
+        assert resolve_format(pdf_path, "jntuk", probe) == "jntuk"
+        print(f"✅ {pdf_path}: {format_name}, {year} {semester}, scores {probe['scores']}")
+
+    # Asking for the autonomous family still parses a JNTUK sheet with the autonomous parser
+    assert resolve_format("BTECH 2-1 RESULT FEB 2025.pdf", "autonomous") == "autonomous_tabular"
+    try:
+        resolve_format("BTECH 2-1 RESULT FEB 2025.pdf", "pdf")
+        raise AssertionError("unknown format was accepted")
+    except ValueError:
+        pass
+
+def test_driver_parallel_ranges_match_serial_parse():
+    for pdf_path, format_name in (("sample_autonomous.pdf", "autonomous_tabular"),
+                                  ("sample_autonomous_new.pdf", "matrix")):
+        if not os.path.exists(pdf_path):
+            print(f"❌ PDF not found: {pdf_path}")
+            continue
+
+        serial = parse_pdf(pdf_path, format_name, pages=(0, 20))
+        parallel = parse_pdf(pdf_path, format_name, pages=(0, 20), parallel=2)
+        assert serial and strip_dates(parallel) == strip_dates(serial)
+
+        # With the caller's probe the driver neither re-probes nor re-opens the PDF to count its pages
+        probe, original_open = probe_pdf(pdf_path), registry.open_pdf
+        def no_reopen(*args, **kwargs):
+            raise AssertionError("the PDF was opened again")
+        registry.open_pdf = no_reopen
+        try:
+            probed = parse_pdf(pdf_path, FORMATS[format_name].family, pages=(0, 20), parallel=2, probe=probe)
+        finally:
+            registry.open_pdf = original_open
+        assert strip_dates(probed) == strip_dates(serial)
+
+        batches = list(iter_batches(pdf_path, 30, format_name, pages=(0, 20), checkpoint_path="unused.jsonl"))
+        assert all(len(batch) == 30 for batch in batches[:-1])
+        assert strip_dates([record for batch in batches for record in batch]) == strip_dates(serial)
+        print(f"✅ {pdf_path}: {len(serial)} students, identical serially, on 2 processes and in batches")
+
+def test_reappearing_student_is_merged():
+    def iter_page_rows(file_path, **kwargs):
+        pages = [[("A1", "S1"), ("B2", "S1")], [("C3", "S1")], [("A1", "S2")]]
+        for page_num, rows in enumerate(pages):
+            yield page_num, len(pages), {"semester": "Semester 1", "is_supply": False, "line_rows": [],
+                                         "table_rows": [(htno, code, f"SUBJECT {code}", 20, "A", 3.0)
+                                                        for htno, code in rows]}
+
+    original = parser_jntuk._iter_page_rows
+    parser_jntuk._iter_page_rows = iter_page_rows
+    try:
+        expected = [("A1", 2), ("B2", 1), ("C3", 1)]
+        assert [(r["student_id"], len(r["subjectGrades"])) for r in parse_pdf("fake.pdf", "jntuk")] == expected
+        results = registry.parse_results("fake.pdf", "jntuk").to_records()
+        assert [(r["student_id"], len(r["subjectGrades"])) for r in results] == expected
+        try:
+            list(registry.iter_records("fake.pdf", "jntuk"))
+            raise AssertionError("a reappearing hall ticket was streamed twice")
+        except parser_jntuk.HallTicketReappeared:
+            pass
+        print("✅ parse_pdf and parse_results merge a student who reappears later in the document")
+    finally:
+        parser_jntuk._iter_page_rows = original
+
+if __name__ == "__main__":
+    test_probe_picks_the_format()
+    test_driver_parallel_ranges_match_serial_parse()
+    test_reappearing_student_is_merged()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Parity test: the PyMuPDF extraction engine must produce the same JNTUK
+records as the pdfplumber engine on the bundled sample PDFs
+"""
+
+import os
+import time
+from parser.parser_jntuk import parse_jntuk_pdf
+
+def test_pymupdf_matches_pdfplumber():
+    pdf_files = [
+        "sample_autonomous.pdf",
+        "Results of I B.Tech II Semester (R23R20R19R16) RegularSupplementary Examinations, July-2024.pdf"
+    ]
+
+    for pdf_path in pdf_files:
+        if not os.path.exists(pdf_path):
+            print(f"❌ PDF not found: {pdf_path}")
+            continue
+
+        print(f"🧪 Comparing extraction engines on: {pdf_path}")
+
+        start = time.time()
+        plumber_results = parse_jntuk_pdf(pdf_path, engine="pdfplumber")
+        plumber_time = time.time() - start
+
+        start = time.time()
+        pymupdf_results = parse_jntuk_pdf(pdf_path, engine="pymupdf")
+        pymupdf_time = time.time() - start
+
+        print(f"📊 pdfplumber: {len(plumber_results)} students in {plumber_time:.2f}s | "
+              f"pymupdf: {len(pymupdf_results)} students in {pymupdf_time:.2f}s")
+        assert plumber_results
+        assert plumber_results == pymupdf_results
+        print("✅ Engines produced identical records")
+
+if __name__ == "__main__":
+    test_pymupdf_matches_pdfplumber()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test the columnar ResultBatch: exact round trip to the record dicts of any schema, memory and pickled size
+"""
+
+import json
+import os
+import pickle
+import tracemalloc
+from parser.registry import parse_pdf, parse_results
+from parser.result_batch import ResultBatch
+
+SAMPLES = (("BTECH 2-1 RESULT FEB 2025.pdf", "jntuk"), ("sample_autonomous_new.pdf", "matrix"))
+
+def test_round_trip_keeps_the_record_schema():
+    for pdf_path, format_name in SAMPLES:
+        if not os.path.exists(pdf_path):
+            print(f"❌ PDF not found: {pdf_path}")
+            continue
+
+        records = parse_pdf(pdf_path, format_name, pages=(0, 10))
+        batch = ResultBatch(records)
+        assert records and len(batch) == len(records)
+        assert batch.to_records() == records
+        # Key order survives too, so the JSON files do not change
+        assert [list(record) for record in batch.to_records()] == [list(record) for record in records]
+        assert json.dumps(batch.to_records()) == json.dumps(records)
+        assert pickle.loads(pickle.dumps(batch)).to_records() == records
+
+        student = batch[len(batch) // 2]
+        assert batch.record(student) == records[len(batch) // 2]
+        assert len(student) == len(records[len(batch) // 2]['subjectGrades'])
+
+        streamed = parse_results(pdf_path, format_name, pages=(0, 10))
+        assert [{k: v for k, v in r.items() if k != 'upload_date'} for r in streamed.to_records()] == \
+               [{k: v for k, v in r.items() if k != 'upload_date'} for r in records]
+        print(f"✅ {pdf_path}: {len(batch)} students round trip exactly, "
+              f"{len(batch.codes.values)} subject codes, {len(batch.grades.values)} grades")
+
+def test_records_with_different_keys_round_trip():
+    subject = {"code": "R2021011", "subject": "LINEAR ALGEBRA", "internals": 25, "grade": "A", "credits": 3.0}
+    records = [
+        {"student_id": "A1", "semester": "Semester 1", "sgpa": 8.25, "subjectGrades": [subject]},
+        # Extra record and subject keys, values that do not fit a typed column
+        {"student_id": "B2", "semester": "Semester 1", "sgpa": 7.5, "pdf_filename": "x.pdf",
+         "subjectGrades": [dict(subject, internals=None, credits=3, result="P"), dict(subject, grade=["A", "B"])]},
+        # Missing keys, and a key order of its own
+        {"sgpa": None, "student_id": "C3", "subjectGrades": [{"grade": "F", "code": "R2021012"}]},
+        {"student_id": "D4", "semester": "Semester 2"},
+        # List and dict field values cannot be interned
+        {"student_id": "E5", "sgpa": 6.0, "subjectGrades": [], "backlogs": ["R2021012"], "flags": {"supply": True}},
+        {"student_id": "F6", "sgpa": 6.0, "subjectGrades": None}
+    ]
+    batch = ResultBatch(records)
+    assert batch.to_records() == records
+    assert [list(record) for record in batch.to_records()] == [list(record) for record in records]
+    assert [[list(s) for s in r.get("subjectGrades") or []] for r in batch.to_records()] == \
+           [[list(s) for s in r.get("subjectGrades") or []] for r in records]
+    assert json.dumps(batch.to_records()) == json.dumps(records)
+    assert pickle.loads(pickle.dumps(batch)).to_records() == records
+    print(f"✅ {len(records)} records with extra, missing and unhashable values round trip exactly")
+
+    # Fields set on the batch land where record[key] = value would put them
+    batch.set_field("pdf_filename", "x.pdf", where=lambda student: student.student_id != "D4")
+    for record in records:
+        if record["student_id"] != "D4":
+            record["pdf_filename"] = "x.pdf"
+    assert batch.to_records() == records
+    assert [list(record) for record in batch.to_records()] == [list(record) for record in records]
+    print("✅ Fields set on the batch match the same change on the record dicts")
+
+def test_equal_values_of_different_types_round_trip():
+    # True == 1 == 1.0, but each must come back as it went in
+    subject = {"code": "R2021011", "subject": "LINEAR ALGEBRA", "internals": 25, "grade": "A", "credits": 3.0}
+    records = [
+        {"student_id": "A1", "sgpa": 8.0, "subjectGrades": [dict(subject, grade=1)], "attempt": 1},
+        {"student_id": "B2", "sgpa": 8.0, "subjectGrades": [dict(subject, grade=1.0)], "attempt": 1.0},
+        {"student_id": "C3", "sgpa": 8.0, "subjectGrades": [dict(subject, grade=True)], "attempt": True},
+        {"student_id": "D4", "sgpa": 8.0, "subjectGrades": [dict(subject, code=0, subject=False)], "attempt": 0.0}
+    ]
+    batch = ResultBatch(records)
+    for restored in (batch.to_records(), pickle.loads(pickle.dumps(batch)).to_records()):
+        assert restored == records
+        assert [(type(r["attempt"]), type(r["subjectGrades"][0]["grade"])) for r in restored] == \
+               [(type(r["attempt"]), type(r["subjectGrades"][0]["grade"])) for r in records]
+        assert [type(value) for value in restored[3]["subjectGrades"][0].values()] == \
+               [type(value) for value in records[3]["subjectGrades"][0].values()]
+    assert json.dumps(batch.to_records()) == json.dumps(records)
+    print("✅ Mixed int, float and bool values keep their types through the batch")
+
+def test_columns_are_smaller_than_dicts():
+    pdf_path = SAMPLES[0][0]
+    if not os.path.exists(pdf_path):
+        print(f"❌ PDF not found: {pdf_path}")
+        return
+
+    encoded = json.dumps(parse_pdf(pdf_path, "jntuk", pages=(0, 30)))
+
+    tracemalloc.start()
+    records = json.loads(encoded)
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    batch = ResultBatch(json.loads(encoded))
+    batch_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    pickled_dicts, pickled_batch = len(pickle.dumps(records)), len(pickle.dumps(batch))
+    print(f"📊 {len(batch)} students: {dict_bytes / 1024:.0f} KB as dicts, {batch_bytes / 1024:.0f} KB as columns; "
+          f"pickled {pickled_dicts / 1024:.0f} KB vs {pickled_batch / 1024:.0f} KB")
+    assert batch_bytes * 4 < dict_bytes
+    assert pickled_batch * 2 < pickled_dicts
+
+if __name__ == "__main__":
+    test_round_trip_keeps_the_record_schema()
+    test_records_with_different_keys_round_trip()
+    test_equal_values_of_different_types_round_trip()
+    test_columns_are_smaller_than_dicts()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test the columnar archives: exact round trip, projection, pushdown and fallback to the index
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+import results_archive
+import results_index
+
+def write_result_file(path, exam_type, students):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"metadata": {"format": "jntuk", "exam_type": exam_type}, "students": students}, f, indent=2)
+
+def student(student_id, semester, sgpa, **extra):
+    return dict({
+        "student_id": student_id,
+        "semester": semester,
+        "university": "JNTUK",
+        "sgpa": sgpa,
+        "subjectGrades": [
+            {"code": "R2021011", "subject": "LINEAR ALGEBRA", "internals": 25, "grade": "A", "credits": 3.0},
+            {"code": "R2021012", "subject": "CHEMISTRY LAB", "internals": 14, "grade": "F", "credits": 1.5}
+        ]
+    }, **extra)
+
+def test_results_archive():
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, "data")
+        os.makedirs(data_dir)
+        original_paths = results_index.INDEX_PATH, results_index.DATA_DIR
+        results_index.INDEX_PATH = os.path.join(tmp, "index.db")
+        results_index.DATA_DIR = Path(data_dir)
+        try:
+            regular = os.path.join(data_dir, "parsed_results_jntuk_regular_1.json")
+            supply = os.path.join(data_dir, "parsed_results_jntuk_supplementary_2.json")
+            students = [student("A1", "Semester 1", 8.25), student("B2", "Semester 2", 7.5, pdf_filename="x.pdf"),
+                        {"sgpa": None, "student_id": "C3", "semester": "Semester 1", "subjectGrades": []}]
+            write_result_file(regular, "regular", students)
+            write_result_file(supply, "supplementary", [student("A1", "Semester 1", 0.0)])
+
+            # Round trip keeps values, types and key order
+            with results_archive.ResultArchive(results_archive.write_archive(regular)) as archive:
+                assert archive.is_current(regular)
+                assert archive.records() == students
+                assert [list(record) for record in archive.records()] == [list(s) for s in students]
+                assert archive.records(columns=("student_id", "sgpa")) == \
+                    [{"student_id": "A1", "sgpa": 8.25}, {"student_id": "B2", "sgpa": 7.5},
+                     {"sgpa": None, "student_id": "C3"}]
+                assert archive.query(semester="Semester 3") == []
+                assert archive.query(exam_type="supplementary") == []
+                assert [r["student_id"] for r in archive.query(semester="Semester 1")] == ["A1", "C3"]
+            print("✅ Archive round trip, projection and pushdown")
+
+            # Only the regular file is archived; the supplementary one is answered by the index
+            results_index.sync_index(force=True)
+            columns = ("student_id", "sgpa")
+            project = lambda records: [{key: value for key, value in record.items()
+                                        if key in columns or key == "source_file"} for record in records]
+            for semester, exam_type in (("Semester 1", None), ("Semester 1", "supplementary"), ("Semester 2", None)):
+                expected = project(results_index.query_semester_results(semester, exam_type))
+                assert results_archive.query_semester_columns(semester, columns, exam_type) == expected and expected
+            print("✅ Archive projections and index answers agree")
+
+            # Only the archives of files that hold the semester are opened
+            opened, original_open = [], results_archive.open_current_archive
+            results_archive.open_current_archive = lambda json_path: opened.append(Path(json_path).name) or \
+                original_open(json_path)
+            try:
+                results_archive.query_semester_columns("Semester 2", columns)
+                results_archive.query_semester_columns("Semester 9", columns)
+            finally:
+                results_archive.open_current_archive = original_open
+            assert opened == ["parsed_results_jntuk_regular_1.json"]
+            print("✅ Files without the semester are skipped from the index")
+
+            # A rewritten JSON makes its archive stale, so the index answers for it again
+            write_result_file(regular, "regular", students[:1])
+            results_index.sync_index(force=True)
+            _, archived = results_archive.query_archives(semester="Semester 1")
+            assert archived == []
+            assert [r["student_id"] for r in results_archive.query_semester_columns("Semester 1", columns)] == ["A1", "A1"]
+            print("✅ Stale archives are ignored")
+        finally:
+            results_index.INDEX_PATH, results_index.DATA_DIR = original_paths
+
+if __name__ == "__main__":
+    test_results_archive()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test the results catalog: listings come from the index and follow file changes
+"""
+
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+import results_index
+from jsonl_output import append_jsonl_batch, create_jsonl_output, materialize_json
+
+def test_results_catalog():
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, "data")
+        os.makedirs(data_dir)
+        original_index_path = results_index.INDEX_PATH
+        results_index.INDEX_PATH = os.path.join(tmp, "index.db")
+        try:
+            good = os.path.join(data_dir, "parsed_results_jntuk_regular_1.json")
+            with open(good, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "metadata": {"format": "jntuk", "exam_type": "regular", "total_students": 2},
+                    "firebase_upload": {"students_saved": 2},
+                    "students": [{"student_id": "A1", "semester": "I"}, {"student_id": "B2", "semester": "I"}]
+                }, f)
+            with open(os.path.join(data_dir, "parsed_results_broken.json"), 'w', encoding='utf-8') as f:
+                f.write('{"metadata": {}, "students": [')
+
+            entries = {entry["filename"]: entry for entry in results_index.list_result_files(data_dir)}
+            assert sorted(entries) == ["parsed_results_broken.json", "parsed_results_jntuk_regular_1.json"]
+
+            entry = entries["parsed_results_jntuk_regular_1.json"]
+            assert entry["student_count"] == 2 and entry["error"] is None
+            assert entry["metadata"]["format"] == "jntuk"
+            assert entry["firebase_upload"] == {"students_saved": 2}
+            assert entry["size"] == os.path.getsize(good)
+            assert entries["parsed_results_broken.json"]["error"]
+            print(f"✅ Catalog lists {len(entries)} files")
+
+            os.remove(good)
+            assert [e["filename"] for e in results_index.list_result_files(data_dir)] == ["parsed_results_broken.json"]
+            print("✅ Deleted files drop out of the catalog")
+
+            # A batch run lists its .jsonl while it is being written, and its .json once materialized
+            jsonl_path = os.path.join(data_dir, "parsed_results_jntuk_regular_2.jsonl")
+            header = create_jsonl_output(jsonl_path, {"format": "jntuk", "total_students": 1}, {"students_saved": 1})
+            append_jsonl_batch(jsonl_path, header, [{"student_id": "C3", "semester": "I"}])
+            assert "parsed_results_jntuk_regular_2.jsonl" not in \
+                [e["filename"] for e in results_index.list_result_files(data_dir)]
+            entries = {e["filename"]: e for e in results_index.list_result_files(data_dir, include_in_progress=True)}
+            entry = entries["parsed_results_jntuk_regular_2.jsonl"]
+            assert entry["in_progress"] and not entries["parsed_results_broken.json"]["in_progress"]
+            assert entry["committed_bytes"] == entry["size"] == os.path.getsize(jsonl_path)
+            assert entry["student_count"] == 1 and entry["firebase_upload"] == {"students_saved": 1}
+            materialize_json(jsonl_path, remove_stream=True)
+            assert [(e["filename"], e["in_progress"]) for e in results_index.list_result_files(data_dir, True)] == \
+                [("parsed_results_broken.json", False), ("parsed_results_jntuk_regular_2.json", False)]
+            print("✅ In-progress batch runs are listed until they are materialized")
+        finally:
+            results_index.INDEX_PATH = original_index_path
+
+def test_directories_are_indexed_apart():
+    with tempfile.TemporaryDirectory() as tmp:
+        original_paths = results_index.INDEX_PATH, results_index.DATA_DIR
+        results_index.INDEX_PATH = os.path.join(tmp, "index.db")
+        try:
+            dirs = {}
+            for name, student_id in (("data", "A1"), ("other", "B2")):
+                dirs[name] = os.path.join(tmp, name)
+                os.makedirs(dirs[name])
+                with open(os.path.join(dirs[name], "parsed_results_jntuk_regular_1.json"), 'w', encoding='utf-8') as f:
+                    json.dump({"metadata": {"format": "jntuk"}, "students": [{"student_id": student_id, "semester": "I"}]}, f)
+
+            results_index.DATA_DIR = Path(dirs["data"])
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                # The same directory reached through a relative path
+                assert [e["student_count"] for e in results_index.list_result_files("data")] == [1]
+            finally:
+                os.chdir(cwd)
+            results_index.list_result_files(dirs["other"])
+            results_index.rebuild_index(dirs["other"])
+
+            # Queries within SYNC_INTERVAL are answered from the rows as they are
+            assert [r["student_id"] for r in results_index.query_semester_results("I")] == ["A1"]
+            assert [e["filename"] for e in results_index.list_result_files(dirs["other"])] == \
+                ["parsed_results_jntuk_regular_1.json"]
+            results_index.DATA_DIR = Path(dirs["other"])
+            assert [r["student_id"] for r in results_index.query_semester_results("I")] == ["B2"]
+            print("✅ Same-named files in two directories are indexed apart and synced without touching each other")
+        finally:
+            results_index.INDEX_PATH, results_index.DATA_DIR = original_paths
+
+def test_outdated_index_is_migrated_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = os.path.join(tmp, "index.db")
+        conn = sqlite3.connect(index_path)
+        conn.executescript("CREATE TABLE students (filename TEXT); PRAGMA user_version = 1;")
+        conn.close()
+
+        paths = []
+        for i in range(4):
+            paths.append(os.path.join(tmp, f"parsed_results_jntuk_regular_{i}.json"))
+            with open(paths[-1], 'w', encoding='utf-8') as f:
+                json.dump({"metadata": {"format": "jntuk"}, "students": [{"student_id": f"S{i}", "semester": "I"}]}, f)
+
+        # Processes starting together on the outdated index each migrate and index a file
+        script = ("import sys, results_index; results_index.INDEX_PATH = sys.argv[1]; "
+                  "results_index.index_result_file(sys.argv[2])")
+        workers = [subprocess.Popen([sys.executable, "-c", script, index_path, path]) for path in paths]
+        assert all(worker.wait(60) == 0 for worker in workers)
+
+        conn = sqlite3.connect(index_path)
+        try:
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == results_index.SCHEMA_VERSION
+            assert sorted(row[0] for row in conn.execute("SELECT student_id FROM students")) == ["S0", "S1", "S2", "S3"]
+        finally:
+            conn.close()
+        print("✅ Concurrent processes migrated the index once and kept each other's rows")
+
+if __name__ == "__main__":
+    test_results_catalog()
+    test_directories_are_indexed_apart()
+    test_outdated_index_is_migrated_once()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test the student offset index: sliced pages and student fetches match the decoded file
+"""
+
+import json
+import os
+import tempfile
+import results_offsets
+from jsonl_output import append_jsonl_batch, create_jsonl_output, materialize_json
+
+def students(count):
+    return [{
+        "student_id": f"21B91A05{i:02d}",
+        "semester": "Semester 1",
+        "sgpa": 7.5,
+        "subjectGrades": [{"code": "R2021011", "subject": "ప్రాథమిక గణితం ÄÖ", "internals": 20, "grade": "A", "credits": 3.0}]
+    } for i in range(count)]
+
+def test_offset_index():
+    with tempfile.TemporaryDirectory() as tmp:
+        original_dir = results_offsets.OFFSETS_DIR
+        results_offsets.OFFSETS_DIR = os.path.join(tmp, "offsets")
+        try:
+            # As app.py writes result files, with non-ASCII text so that bytes and characters differ
+            pretty = os.path.join(tmp, "parsed_results_jntuk_regular_1.json")
+            document = {"metadata": {"format": "jntuk", "exam_type": "regular"}, "students": students(25),
+                        "cloud_storage": {"uploaded": False}}
+            with open(pretty, 'w', encoding='utf-8') as f:
+                json.dump(document, f, indent=2, ensure_ascii=False)
+
+            # As batch_pdf_processor writes them, through the JSON Lines stream
+            jsonl_path = os.path.join(tmp, "parsed_results_jntuk_regular_2.jsonl")
+            header = create_jsonl_output(jsonl_path, {"format": "jntuk"}, {"students_saved": 0})
+            append_jsonl_batch(jsonl_path, header, students(7))
+            streamed = materialize_json(jsonl_path)
+
+            for json_path in (pretty, streamed):
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    expected = json.load(f)
+                header = results_offsets.build_offset_index(json_path)
+                assert header["count"] == len(expected["students"])
+
+                page = results_offsets.read_students_page(json_path, 3, 4)
+                assert page["students"] == expected["students"][3:7]
+                assert page["pagination"] == {"offset": 3, "limit": 4, "total": len(expected["students"]), "returned": 4}
+                assert {key: value for key, value in page.items() if key not in ("students", "pagination")} == \
+                    {key: value for key, value in expected.items() if key != "students"}
+                assert results_offsets.read_students_page(json_path, 100, 10)["students"] == []
+                assert results_offsets.read_students_page(json_path)["students"] == expected["students"]
+
+                single = results_offsets.read_student(json_path, "21B91A0505")
+                assert single["students"] == [expected["students"][5]]
+                assert results_offsets.read_student(json_path, "NOPE") is None
+            print("✅ Pages and single students are sliced out of both file layouts")
+
+            # A rewritten file is re-indexed on its next read
+            document["students"] = students(2)
+            with open(pretty, 'w', encoding='utf-8') as f:
+                json.dump(document, f, indent=2, ensure_ascii=False)
+            assert results_offsets.read_students_page(pretty, 0, 10)["pagination"]["total"] == 2
+            print("✅ Changed files are re-indexed")
+
+            # Files json.load rejects are not indexed either
+            broken = os.path.join(tmp, "parsed_results_broken.json")
+            with open(broken, 'w', encoding='utf-8') as f:
+                f.write('{"students": []}\n{}')
+            try:
+                results_offsets.build_offset_index(broken)
+                raise AssertionError("trailing data was accepted")
+            except ValueError:
+                pass
+            print("✅ Malformed files are rejected")
+        finally:
+            results_offsets.OFFSETS_DIR = original_dir
+
+if __name__ == "__main__":
+    test_offset_index()
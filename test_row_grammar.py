@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Test that the compiled row grammar classifies text lines like the previous
+per-token classifier
+"""
+
+from benchmark_row_grammar import compiled_parse_result_line, legacy_parse_result_line
+
+def test_row_grammar_matches_legacy():
+    lines = [
+        "1 20B91A0501 R201101 PROBABILITY AND STATISTICS 24 A+ 3",
+        "  12   20B91A0501   R201101   ENGINEERING   GRAPHICS  ABSENT  ABSENT  0  ",
+        "3 20B91A0501 R201101 18 B 1.5",
+        "4 20B91A0501 R201101 ENVIRONMENTAL SCIENCE 0 COMPLETED 0",
+        "5 20B91A0501 R201101 LAB 20 MP 0.",
+        "6 20B91A0501 R201101 LAB 20 S 2",
+        "Sno Htno Subcode Subname Internals Grade Credits",
+        "7 20B91A0501 R201101 LAB 20 G 2",
+        "8 20B91A05012 R201101 LAB 20 A 2",
+        "9 20B91A0501 R201101 LAB 2O A 2",
+        "10 20B91A0501 R201101 LAB 20 A x",
+        "20B91A0501 R201101 20 A 2",
+        "",
+        "   "
+    ]
+    for line in lines:
+        assert compiled_parse_result_line(line) == legacy_parse_result_line(line), line
+
+    assert compiled_parse_result_line(lines[1]) == ("20B91A0501", "R201101", "ENGINEERING GRAPHICS", 0, "ABSENT", 0.0)
+    print(f"✅ {len(lines)} lines classified identically")
+
+if __name__ == "__main__":
+    test_row_grammar_matches_legacy()